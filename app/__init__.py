@@ -5,9 +5,10 @@ from flask_migrate import Migrate
 from flask_caching import Cache
 
 from config import config
+from app.services.db_routing import RoutingSession
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 cache = Cache()
@@ -32,16 +33,50 @@ def create_app(config_name='default'):
     migrate.init_app(app, db)
     cache.init_app(app)
     
+    # Reads of read-only views go to the replica bind, if one is configured
+    from app.services import db_routing
+    db_routing.init_app(app)
+    
+    from app.services.rate_limiter import rate_limiter
+    rate_limiter.init_app(app)
+    
+    # History of searches served from the result cache is written in batches
+    from app.services.search_log import search_log
+    search_log.init_app(app)
+    
+    # Request, SQL and per-stage latency metrics served at /metrics
+    from app.services import metrics
+    metrics.init_app(app, db)
+    
+    # Opt-in request tracing, served under /admin/traces
+    from app.services import tracing
+    tracing.init_app(app, db)
+    
+    # Bulk jobs left behind by a stopped process are picked up again
+    from app.services import bulk_jobs
+    bulk_jobs.init_app(app)
+    
+    # Keep per-user usage counters in step with recorded searches
+    from app.services import user_stats  # noqa: F401
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.dashboard import dashboard_bp
     from app.routes.search import search_bp
     from app.routes.api import api_bp
+    from app.routes.metrics import metrics_bp
+    from app.routes.admin import admin_bp
     
     app.register_blueprint(auth_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(search_bp)
     app.register_blueprint(api_bp, url_prefix='/api/v1')
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(admin_bp, url_prefix='/admin')
+    
+    # Register CLI commands
+    from app.cli import register_commands
+    register_commands(app)
     
     # Register error handlers
     from flask import render_template
@@ -55,7 +90,8 @@ def create_app(config_name='default'):
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
-    # Create database tables if they don't exist
+    # Create database tables if they don't exist; columns added to existing
+    # tables come from `flask upgrade-schema`
     with app.app_context():
         db.create_all()
     
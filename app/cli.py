@@ -0,0 +1,209 @@
+import signal
+import threading
+import time
+
+import click
+import tldextract
+
+
+def register_commands(app):
+    """
+    Register the application's Flask CLI commands.
+
+    Args:
+        app (Flask): The Flask application
+    """
+
+    @app.cli.command('backfill-associations')
+    def backfill_associations_command():
+        """Populate user domains and saved emails from existing searches."""
+        from app.services.user_library import backfill_associations
+
+        domains_added, emails_added = backfill_associations()
+        click.echo(f'Added {domains_added} user domains and {emails_added} saved emails.')
+
+    @app.cli.command('prune-searches')
+    @click.option('--days', type=int, default=None,
+                  help='Keep searches newer than this many days (default: SEARCH_RETENTION_DAYS).')
+    @click.option('--archive/--no-archive', default=None,
+                  help='Copy pruned searches to searches_archive (default: SEARCH_ARCHIVE).')
+    def prune_searches_command(days, archive):
+        """Roll old searches into daily totals and remove them."""
+        from app.services.search_retention import prune_searches
+
+        stats = prune_searches(retention_days=days, archive=archive)
+        click.echo(f"Pruned {stats['rows']} searches over {stats['days']} days.")
+
+    @app.cli.command('create-search-indexes')
+    def create_search_indexes_command():
+        """Create missing indexes on the searches table."""
+        from app.services.search_retention import create_search_indexes
+
+        for name in create_search_indexes():
+            click.echo(name)
+
+    @app.cli.command('upgrade-schema')
+    def upgrade_schema_command():
+        """Add missing model columns and backfill data the new schema needs."""
+        from app.services.schema import add_missing_columns
+        from app.services.user_library import backfill_associations
+
+        added = add_missing_columns()
+        for name in added:
+            click.echo(f'Added {name}')
+        click.echo(f'Schema up to date ({len(added)} columns added).')
+
+        # Safe to repeat: existing associations are kept
+        domains_added, emails_added = backfill_associations()
+        click.echo(f'Added {domains_added} user domains and {emails_added} saved emails.')
+
+    @app.cli.command('create-people-index')
+    @click.option('--rebuild', is_flag=True, help='Repopulate an existing SQLite full-text index from the emails table.')
+    def create_people_index_command(rebuild):
+        """Create the full-text/trigram index used by people search."""
+        from app.services.people_search import create_people_index
+
+        dialect = create_people_index(rebuild=rebuild)
+        click.echo(f'People search index ready ({dialect}).')
+
+    @app.cli.command('resume-bulk-jobs')
+    @click.option('--stale-after', type=int, default=None,
+                  help='Seconds without a heartbeat before a job counts as abandoned (default: BULK_STALE_SECONDS).')
+    def resume_bulk_jobs_command(stale_after):
+        """Run bulk jobs left queued or running by a stopped process."""
+        from app.services.bulk_jobs import resume_stale_jobs
+
+        job_ids = resume_stale_jobs(app, stale_after=stale_after, wait=True)
+        click.echo(f'Resumed {len(job_ids)} bulk jobs.')
+
+    @app.cli.command('crawl-enqueue')
+    @click.argument('domains', nargs=-1, required=True)
+    @click.option('--priority', type=int, default=0, help='Higher priorities are crawled first.')
+    def crawl_enqueue_command(domains, priority):
+        """Queue domains for the crawl workers."""
+        from app import db
+        from app.models import Domain
+        from app.services.crawl_queue import enqueue_crawl
+
+        for name in domains:
+            ext = tldextract.extract(name)
+            name = f"{ext.domain}.{ext.suffix}"
+            domain_obj = Domain.query.filter_by(domain_name=name).first()
+            if not domain_obj:
+                domain_obj = Domain(domain_name=name)
+                db.session.add(domain_obj)
+                db.session.flush()
+            task = enqueue_crawl(domain_obj.id, priority=priority)
+            db.session.commit()
+            click.echo(f'{name}: task {task.id} {task.status}')
+
+    @app.cli.command('crawl-worker')
+    @click.option('--threads', type=int, default=1, help='Tasks processed at the same time by this process.')
+    @click.option('--once', is_flag=True, help='Exit when no task is runnable instead of waiting for more.')
+    @click.option('--max-tasks', type=int, default=None, help='Exit after processing this many tasks per thread.')
+    def crawl_worker_command(threads, once, max_tasks):
+        """Claim and run queued domain crawls until interrupted."""
+        from app.services.crawl_queue import CrawlWorker, worker_name
+
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            click.echo('Stopping after the current tasks...')
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        name = worker_name()
+        workers = [
+            CrawlWorker(app, worker_id=f'{name}:{i}', stop_event=stop_event)
+            for i in range(threads)
+        ]
+        counts = []
+
+        def run_worker(worker):
+            counts.append(worker.run(once=once, max_tasks=max_tasks))
+
+        runners = [threading.Thread(target=run_worker, args=(worker,)) for worker in workers]
+        for runner in runners:
+            runner.start()
+        # Join with a timeout so signals are still handled on the main thread
+        while any(runner.is_alive() for runner in runners):
+            for runner in runners:
+                runner.join(timeout=0.5)
+        click.echo(f'Processed {sum(counts)} crawl tasks.')
+
+    @app.cli.command('schedule-recrawls')
+    @click.option('--loop', is_flag=True, help='Keep scheduling every RECRAWL_INTERVAL seconds.')
+    def schedule_recrawls_command(loop):
+        """Queue recrawls of stale and popular domains within the crawl budget."""
+        from app import db
+        from app.services.recrawl import schedule_recrawls
+
+        while True:
+            try:
+                selected = schedule_recrawls()
+            except Exception as e:
+                db.session.rollback()
+                if not loop:
+                    raise
+                click.echo(f'Scheduling failed: {str(e)}', err=True)
+                selected = []
+            for domain_obj, searches, score in selected:
+                click.echo(f'{domain_obj.domain_name}: {searches} searches, score {score:.2f}')
+            click.echo(f'Queued {len(selected)} recrawls.')
+            db.session.remove()
+
+            if not loop:
+                break
+            time.sleep(app.config['RECRAWL_INTERVAL'])
+
+    @app.cli.command('hunt-domains')
+    @click.argument('file', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--output', type=click.Path(dir_okay=False), default=None,
+                  help='Append results to this JSONL file (default: <file>.results.jsonl).')
+    @click.option('--to-db', is_flag=True, help='Store found emails in the database instead of a JSONL file.')
+    @click.option('--checkpoint', type=click.Path(dir_okay=False), default=None,
+                  help='SQLite file recording progress (default: <file>.checkpoint.sqlite).')
+    @click.option('--processes', type=int, default=None, help='Worker processes (default: HUNT_PROCESSES).')
+    @click.option('--concurrency', type=int, default=None,
+                  help='Domains crawled at once per process (default: HUNT_CONCURRENCY).')
+    @click.option('--batch-size', type=int, default=None,
+                  help='Domains sent to a process at a time (default: HUNT_BATCH_SIZE).')
+    @click.option('--retry-failed', is_flag=True, help='Crawl domains that failed in an earlier run again.')
+    def hunt_domains_command(file, output, to_db, checkpoint, processes, concurrency, batch_size, retry_failed):
+        """Find emails for every domain in FILE, resuming where an earlier run stopped."""
+        from app.services.domain_hunt import DatabaseSink, HuntCheckpoint, JsonlSink, read_domains, run_hunt
+
+        config = app.config
+        checkpoint = HuntCheckpoint(checkpoint or f'{file}.checkpoint.sqlite')
+        finished = checkpoint.finished(retry_failed=retry_failed)
+        if finished:
+            click.echo(f'Resuming: skipping {len(finished)} domains finished earlier.')
+        domains = (domain for domain in read_domains(file) if domain not in finished)
+
+        if to_db:
+            sink = DatabaseSink()
+        else:
+            output = output or f'{file}.results.jsonl'
+            sink = JsonlSink(output)
+            click.echo(f'Writing results to {output}')
+
+        try:
+            progress = run_hunt(
+                domains, checkpoint, sink,
+                processes=processes or config['HUNT_PROCESSES'],
+                concurrency=concurrency or config['HUNT_CONCURRENCY'],
+                batch_size=batch_size or config['HUNT_BATCH_SIZE'],
+                report=lambda progress: click.echo(str(progress)),
+                report_interval=config['HUNT_REPORT_INTERVAL']
+            )
+            totals = checkpoint.counts()
+        except KeyboardInterrupt:
+            click.echo('Interrupted; run the same command again to resume.', err=True)
+            raise SystemExit(1)
+        finally:
+            sink.close()
+            checkpoint.close()
+        click.echo(f'Finished: {progress}')
+        click.echo(f"All runs: {totals.get('done', 0)} domains done, {totals.get('failed', 0)} failed.")
@@ -40,6 +40,10 @@ class User(UserMixin, db.Model):
     
     def generate_new_api_key(self):
         """Generate a new API key for the user."""
+        from app.services.api_key_cache import invalidate_api_key_on_commit
+        
+        # Make sure the old key stops authenticating once the new one is saved
+        invalidate_api_key_on_commit(self.api_key)
         self.api_key = str(uuid.uuid4())
         return self.api_key
     
@@ -57,6 +61,12 @@ class Domain(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Canonical host, e.g. 'https://www.example.com', found by app.services.canonical_host
+    canonical_url = db.Column(db.String(255), nullable=True)
+    redirect_chain = db.Column(db.Text, nullable=True)  # JSON list of URLs followed to reach it
+    tls_ok = db.Column(db.Boolean, nullable=True)
+    canonical_checked_at = db.Column(db.DateTime, nullable=True)
+    
     # Relationships
     emails = db.relationship('Email', backref='domain', lazy='dynamic')
     
@@ -87,6 +97,11 @@ class Email(db.Model):
 class Search(db.Model):
     """Model for tracking user searches."""
     __tablename__ = 'searches'
+    __table_args__ = (
+        db.Index('ix_searches_user_created', 'user_id', 'created_at'),
+        db.Index('ix_searches_user_type_created', 'user_id', 'search_type', 'created_at'),
+        db.Index('ix_searches_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
@@ -99,6 +114,195 @@ class Search(db.Model):
         return f'<Search {self.query}>'
 
 
+class UserDomain(db.Model):
+    """Association between a user and the domains they have searched."""
+    __tablename__ = 'user_domains'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'domain_id', name='uq_user_domains_user_domain'),
+        db.Index('ix_user_domains_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    domain_id = db.Column(db.Integer, db.ForeignKey('domains.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserDomain {self.user_id} -> {self.domain_id}>'
+
+
+class UserSavedEmail(db.Model):
+    """Association between a user and the emails saved from their searches."""
+    __tablename__ = 'user_saved_emails'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'email_id', name='uq_user_saved_emails_user_email'),
+        db.Index('ix_user_saved_emails_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    email_id = db.Column(db.Integer, db.ForeignKey('emails.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserSavedEmail {self.user_id} -> {self.email_id}>'
+
+
+class UserStats(db.Model):
+    """Model for per-user usage counters, maintained as searches are recorded."""
+    __tablename__ = 'user_stats'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    search_count = db.Column(db.Integer, default=0, nullable=False)
+    results_count = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UserStats {self.user_id}: {self.search_count} searches>'
+
+
+class ApiUsage(db.Model):
+    """Model for the durable per-user daily API request tally."""
+    __tablename__ = 'api_usage'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_api_usage_user_day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    request_count = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ApiUsage {self.user_id} {self.day}: {self.request_count}>'
+
+
+class CrawlLease(db.Model):
+    """Model for cross-worker leases that keep one crawl per key in flight."""
+    __tablename__ = 'crawl_leases'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    owner = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)  # set when the holder finished, kept briefly for waiters
+    
+    def __repr__(self):
+        return f'<CrawlLease {self.key} by {self.owner}>'
+
+
+class SearchDailyRollup(db.Model):
+    """Model for daily per-user search totals rolled up from pruned searches."""
+    __tablename__ = 'search_daily_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'search_type', name='uq_search_rollups_user_day_type'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
+    day = db.Column(db.Date, nullable=False)
+    search_type = db.Column(db.String(50))
+    search_count = db.Column(db.Integer, default=0)
+    results_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<SearchDailyRollup {self.user_id} {self.day} {self.search_type}>'
+
+
+class SearchArchive(db.Model):
+    """Model holding raw searches moved out of the searches table."""
+    __tablename__ = 'searches_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, index=True)
+    query = db.Column(db.String(255))
+    search_type = db.Column(db.String(50))
+    results_count = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<SearchArchive {self.query}>'
+
+
+class BulkJob(db.Model):
+    """Model for bulk verification and finding jobs uploaded as CSV files."""
+    __tablename__ = 'bulk_jobs'
+    __table_args__ = (
+        db.Index('ix_bulk_jobs_user_created', 'user_id', 'created_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    job_type = db.Column(db.String(20))  # 'verify' or 'find'
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'completed', 'failed'
+    filename = db.Column(db.String(255))
+    input_path = db.Column(db.String(512))
+    output_path = db.Column(db.String(512))
+    total_rows = db.Column(db.Integer, default=0)
+    processed_rows = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    owner = db.Column(db.String(64), nullable=True)  # token of the run processing the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # last sign of life from that run
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def progress(self):
+        """Percentage of rows processed."""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(99, int(self.processed_rows * 100 / self.total_rows))
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'filename': self.filename,
+            'total_rows': self.total_rows,
+            'processed_rows': self.processed_rows,
+            'progress': self.progress,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+    
+    def __repr__(self):
+        return f'<BulkJob {self.id} {self.job_type} {self.status}>'
+
+
+class CrawlTask(db.Model):
+    """Domain crawl queued for the `flask crawl-worker` processes."""
+    __tablename__ = 'crawl_tasks'
+    __table_args__ = (
+        db.Index('ix_crawl_tasks_claim', 'status', 'run_after', 'priority'),
+        db.Index('ix_crawl_tasks_domain_status', 'domain_id', 'status'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    domain_id = db.Column(db.Integer, db.ForeignKey('domains.id'), nullable=False)
+    status = db.Column(db.String(20), default='queued')  # 'queued', 'running', 'done', 'failed'
+    priority = db.Column(db.Integer, default=0)  # higher runs first
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)
+    locked_by = db.Column(db.String(128), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)  # lease expiry, extended by heartbeats
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    results_count = db.Column(db.Integer, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    # Relationship
+    domain = db.relationship('Domain')
+    
+    def __repr__(self):
+        return f'<CrawlTask {self.id} domain={self.domain_id} {self.status}>'
+
+
 class EmailPattern(db.Model):
     """Model for storing common email patterns for domains."""
     __tablename__ = 'email_patterns'
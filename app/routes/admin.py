@@ -0,0 +1,43 @@
+import hmac
+from functools import wraps
+
+from flask import Blueprint, Response, abort, current_app, jsonify, request
+
+from app.services.tracing import get_store
+
+admin_bp = Blueprint('admin', __name__)
+
+def admin_token_required(f):
+    """Require `Authorization: Bearer <TRACE_ADMIN_TOKEN>`; hide the routes if no token is set."""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = current_app.config.get('TRACE_ADMIN_TOKEN')
+        if not token:
+            abort(404)
+        supplied = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(supplied, f'Bearer {token}'):
+            abort(401)
+        return f(*args, **kwargs)
+    return decorated
+
+@admin_bp.route('/traces')
+@admin_token_required
+def traces():
+    limit = min(request.args.get('limit', 50, type=int), 500)
+    return jsonify({'traces': get_store(current_app).list(limit=limit)})
+
+@admin_bp.route('/traces/<trace_id>')
+@admin_token_required
+def trace(trace_id):
+    record = get_store(current_app).get(trace_id)
+    if record is None:
+        abort(404)
+    return jsonify(record)
+
+@admin_bp.route('/traces/<trace_id>/profile')
+@admin_token_required
+def trace_profile(trace_id):
+    record = get_store(current_app).get(trace_id)
+    if record is None or not record.get('profile'):
+        abort(404)
+    return Response(record['profile'], mimetype='text/plain')
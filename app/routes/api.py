@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request, current_app, g
+from flask import Blueprint, Response, jsonify, make_response, request, current_app, g, send_file, stream_with_context
 from flask_restful import Api, Resource, reqparse, fields, marshal_with
 from functools import wraps
 import validators
@@ -6,13 +6,43 @@ import tldextract
 from datetime import datetime, timedelta
 
 from app import db
-from app.models import User, Domain, Email, Search
-from app.services.email_finder import EmailFinder
+from app.models import Domain, Email, Search, BulkJob
 from app.services.email_verifier import EmailVerifier
+from app.services.bulk_jobs import create_job, BulkJobError
+from app.services.exports import domain_email_rows, saved_email_rows, stream_export
+from app.services.people_search import search_people
+from app.services.domain_search import search_domain_emails, find_person_email
+from app.services.result_cache import (
+    get_domain_results, set_domain_results, get_verification, set_verification, invalidate_email
+)
+from app.services.user_library import record_domain_search, record_saved_email
+from app.services.db_routing import use_primary
+from app.services.rate_limiter import rate_limiter
+from app.services.search_log import search_log
+from app.services.api_key_cache import get_api_user
+from app.services.serialization import MSGPACK_MIMETYPES, dumps_json, dumps_msgpack, msgpack
 
 api_bp = Blueprint('api', __name__)
 api = Api(api_bp)
 
+# Response encoders, picked by Flask-RESTful from the Accept header
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    response = make_response(dumps_json(data), code)
+    response.headers.extend(headers or {})
+    response.headers['Content-Type'] = 'application/json'
+    return response
+
+if msgpack is not None:
+    def output_msgpack(data, code, headers=None):
+        response = make_response(dumps_msgpack(data), code)
+        response.headers.extend(headers or {})
+        response.headers['Content-Type'] = 'application/msgpack'
+        return response
+    
+    for mimetype in MSGPACK_MIMETYPES:
+        api.representations[mimetype] = output_msgpack
+
 # API Authentication decorator
 def api_key_required(f):
     @wraps(f)
@@ -22,21 +52,13 @@ def api_key_required(f):
         if not api_key:
             return {'message': 'API key is missing'}, 401
         
-        user = User.query.filter_by(api_key=api_key).first()
+        user = get_api_user(api_key)
         if not user:
             return {'message': 'Invalid API key'}, 401
         
         # Check rate limits
-        today = datetime.utcnow().date()
-        midnight = datetime.combine(today, datetime.min.time())
-        
-        # Count today's searches
-        search_count = Search.query.filter(
-            Search.user_id == user.id,
-            Search.created_at >= midnight
-        ).count()
-        
-        if search_count >= current_app.config['MAX_REQUESTS_PER_DAY']:
+        g.rate_limit = rate_limiter.hit(user.id)
+        if not g.rate_limit.allowed:
             return {'message': 'Rate limit exceeded'}, 429
         
         # Set user for this request
@@ -44,6 +66,16 @@ def api_key_required(f):
         return f(*args, **kwargs)
     return decorated
 
+@api_bp.after_request
+def add_rate_limit_headers(response):
+    """Expose the caller's remaining quota on every API response."""
+    status = g.get('rate_limit')
+    if status is not None:
+        response.headers['X-RateLimit-Limit'] = str(status.limit)
+        response.headers['X-RateLimit-Remaining'] = str(status.remaining)
+        response.headers['X-RateLimit-Reset'] = str(status.reset)
+    return response
+
 # Resource fields for marshalling
 email_fields = {
     'email_address': fields.String,
@@ -58,6 +90,9 @@ email_fields = {
 domain_parser = reqparse.RequestParser()
 domain_parser.add_argument('domain', type=str, required=True, 
                           help='Domain name is required')
+domain_parser.add_argument('limit', type=int)
+domain_parser.add_argument('after_id', type=int)
+domain_parser.add_argument('format', type=str, choices=('json', 'ndjson'), default='json')
 
 # Parser for email finder
 email_finder_parser = reqparse.RequestParser()
@@ -68,11 +103,38 @@ email_finder_parser.add_argument('last_name', type=str)
 email_finder_parser.add_argument('position', type=str)
 email_finder_parser.add_argument('pattern', type=str)
 
+# Parsers for exports
+export_parser = reqparse.RequestParser()
+export_parser.add_argument('domain', type=str, required=True, 
+                          help='Domain name is required')
+export_parser.add_argument('format', type=str, choices=('csv', 'jsonl'), default='csv')
+
+saved_export_parser = reqparse.RequestParser()
+saved_export_parser.add_argument('format', type=str, choices=('csv', 'jsonl'), default='csv')
+
+# Parser for people search
+people_search_parser = reqparse.RequestParser()
+people_search_parser.add_argument('q', type=str, required=True, 
+                                  help='Search query is required')
+people_search_parser.add_argument('page', type=int, default=1)
+people_search_parser.add_argument('per_page', type=int)
+
 # Parser for email verification
 email_verify_parser = reqparse.RequestParser()
 email_verify_parser.add_argument('email', type=str, required=True, 
                                help='Email address is required')
 
+def serialize_email(email):
+    """Format an Email row for API responses."""
+    return {
+        'email': email.email_address,
+        'first_name': email.first_name,
+        'last_name': email.last_name,
+        'position': email.position,
+        'confidence': email.confidence_score,
+        'verified': email.is_verified
+    }
+
 class DomainSearch(Resource):
     @api_key_required
     def get(self):
@@ -86,70 +148,118 @@ class DomainSearch(Resource):
         if not validators.domain(domain):
             return {'message': 'Invalid domain format'}, 400
         
-        # Record the search
-        search_record = Search(
-            user_id=g.user.id,
-            query=domain,
-            search_type='domain'
-        )
-        db.session.add(search_record)
-        
-        # Check if domain exists in database
-        domain_obj = Domain.query.filter_by(domain_name=domain).first()
-        if not domain_obj:
-            domain_obj = Domain(domain_name=domain)
-            db.session.add(domain_obj)
-            db.session.commit()
+        limit = args['limit']
+        after_id = args['after_id']
+        stream = (args['format'] == 'ndjson' or 
+                  request.accept_mimetypes.best == 'application/x-ndjson')
+        paginated = limit is not None or after_id is not None
         
-        # Get emails for this domain
-        emails = Email.query.filter_by(domain_id=domain_obj.id).all()
+        if limit is not None and limit < 1:
+            return {'message': 'Limit must be a positive integer'}, 400
         
-        # If no emails are found, try to find them
-        if not emails:
-            try:
-                email_finder = EmailFinder(domain)
-                found_emails = email_finder.find_bulk_emails()
-                
-                # Store found emails
-                for email_data in found_emails:
-                    email = Email(
-                        email_address=email_data['email'],
-                        first_name=email_data.get('first_name'),
-                        last_name=email_data.get('last_name'),
-                        position=email_data.get('position'),
-                        confidence_score=email_data.get('confidence', 0.0),
-                        domain_id=domain_obj.id
-                    )
-                    db.session.add(email)
-                
-                # Update search record with result count
-                search_record.results_count = len(found_emails)
+        # Serve popular domains straight from the result cache
+        cached = None if (stream or paginated) else get_domain_results(domain)
+        if cached is None:
+            # Record the search; it is added after any crawl so the crawl's
+            # lease never waits on an uncommitted write from this request
+            search_record = Search(
+                user_id=g.user.id,
+                query=domain,
+                search_type='domain'
+            )
+            
+            # Check if domain exists in database
+            domain_obj = Domain.query.filter_by(domain_name=domain).first()
+            if not domain_obj:
+                domain_obj = Domain(domain_name=domain)
+                db.session.add(domain_obj)
                 db.session.commit()
-                
-                # Get the newly added emails
+            
+            # Get emails for this domain; pages and streams only need to know some exist
+            if stream or paginated:
+                emails = Email.query.filter_by(domain_id=domain_obj.id).limit(1).all()
+            else:
                 emails = Email.query.filter_by(domain_id=domain_obj.id).all()
-                
-            except Exception as e:
-                current_app.logger.error(f"API error finding emails for {domain}: {str(e)}")
-                return {'message': f'Error finding emails: {str(e)}'}, 500
+            
+            # If no emails are found, try to find them
+            crawled = not emails
+            if crawled:
+                try:
+                    # Concurrent searches for this domain share a single crawl
+                    emails = search_domain_emails(domain_obj)
+                    
+                    # Update search record with result count
+                    search_record.results_count = len(emails)
+                    
+                except Exception as e:
+                    current_app.logger.error(f"API error finding emails for {domain}: {str(e)}")
+                    return {'message': f'Error finding emails: {str(e)}'}, 500
+            
+            db.session.add(search_record)
+            record_domain_search(g.user.id, domain_obj.id, refresh=crawled)
+            db.session.commit()
+            
+            if stream:
+                return self.stream_emails(domain_obj.id, after_id)
+            if paginated:
+                return self.email_page(domain, domain_obj.id, limit, after_id)
+            
+            cached = set_domain_results(domain_obj, emails)
+        else:
+            # Cache hits stay off the database; the history is written in batches
+            search_log.record(g.user.id, domain, 'domain', domain_id=cached['domain']['id'])
         
         # Format the response
         result = {
             'domain': domain,
             'emails': [
                 {
-                    'email': email.email_address,
-                    'first_name': email.first_name,
-                    'last_name': email.last_name,
-                    'position': email.position,
-                    'confidence': email.confidence_score,
-                    'verified': email.is_verified
-                } for email in emails
+                    'email': email['email_address'],
+                    'first_name': email['first_name'],
+                    'last_name': email['last_name'],
+                    'position': email['position'],
+                    'confidence': email['confidence_score'],
+                    'verified': email['is_verified']
+                } for email in cached['emails']
             ],
-            'count': len(emails)
+            'count': len(cached['emails'])
         }
         
         return result
+    
+    def email_page(self, domain, domain_id, limit, after_id):
+        """Return one keyset-paginated page of a domain's emails."""
+        limit = min(limit or current_app.config['API_PAGE_SIZE'],
+                    current_app.config['API_MAX_PAGE_SIZE'])
+        
+        query = Email.query.filter(Email.domain_id == domain_id)
+        if after_id is not None:
+            query = query.filter(Email.id > after_id)
+        
+        # Fetch one extra row to know whether another page follows
+        emails = query.order_by(Email.id).limit(limit + 1).all()
+        has_more = len(emails) > limit
+        emails = emails[:limit]
+        
+        return {
+            'domain': domain,
+            'emails': [serialize_email(email) for email in emails],
+            'count': len(emails),
+            'next_after_id': emails[-1].id if has_more else None
+        }
+    
+    def stream_emails(self, domain_id, after_id):
+        """Stream a domain's emails as NDJSON from a server-side cursor."""
+        query = Email.query.filter(Email.domain_id == domain_id)
+        if after_id is not None:
+            query = query.filter(Email.id > after_id)
+        query = query.order_by(Email.id).yield_per(current_app.config['API_STREAM_BATCH_SIZE'])
+        
+        def generate():
+            for email in query:
+                yield dumps_json(dict(serialize_email(email), id=email.id)) + b'\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 class EmailFindAPI(Resource):
     @api_key_required
@@ -171,13 +281,12 @@ class EmailFindAPI(Resource):
         if not first_name and not last_name:
             return {'message': 'First name or last name is required'}, 400
         
-        # Record the search
+        # Record the search; added after the lookup, see DomainSearchAPI
         search_record = Search(
             user_id=g.user.id,
             query=f"{first_name} {last_name} - {domain}",
             search_type='email'
         )
-        db.session.add(search_record)
         
         # Check if domain exists
         domain_obj = Domain.query.filter_by(domain_name=domain).first()
@@ -187,8 +296,8 @@ class EmailFindAPI(Resource):
             db.session.commit()
         
         try:
-            email_finder = EmailFinder(domain)
-            email_data = email_finder.find_email(
+            email_data = find_person_email(
+                domain_obj,
                 first_name=first_name,
                 last_name=last_name,
                 position=position,
@@ -196,23 +305,14 @@ class EmailFindAPI(Resource):
             )
             
             if email_data and 'email' in email_data:
-                # Check if email already exists
+                # The lookup has already stored the email
                 email_obj = Email.query.filter_by(email_address=email_data['email']).first()
                 
-                if not email_obj:
-                    email_obj = Email(
-                        email_address=email_data['email'],
-                        first_name=first_name,
-                        last_name=last_name,
-                        position=position,
-                        confidence_score=email_data.get('confidence', 0.0),
-                        domain_id=domain_obj.id
-                    )
-                    db.session.add(email_obj)
-                    
-                    # Update search record
-                    search_record.results_count = 1
-                    db.session.commit()
+                # Update search record
+                search_record.results_count = 1
+                db.session.add(search_record)
+                record_saved_email(g.user.id, email_obj.id)
+                db.session.commit()
                 
                 return {
                     'email': email_obj.email_address,
@@ -223,6 +323,8 @@ class EmailFindAPI(Resource):
                     'verified': email_obj.is_verified
                 }
             else:
+                db.session.add(search_record)
+                db.session.commit()
                 return {'message': 'No email found'}, 404
                 
         except Exception as e:
@@ -238,6 +340,14 @@ class EmailVerifyAPI(Resource):
         if not validators.email(email_address):
             return {'message': 'Invalid email format'}, 400
         
+        cached_result = get_verification(email_address)
+        if cached_result is not None:
+            search_log.record(g.user.id, email_address, 'verify')
+            return {
+                'email': email_address,
+                'is_valid': cached_result
+            }
+        
         # Record the verification attempt
         search_record = Search(
             user_id=g.user.id,
@@ -255,8 +365,11 @@ class EmailVerifyAPI(Resource):
             email_obj = Email.query.filter_by(email_address=email_address).first()
             if email_obj:
                 email_obj.is_verified = verification_result
+                invalidate_email(email_obj)
                 db.session.commit()
             
+            set_verification(email_address, verification_result)
+            
             return {
                 'email': email_address,
                 'is_valid': verification_result
@@ -266,10 +379,110 @@ class EmailVerifyAPI(Resource):
             current_app.logger.error(f"API error verifying email {email_address}: {str(e)}")
             return {'message': f'Error verifying email: {str(e)}'}, 500
 
+class DomainExportAPI(Resource):
+    @api_key_required
+    def get(self):
+        args = export_parser.parse_args()
+        
+        # Extract domain from URL if provided
+        ext = tldextract.extract(args['domain'])
+        domain = f"{ext.domain}.{ext.suffix}"
+        
+        domain_obj = Domain.query.filter_by(domain_name=domain).first()
+        if not domain_obj:
+            # A domain searched moments ago may not have reached the replica yet
+            use_primary()
+            domain_obj = Domain.query.filter_by(domain_name=domain).first()
+        if not domain_obj:
+            return {'message': 'Domain not found'}, 404
+        
+        return stream_export(domain_email_rows(domain_obj.id), args['format'], domain)
+
+class SavedEmailsExportAPI(Resource):
+    @api_key_required
+    def get(self):
+        args = saved_export_parser.parse_args()
+        return stream_export(saved_email_rows(g.user.id), args['format'], 'saved-emails')
+
+class PeopleSearchAPI(Resource):
+    @api_key_required
+    def get(self):
+        args = people_search_parser.parse_args()
+        page = args['page']
+        per_page = args['per_page']
+        
+        if page < 1 or (per_page is not None and per_page < 1):
+            return {'message': 'Page and per_page must be positive integers'}, 400
+        
+        try:
+            found = search_people(args['q'], page=page, per_page=per_page)
+        except Exception as e:
+            current_app.logger.error(f"API error searching people for {args['q']!r}: {str(e)}")
+            return {'message': f'Error searching people: {str(e)}'}, 500
+        
+        return {
+            'query': args['q'],
+            'page': page,
+            'results': [
+                dict(
+                    serialize_email(email),
+                    domain=email.domain.domain_name if email.domain else None,
+                    company=email.domain.company_name if email.domain else None,
+                    score=score
+                ) for email, score in found['results']
+            ],
+            'has_more': found['has_more']
+        }
+
+class BulkJobsAPI(Resource):
+    @api_key_required
+    def post(self):
+        upload = request.files.get('file')
+        if upload is None or not upload.filename:
+            return {'message': 'A CSV file is required'}, 400
+        
+        job_type = request.form.get('type') or None
+        if job_type not in (None, 'verify', 'find'):
+            return {'message': "Job type must be 'verify' or 'find'"}, 400
+        
+        try:
+            job = create_job(g.user.id, upload, job_type)
+        except BulkJobError as e:
+            return {'message': str(e)}, 400
+        
+        return job.to_dict(), 202
+
+class BulkJobAPI(Resource):
+    @api_key_required
+    def get(self, job_id):
+        job = BulkJob.query.filter_by(id=job_id, user_id=g.user.id).first()
+        if not job:
+            return {'message': 'Job not found'}, 404
+        
+        return job.to_dict()
+
+class BulkJobDownloadAPI(Resource):
+    @api_key_required
+    def get(self, job_id):
+        job = BulkJob.query.filter_by(id=job_id, user_id=g.user.id).first()
+        if not job:
+            return {'message': 'Job not found'}, 404
+        if job.status != 'completed':
+            return {'message': 'Job has not finished', 'status': job.status}, 409
+        
+        return send_file(job.output_path, mimetype='text/csv', as_attachment=True,
+                         download_name=f'results-{job.id}.csv')
+
 # Register API resources
 api.add_resource(DomainSearch, '/domain/search')
 api.add_resource(EmailFindAPI, '/email/find')
 api.add_resource(EmailVerifyAPI, '/email/verify')
+api.add_resource(DomainExportAPI, '/domain/export')
+api.add_resource(SavedEmailsExportAPI, '/saved-emails/export')
+api.add_resource(PeopleSearchAPI, '/people/search')
+api.add_resource(BulkJobsAPI, '/bulk')
+api.add_resource(BulkJobAPI, '/bulk/<int:job_id>')
+api.add_resource(BulkJobDownloadAPI, '/bulk/<int:job_id>/download')
 
 # Simple endpoint for API status check
 @api_bp.route('/status')
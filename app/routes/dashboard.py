@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template
+from datetime import datetime
+
+from flask import Blueprint, render_template, request, current_app
 from flask_login import login_required, current_user
-from app.models import Search, Domain, Email
-from sqlalchemy import func
+from sqlalchemy import and_, or_
+from app.models import Search, Domain, Email, UserDomain, UserSavedEmail
 from app import db
+from app.services.user_stats import get_user_stats
+from app.services.exports import EXPORT_FORMATS, saved_email_rows, stream_export
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
@@ -11,23 +15,18 @@ dashboard_bp = Blueprint('dashboard', __name__)
 @login_required
 def index():
     # Get recent searches
-    recent_searches = Search.query.filter_by(user_id=current_user.id).order_by(
+    recent_searches = db.session.query(Search).filter_by(user_id=current_user.id).order_by(
         Search.created_at.desc()
     ).limit(10).all()
     
     # Get some usage statistics
-    search_count = Search.query.filter_by(user_id=current_user.id).count()
-    
-    # Get the number of emails found in searches
-    email_count = db.session.query(func.sum(Search.results_count)).filter_by(
-        user_id=current_user.id
-    ).scalar() or 0
+    stats = get_user_stats(current_user.id)
     
     context = {
         'title': 'Dashboard',
         'recent_searches': recent_searches,
-        'search_count': search_count,
-        'email_count': email_count
+        'search_count': stats.search_count,
+        'email_count': stats.results_count
     }
     
     return render_template('dashboard/index.html', **context)
@@ -35,52 +34,87 @@ def index():
 @dashboard_bp.route('/search-history')
 @login_required
 def search_history():
-    searches = Search.query.filter_by(user_id=current_user.id).order_by(
-        Search.created_at.desc()
-    ).all()
+    page_size = current_app.config['HISTORY_PAGE_SIZE']
+    before_id = request.args.get('before', type=int)
+    before_at = request.args.get('before_at', type=datetime.fromisoformat)
+    
+    # Keyset pagination on (created_at, id), newest first. The ID alone is not
+    # a cursor: buffered cache-hit searches are written with their original
+    # created_at after rows with higher IDs.
+    query = db.session.query(Search).filter_by(user_id=current_user.id)
+    if before_id and before_at:
+        query = query.filter(or_(
+            Search.created_at < before_at,
+            and_(Search.created_at == before_at, Search.id < before_id)
+        ))
+    searches = query.order_by(
+        Search.created_at.desc(), Search.id.desc()
+    ).limit(page_size + 1).all()
+    
+    next_before = None
+    if len(searches) > page_size:
+        searches = searches[:page_size]
+        next_before = {'before': searches[-1].id, 'before_at': searches[-1].created_at.isoformat()}
     
     return render_template('dashboard/search_history.html', 
                           title='Search History',
-                          searches=searches)
+                          searches=searches,
+                          next_before=next_before)
 
 @dashboard_bp.route('/domains')
 @login_required
 def domains():
-    # Get domains from the user's searches
-    # This is a simplified approach and would need to be refined
-    search_domains = db.session.query(Search.query).filter(
-        Search.user_id == current_user.id,
-        Search.search_type == 'domain'
-    ).distinct().all()
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = current_app.config['DASHBOARD_PAGE_SIZE']
+    
+    # Domains the user has searched, newest first, in a single join
+    rows = db.session.query(Domain, UserDomain.created_at).join(
+        UserDomain, UserDomain.domain_id == Domain.id
+    ).filter(
+        UserDomain.user_id == current_user.id
+    ).order_by(
+        UserDomain.created_at.desc()
+    ).offset((page - 1) * page_size).limit(page_size + 1).all()
     
-    domain_objects = []
-    for domain_query in search_domains:
-        domain = Domain.query.filter_by(domain_name=domain_query[0]).first()
-        if domain:
-            domain_objects.append(domain)
+    has_next = len(rows) > page_size
     
     return render_template('dashboard/domains.html',
                           title='Domains',
-                          domains=domain_objects)
+                          domains=rows[:page_size],
+                          page=page,
+                          has_next=has_next)
 
 @dashboard_bp.route('/saved-emails')
 @login_required
 def saved_emails():
-    # In a real implementation, you'd have a user_emails table
-    # This is a placeholder implementation
+    page = max(request.args.get('page', 1, type=int), 1)
+    page_size = current_app.config['DASHBOARD_PAGE_SIZE']
     
-    # Get all emails from domains the user has searched
-    user_searches = Search.query.filter_by(
-        user_id=current_user.id,
-        search_type='domain'
-    ).all()
+    # Emails saved from the user's searches, newest first, in a single join
+    rows = db.session.query(Email, Domain.domain_name, UserSavedEmail.created_at).join(
+        UserSavedEmail, UserSavedEmail.email_id == Email.id
+    ).outerjoin(
+        Domain, Domain.id == Email.domain_id
+    ).filter(
+        UserSavedEmail.user_id == current_user.id
+    ).order_by(
+        UserSavedEmail.created_at.desc()
+    ).offset((page - 1) * page_size).limit(page_size + 1).all()
     
-    domain_names = [search.query for search in user_searches]
-    domains = Domain.query.filter(Domain.domain_name.in_(domain_names)).all()
-    
-    domain_ids = [domain.id for domain in domains]
-    emails = Email.query.filter(Email.domain_id.in_(domain_ids)).all()
+    has_next = len(rows) > page_size
     
     return render_template('dashboard/saved_emails.html',
                           title='Saved Emails',
-                          emails=emails)
\ No newline at end of file
+                          emails=rows[:page_size],
+                          page=page,
+                          has_next=has_next)
+
+
+@dashboard_bp.route('/saved-emails/export')
+@login_required
+def saved_emails_export():
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    
+    return stream_export(saved_email_rows(current_user.id), export_format, 'saved-emails')
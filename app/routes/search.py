@@ -1,15 +1,21 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for
+from flask import Blueprint, render_template, request, jsonify, current_app, flash, redirect, url_for, send_file
 from flask_login import login_required, current_user
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, SubmitField, SelectField
 from wtforms.validators import DataRequired, Optional, ValidationError
 import validators
 import tldextract
 
 from app import db, cache
-from app.models import Search, Domain, Email
-from app.services.email_finder import EmailFinder
+from app.models import Search, Domain, Email, BulkJob
 from app.services.email_verifier import EmailVerifier
+from app.services.bulk_jobs import create_job, BulkJobError
+from app.services.db_routing import use_primary
+from app.services.exports import EXPORT_FORMATS, domain_email_rows, stream_export
+from app.services.domain_search import search_domain_emails, find_person_email
+from app.services.user_library import record_domain_search, record_saved_email
+from app.services.result_cache import get_domain_results, set_domain_results, invalidate_email
 
 search_bp = Blueprint('search', __name__)
 
@@ -41,6 +47,15 @@ class EmailFinderForm(FlaskForm):
     ], validators=[Optional()])
     submit = SubmitField('Find Email')
 
+class BulkUploadForm(FlaskForm):
+    file = FileField('CSV File', validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only.')])
+    job_type = SelectField('Job Type', choices=[
+        ('', 'Auto-detect'),
+        ('verify', 'Verify emails (email column)'),
+        ('find', 'Find emails (domain, first_name, last_name columns)')
+    ], validators=[Optional()])
+    submit = SubmitField('Upload')
+
 @search_bp.route('/search', methods=['GET', 'POST'])
 @login_required
 def search():
@@ -65,7 +80,9 @@ def search():
         if not domain_obj:
             domain_obj = Domain(domain_name=domain)
             db.session.add(domain_obj)
+            db.session.flush()
         
+        record_domain_search(current_user.id, domain_obj.id)
         db.session.commit()
         
         return redirect(url_for('search.domain_results', domain=domain))
@@ -100,6 +117,14 @@ def search():
 @search_bp.route('/domain/<domain>')
 @login_required
 def domain_results(domain):
+    # Serve popular domains straight from the result cache
+    cached = get_domain_results(domain)
+    if cached is not None:
+        return render_template('search/domain_results.html',
+                              title=f'Results for {domain}',
+                              domain=cached['domain'],
+                              emails=cached['emails'])
+    
     # Check if the domain exists in our database
     domain_obj = Domain.query.filter_by(domain_name=domain).first()
     
@@ -113,44 +138,49 @@ def domain_results(domain):
     # If we don't have emails yet, try to find them
     if not emails:
         try:
-            email_finder = EmailFinder(domain)
-            found_emails = email_finder.find_bulk_emails()
-            
-            # Store the found emails
-            for email_data in found_emails:
-                email = Email(
-                    email_address=email_data['email'],
-                    first_name=email_data.get('first_name'),
-                    last_name=email_data.get('last_name'),
-                    position=email_data.get('position'),
-                    confidence_score=email_data.get('confidence', 0.0),
-                    domain_id=domain_obj.id
-                )
-                db.session.add(email)
+            # Concurrent searches for this domain share a single crawl
+            emails = search_domain_emails(domain_obj)
             
             # Update the search record with the number of results
-            search_record = Search.query.filter_by(
+            search_record = db.session.query(Search).filter_by(
                 user_id=current_user.id,
                 query=domain,
                 search_type='domain'
             ).order_by(Search.created_at.desc()).first()
             
             if search_record:
-                search_record.results_count = len(found_emails)
-                db.session.commit()
+                search_record.results_count = len(emails)
             
-            # Get the newly added emails
-            emails = Email.query.filter_by(domain_id=domain_obj.id).all()
+            record_domain_search(current_user.id, domain_obj.id, refresh=True)
+            db.session.commit()
             
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f"Error finding emails for {domain}: {str(e)}")
             flash(f"An error occurred while searching for emails on {domain}.", "danger")
     
+    set_domain_results(domain_obj, emails)
+    
     return render_template('search/domain_results.html',
                           title=f'Results for {domain}',
                           domain=domain_obj,
                           emails=emails)
 
+@search_bp.route('/domain/<domain>/export')
+@login_required
+def domain_export(domain):
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        export_format = 'csv'
+    
+    domain_obj = Domain.query.filter_by(domain_name=domain).first()
+    if not domain_obj:
+        # A domain searched moments ago may not have reached the replica yet
+        use_primary()
+        domain_obj = Domain.query.filter_by(domain_name=domain).first_or_404()
+    
+    return stream_export(domain_email_rows(domain_obj.id), export_format, domain_obj.domain_name)
+
 @search_bp.route('/email-finder')
 @login_required
 def email_finder():
@@ -172,8 +202,8 @@ def email_finder():
         db.session.commit()
     
     try:
-        email_finder = EmailFinder(domain)
-        email_data = email_finder.find_email(
+        email_data = find_person_email(
+            domain_obj,
             first_name=first_name,
             last_name=last_name,
             position=position,
@@ -181,36 +211,28 @@ def email_finder():
         )
         
         if email_data and 'email' in email_data:
-            # Check if email already exists
+            # The lookup has already stored the email
             email_obj = Email.query.filter_by(email_address=email_data['email']).first()
             
-            if not email_obj:
-                email_obj = Email(
-                    email_address=email_data['email'],
-                    first_name=first_name,
-                    last_name=last_name,
-                    position=position,
-                    confidence_score=email_data.get('confidence', 0.0),
-                    domain_id=domain_obj.id
-                )
-                db.session.add(email_obj)
-                
-                # Update search record
-                search_record = Search.query.filter_by(
-                    user_id=current_user.id,
-                    query=f"{first_name} {last_name} - {domain}",
-                    search_type='email'
-                ).order_by(Search.created_at.desc()).first()
-                
-                if search_record:
-                    search_record.results_count = 1
-                    db.session.commit()
-                
+            # Update search record
+            search_record = db.session.query(Search).filter_by(
+                user_id=current_user.id,
+                query=f"{first_name} {last_name} - {domain}",
+                search_type='email'
+            ).order_by(Search.created_at.desc()).first()
+            
+            if search_record:
+                search_record.results_count = 1
+            
+            record_saved_email(current_user.id, email_obj.id)
+            db.session.commit()
+            
             # Verify the email if it hasn't been verified
             if not email_obj.is_verified:
                 verifier = EmailVerifier()
                 is_valid = verifier.verify_email(email_obj.email_address)
                 email_obj.is_verified = is_valid
+                invalidate_email(email_obj)
                 db.session.commit()
             
             return render_template('search/email_result.html',
@@ -235,9 +257,49 @@ def verify_email(email_id):
     is_valid = verifier.verify_email(email.email_address)
     
     email.is_verified = is_valid
+    invalidate_email(email)
     db.session.commit()
     
     return jsonify({
         'id': email.id,
         'is_verified': email.is_verified
-    })
\ No newline at end of file
+    })
+
+@search_bp.route('/bulk', methods=['GET', 'POST'])
+@login_required
+def bulk():
+    form = BulkUploadForm()
+    
+    if form.validate_on_submit():
+        try:
+            job = create_job(current_user.id, form.file.data, form.job_type.data or None)
+            flash(f"Bulk job #{job.id} queued with {job.total_rows} rows.", "success")
+            return redirect(url_for('search.bulk'))
+        except BulkJobError as e:
+            flash(str(e), "danger")
+    
+    jobs = BulkJob.query.filter_by(user_id=current_user.id).order_by(
+        BulkJob.created_at.desc()
+    ).limit(20).all()
+    
+    return render_template('search/bulk.html',
+                          title='Bulk Upload',
+                          form=form,
+                          jobs=jobs)
+
+@search_bp.route('/bulk/<int:job_id>/status')
+@login_required
+def bulk_status(job_id):
+    job = BulkJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    return jsonify(job.to_dict())
+
+@search_bp.route('/bulk/<int:job_id>/download')
+@login_required
+def bulk_download(job_id):
+    job = BulkJob.query.filter_by(id=job_id, user_id=current_user.id).first_or_404()
+    if job.status != 'completed':
+        flash("This job has not finished yet.", "warning")
+        return redirect(url_for('search.bulk'))
+    
+    return send_file(job.output_path, mimetype='text/csv', as_attachment=True,
+                     download_name=f'results-{job.id}.csv')
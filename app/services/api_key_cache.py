@@ -0,0 +1,83 @@
+import hashlib
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import cache, db
+from app.services.metrics import record_cache
+
+_PENDING_KEY = 'api_key_cache_invalidate'
+
+# Minimal user record kept in the cache for API authentication
+ApiUser = namedtuple('ApiUser', ['id', 'username'])
+
+
+def _cache_key(api_key):
+    """Build the cache key from a hash so raw API keys never reach the cache."""
+    digest = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+    return f'apikey:{digest}'
+
+
+def get_api_user(api_key):
+    """
+    Resolve an API key to its user, using the cache before the database.
+
+    Args:
+        api_key (str): The API key sent by the client
+
+    Returns:
+        ApiUser: The user record, or None if the key is invalid
+    """
+    from app.models import User
+
+    key = _cache_key(api_key)
+    cached = cache.get(key)
+    record_cache('api_key', cached is not None)
+    if cached is not None:
+        return ApiUser(*cached)
+
+    user = User.query.filter_by(api_key=api_key).first()
+    if not user:
+        return None
+
+    record = ApiUser(user.id, user.username)
+    cache.set(key, tuple(record), timeout=current_app.config.get('API_KEY_CACHE_TIMEOUT', 60))
+    return record
+
+
+def invalidate_api_key(api_key):
+    """
+    Drop a cached API key, e.g. after it has been rotated.
+
+    Args:
+        api_key (str): The API key to forget
+    """
+    if api_key:
+        cache.delete(_cache_key(api_key))
+
+
+def invalidate_api_key_on_commit(api_key):
+    """
+    Drop a cached API key once the current transaction commits.
+
+    Invalidating before the commit would let a concurrent request re-cache
+    the old key from the still-uncommitted row.
+
+    Args:
+        api_key (str): The API key to forget
+    """
+    if api_key:
+        db.session.info.setdefault(_PENDING_KEY, set()).add(api_key)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    for api_key in session.info.pop(_PENDING_KEY, None) or ():
+        invalidate_api_key(api_key)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,409 @@
+import csv
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait as wait_for
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+
+import tldextract
+from flask import current_app
+from sqlalchemy import func
+
+from app import db
+from app.models import BulkJob
+from app.services.email_finder import EmailFinder
+from app.services.email_verifier import EmailVerifier
+from app.services.metrics import BULK_JOBS_IN_FLIGHT
+from app.services.periodic import PeriodicTask
+from app.services.rate_limiter import rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Bytes copied per read while saving an upload
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+OUTPUT_COLUMNS = {
+    'verify': ['email', 'is_valid'],
+    'find': ['domain', 'first_name', 'last_name', 'email', 'confidence', 'source']
+}
+
+# Accepted header spellings, mapped to the names used internally
+COLUMN_ALIASES = {
+    'email': 'email',
+    'email_address': 'email',
+    'domain': 'domain',
+    'website': 'domain',
+    'first_name': 'first_name',
+    'firstname': 'first_name',
+    'first': 'first_name',
+    'last_name': 'last_name',
+    'lastname': 'last_name',
+    'last': 'last_name'
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+_sweeper = None
+
+
+class BulkJobError(ValueError):
+    """Raised when an uploaded file cannot be processed."""
+
+
+class _LostJob(Exception):
+    """Raised in a run whose job was handed to another run."""
+
+
+def _normalize_header(header):
+    key = header.strip().lower().replace(' ', '_').replace('-', '_')
+    return COLUMN_ALIASES.get(key, key)
+
+
+def detect_job_type(columns):
+    """
+    Work out the job type from a CSV header.
+
+    Args:
+        columns (list): Normalized column names
+
+    Returns:
+        str: 'verify' or 'find', or None if the columns fit neither
+    """
+    if 'domain' in columns and ('first_name' in columns or 'last_name' in columns):
+        return 'find'
+    if 'email' in columns:
+        return 'verify'
+    return None
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=current_app.config['BULK_WORKERS'],
+                thread_name_prefix='bulk-job'
+            )
+        return _executor
+
+
+def create_job(user_id, file_storage, job_type=None):
+    """
+    Save an uploaded CSV to disk in chunks and queue it for processing.
+
+    Args:
+        user_id (int): The uploading user's ID
+        file_storage (FileStorage): The uploaded file
+        job_type (str): 'verify' or 'find'; detected from the header if omitted
+
+    Each row counts as one request against the user's MAX_REQUESTS_PER_DAY.
+
+    Returns:
+        BulkJob: The queued job
+
+    Raises:
+        BulkJobError: If the file is empty, its columns do not fit the job
+            type, or it has more rows than the user has requests left today
+    """
+    upload_dir = current_app.config['BULK_UPLOAD_DIR']
+    os.makedirs(upload_dir, exist_ok=True)
+
+    token = uuid.uuid4().hex
+    input_path = os.path.join(upload_dir, f'{token}.csv')
+    output_path = os.path.join(upload_dir, f'{token}.result.csv')
+
+    # Stream the upload to disk, counting lines for progress reporting
+    line_count = 0
+    with open(input_path, 'wb') as dst:
+        while True:
+            chunk = file_storage.stream.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            line_count += chunk.count(b'\n')
+            dst.write(chunk)
+
+    with open(input_path, newline='', encoding='utf-8-sig', errors='replace') as src:
+        header = next(csv.reader(src), None)
+
+    if not header:
+        os.remove(input_path)
+        raise BulkJobError('The uploaded file is empty')
+
+    columns = [_normalize_header(column) for column in header]
+    detected = detect_job_type(columns)
+    if job_type is None:
+        job_type = detected
+
+    if job_type not in OUTPUT_COLUMNS or (job_type == 'find' and detected != 'find') or \
+            (job_type == 'verify' and 'email' not in columns):
+        os.remove(input_path)
+        raise BulkJobError('CSV needs an "email" column, or "domain" with "first_name"/"last_name" columns')
+
+    total_rows = max(line_count - 1, 0)
+    if total_rows:
+        status = rate_limiter.hit(user_id, cost=total_rows)
+        if not status.allowed:
+            os.remove(input_path)
+            raise BulkJobError(f'The file has {total_rows} rows but only {status.remaining} '
+                               f'requests are left today')
+
+    job = BulkJob(
+        user_id=user_id,
+        job_type=job_type,
+        status='queued',
+        filename=os.path.basename(file_storage.filename or 'upload.csv'),
+        input_path=input_path,
+        output_path=output_path,
+        total_rows=total_rows
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _get_executor().submit(run_job, app, job.id)
+    return job
+
+
+def _verify_row(verifier, row):
+    email = (row.get('email') or '').strip()
+    try:
+        is_valid = verifier.verify_email(email) if email else False
+    except Exception as e:
+        logger.warning(f"Error verifying {email}: {str(e)}")
+        is_valid = False
+    return [email, is_valid]
+
+
+def _find_row(pattern_for, row):
+    domain = (row.get('domain') or '').strip()
+    first_name = (row.get('first_name') or '').strip() or None
+    last_name = (row.get('last_name') or '').strip() or None
+
+    ext = tldextract.extract(domain)
+    domain = f"{ext.domain}.{ext.suffix}" if ext.suffix else domain
+    if not domain or (not first_name and not last_name):
+        return [domain, first_name, last_name, None, None, None]
+
+    try:
+        finder = EmailFinder(domain)
+        result = finder.find_email(
+            first_name=first_name,
+            last_name=last_name,
+            pattern=pattern_for(domain)
+        )
+    except Exception as e:
+        logger.warning(f"Error finding email for {first_name} {last_name} at {domain}: {str(e)}")
+        result = None
+
+    if not result:
+        return [domain, first_name, last_name, None, None, None]
+    return [domain, first_name, last_name, result.email, result.confidence, result.source]
+
+
+def _update_job(job_id, owner, **values):
+    """Update a job this run holds; returns False if another run took it over."""
+    table = BulkJob.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.update().where(
+            table.c.id == job_id,
+            table.c.owner == owner,
+            table.c.status == 'running'
+        ).values(heartbeat_at=datetime.utcnow(), **values))
+    return result.rowcount == 1
+
+
+def _keep_alive(app, job_id, owner, stop):
+    with app.app_context():
+        while not stop.wait(app.config['BULK_HEARTBEAT_SECONDS']):
+            try:
+                if not _update_job(job_id, owner):
+                    logger.warning(f"Bulk job {job_id} was taken over by another run")
+                    return
+            except Exception as e:
+                logger.error(f"Error recording heartbeat for bulk job {job_id}: {str(e)}")
+
+
+def _finish(job_id, owner, part_path, output_path, **values):
+    """
+    Record a finished run and publish its output, unless the job was taken over.
+
+    The file is moved into place inside the transaction that holds the job's
+    row, so a run that has lost the job never overwrites the new run's output.
+    """
+    table = BulkJob.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.update().where(
+            table.c.id == job_id,
+            table.c.owner == owner,
+            table.c.status == 'running'
+        ).values(updated_at=datetime.utcnow(), **values))
+        if result.rowcount == 1 and values.get('status') == 'completed':
+            os.replace(part_path, output_path)
+    return result.rowcount == 1
+
+
+def run_job(app, job_id):
+    """
+    Process a bulk job, streaming rows from the input CSV to the result CSV.
+
+    Rows are handled in fixed-size batches, so memory use does not grow with
+    the size of the file. A heartbeat thread marks the job as alive while it
+    runs. Each run writes to its own file and checks that it still holds the
+    job before every batch, so a run that was declared abandoned and
+    resumed elsewhere stops instead of writing alongside the new run.
+
+    Args:
+        app (Flask): The application, for an app context in the worker thread
+        job_id (int): The job to run
+    """
+    with app.app_context(), BULK_JOBS_IN_FLIGHT.track_inprogress():
+        # Claim the job, so a job resumed by several processes only runs once
+        owner = uuid.uuid4().hex
+        claimed = db.session.query(BulkJob).filter_by(id=job_id, status='queued').update(
+            {BulkJob.status: 'running', BulkJob.processed_rows: 0,
+             BulkJob.owner: owner, BulkJob.heartbeat_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not claimed:
+            return
+        job = db.session.get(BulkJob, job_id)
+        part_path = f'{job.output_path}.{owner}.part'
+
+        batch_size = app.config['BULK_BATCH_SIZE']
+        verifier = EmailVerifier(timeout=app.config['SMTP_TIMEOUT'])
+
+        @lru_cache(maxsize=app.config['BULK_PATTERN_CACHE_SIZE'])
+        def pattern_for(domain):
+            # Detect each domain's pattern once per job instead of once per row
+            return EmailFinder(domain).get_common_email_pattern()
+
+        if job.job_type == 'verify':
+            process_row = partial(_verify_row, verifier)
+        else:
+            process_row = partial(_find_row, pattern_for)
+
+        def write_batch(writer, pool, batch):
+            rows = list(pool.map(process_row, batch))
+            if not _update_job(job_id, owner, processed_rows=processed + len(batch)):
+                raise _LostJob()
+            writer.writerows(rows)
+            return len(batch)
+
+        stop = threading.Event()
+        keep_alive = threading.Thread(
+            target=_keep_alive, args=(app, job_id, owner, stop), daemon=True
+        )
+        keep_alive.start()
+
+        processed = 0
+        try:
+            with open(job.input_path, newline='', encoding='utf-8-sig', errors='replace') as src, \
+                    open(part_path, 'w', newline='', encoding='utf-8') as dst, \
+                    ThreadPoolExecutor(max_workers=app.config['BULK_BATCH_CONCURRENCY']) as pool:
+                reader = csv.DictReader(src)
+                reader.fieldnames = [_normalize_header(column) for column in reader.fieldnames or []]
+
+                writer = csv.writer(dst)
+                writer.writerow(OUTPUT_COLUMNS[job.job_type])
+
+                batch = []
+                for row in reader:
+                    batch.append(row)
+                    if len(batch) < batch_size:
+                        continue
+
+                    processed += write_batch(writer, pool, batch)
+                    batch = []
+
+                if batch:
+                    processed += write_batch(writer, pool, batch)
+
+            finished = _finish(job_id, owner, part_path, job.output_path,
+                               status='completed', processed_rows=processed, total_rows=processed)
+        except _LostJob:
+            finished = False
+        except Exception as e:
+            logger.error(f"Bulk job {job_id} failed: {str(e)}")
+            db.session.rollback()
+            finished = _finish(job_id, owner, part_path, job.output_path,
+                               status='failed', error=str(e), processed_rows=processed)
+        finally:
+            stop.set()
+
+        if not finished:
+            logger.info(f"Bulk job {job_id} was taken over by another run; stopped this one")
+        if os.path.exists(part_path):
+            os.remove(part_path)
+
+
+def resume_stale_jobs(app, stale_after=None, wait=False):
+    """
+    Queue again the jobs a stopped process left behind.
+
+    Jobs only run on the executor of the process that accepted them, so a
+    restart leaves them 'queued' or 'running' forever. A running job counts
+    as abandoned once its heartbeat is `stale_after` seconds old, and a
+    queued one once it has waited that long; running it again is harmless
+    because only one run can claim it. Abandoned jobs start over from the
+    first row.
+
+    Args:
+        app (Flask): The application
+        stale_after (int): Seconds without an update; BULK_STALE_SECONDS if omitted
+        wait (bool): Return only once the jobs have finished, e.g. from the CLI
+
+    Returns:
+        list: IDs of the jobs queued again
+    """
+    stale_after = stale_after if stale_after is not None else app.config['BULK_STALE_SECONDS']
+    cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+
+    with app.app_context():
+        stale = (
+            ((BulkJob.status == 'queued') & (BulkJob.updated_at < cutoff)) |
+            ((BulkJob.status == 'running') & (func.coalesce(BulkJob.heartbeat_at, BulkJob.updated_at) < cutoff))
+        )
+        job_ids = [job_id for job_id, in db.session.query(BulkJob.id).filter(stale).order_by(BulkJob.id)]
+        if not job_ids:
+            return []
+
+        # Clearing the owner stops a run that is still alive but lost its heartbeat
+        db.session.query(BulkJob).filter(BulkJob.id.in_(job_ids), stale).update(
+            {BulkJob.status: 'queued', BulkJob.owner: None, BulkJob.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.session.commit()
+
+        executor = _get_executor()
+        futures = [executor.submit(run_job, app, job_id) for job_id in job_ids]
+
+    logger.info(f"Resumed {len(job_ids)} abandoned bulk jobs")
+    if wait:
+        wait_for(futures)
+    return job_ids
+
+
+def init_app(app):
+    """
+    Resume abandoned jobs from each process that serves requests.
+
+    Every BULK_SWEEP_SECONDS a background thread re-queues jobs whose process
+    stopped. The thread starts with the first request rather than at import,
+    so CLI commands that build the app do not pick up jobs they would never
+    finish.
+
+    Args:
+        app (Flask): The Flask application
+    """
+    global _sweeper
+    if not app.config.get('BULK_RESUME_ON_STARTUP', True):
+        return
+
+    _sweeper = PeriodicTask(partial(resume_stale_jobs, app), 'bulk-job-sweeper', app.config['BULK_SWEEP_SECONDS'])
+
+    @app.before_request
+    def _start_bulk_job_sweeper():
+        _sweeper.start()
@@ -0,0 +1,199 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import requests
+from flask import current_app, has_app_context
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Where a domain's pages are actually served from
+CanonicalHost = namedtuple('CanonicalHost', ['base_url', 'redirect_chain', 'tls_ok', 'checked_at'])
+
+# Used when there is no app context, e.g. in benchmarks
+DEFAULT_TTL = timedelta(days=7)
+DEFAULT_CACHE_SIZE = 10000
+
+PROBE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Least recently used domains are dropped first once the cache is full
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _ttl():
+    if has_app_context():
+        return timedelta(hours=current_app.config['CANONICAL_HOST_TTL_HOURS'])
+    return DEFAULT_TTL
+
+
+def _cache_size():
+    if has_app_context():
+        return current_app.config['CANONICAL_HOST_CACHE_SIZE']
+    return DEFAULT_CACHE_SIZE
+
+
+def _fresh(record):
+    return record is not None and datetime.utcnow() - record.checked_at < _ttl()
+
+
+def probe_urls(domain):
+    """URLs tried, in order of preference, to find a domain's canonical host."""
+    return [
+        f'https://{domain}',
+        f'https://www.{domain}',
+        f'http://{domain}',
+        f'http://www.{domain}'
+    ]
+
+
+def resolve_canonical_host(domain, timeout=10):
+    """
+    Find the scheme and host that actually serve a domain's pages.
+
+    Tries HTTPS before HTTP and the apex before www, following redirects.
+    Only headers are read.
+
+    Args:
+        domain (str): The domain
+        timeout (int): Timeout in seconds per probe
+
+    Returns:
+        CanonicalHost: The first host that answers, or None if none do
+    """
+    for url in probe_urls(domain):
+        try:
+            with requests.get(url, headers=PROBE_HEADERS, timeout=timeout, stream=True) as response:
+                if response.status_code >= 400:
+                    continue
+                chain = [r.url for r in response.history]
+                final_url = response.url if chain else url
+        except requests.RequestException as e:
+            logger.debug(f"Probe of {url} failed: {str(e)}")
+            continue
+
+        parts = urlsplit(final_url)
+        base_url = f'{parts.scheme}://{parts.netloc}' if chain else url
+        return CanonicalHost(
+            base_url=base_url,
+            redirect_chain=chain + [final_url] if chain else [],
+            tls_ok=parts.scheme == 'https',
+            checked_at=datetime.utcnow()
+        )
+    return None
+
+
+def _load(domain):
+    from app.models import Domain
+
+    row = db.session.query(
+        Domain.canonical_url, Domain.redirect_chain, Domain.tls_ok, Domain.canonical_checked_at
+    ).filter(Domain.domain_name == domain).first()
+    if row is None or not row.canonical_url or row.canonical_checked_at is None:
+        return None
+    return CanonicalHost(
+        base_url=row.canonical_url,
+        redirect_chain=json.loads(row.redirect_chain or '[]'),
+        tls_ok=row.tls_ok,
+        checked_at=row.canonical_checked_at
+    )
+
+
+def _store(domain, record):
+    from app.models import Domain
+
+    table = Domain.__table__
+    # Written through the session: on SQLite a second connection would wait on
+    # the session's own open write transaction. The caller commits; the
+    # savepoint keeps a failed write from aborting the caller's transaction.
+    with db.session.begin_nested():
+        db.session.execute(table.update().where(table.c.domain_name == domain).values(
+            canonical_url=record.base_url,
+            redirect_chain=json.dumps(record.redirect_chain),
+            tls_ok=record.tls_ok,
+            canonical_checked_at=record.checked_at,
+            # Keep updated_at as is; it records when the domain was last crawled
+            updated_at=table.c.updated_at
+        ))
+
+
+def get_canonical_host(domain):
+    """
+    Get a domain's canonical host from memory, then the Domain row, and
+    probe the domain only when neither has a fresh record.
+
+    A probed record is written in the current session; the caller commits it
+    along with the rest of the crawl.
+
+    Args:
+        domain (str): The domain
+
+    Returns:
+        CanonicalHost: The record, or None if no host answered
+    """
+    domain = domain.strip().lower()
+    with _cache_lock:
+        record = _cache.get(domain)
+        if record is not None:
+            _cache.move_to_end(domain)
+    if _fresh(record):
+        return record
+
+    record = None
+    if has_app_context():
+        try:
+            record = _load(domain)
+        except Exception as e:
+            logger.warning(f"Error loading canonical host for {domain}: {str(e)}")
+
+    if not _fresh(record):
+        record = resolve_canonical_host(domain)
+        if record is None:
+            return None
+        if has_app_context():
+            try:
+                _store(domain, record)
+            except Exception as e:
+                logger.warning(f"Error storing canonical host for {domain}: {str(e)}")
+
+    with _cache_lock:
+        _cache[domain] = record
+        _cache.move_to_end(domain)
+        while len(_cache) > _cache_size():
+            _cache.popitem(last=False)
+    return record
+
+
+def forget_canonical_host(domain):
+    """
+    Drop a domain's canonical host, e.g. when the site stops answering on it,
+    so the next crawl probes the domain again.
+
+    The change is written in the current session; the caller commits it.
+
+    Args:
+        domain (str): The domain
+    """
+    from app.models import Domain
+
+    domain = domain.strip().lower()
+    with _cache_lock:
+        _cache.pop(domain, None)
+
+    if has_app_context():
+        table = Domain.__table__
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.update().where(table.c.domain_name == domain).values(
+                    canonical_checked_at=None,
+                    updated_at=table.c.updated_at
+                ))
+        except Exception as e:
+            logger.warning(f"Error forgetting canonical host for {domain}: {str(e)}")
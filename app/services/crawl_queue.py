@@ -0,0 +1,295 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, or_, select, update
+
+from app import db
+from app.models import CrawlTask
+from app.services.domain_search import search_domain_emails
+from app.services.email_patterns import refresh_domain_pattern
+from app.services.metrics import CRAWL_TASKS
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Candidates tried per claim when other workers win the race for them
+CLAIM_RETRIES = 5
+
+
+def worker_name():
+    """A name that identifies this worker process in task leases."""
+    return f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+
+
+def enqueue_crawl(domain_id, priority=0, run_after=None):
+    """
+    Queue a crawl of a domain, unless one is already queued or running.
+
+    The caller commits.
+
+    Args:
+        domain_id (int): The domain to crawl
+        priority (int): Higher priorities are claimed first
+        run_after (datetime): Earliest time to run; now if omitted
+
+    Returns:
+        CrawlTask: The new task, or the domain's existing active task
+    """
+    task = db.session.query(CrawlTask).filter(
+        CrawlTask.domain_id == domain_id,
+        CrawlTask.status.in_(ACTIVE_STATUSES)
+    ).first()
+    if task:
+        if task.status == 'queued' and priority > (task.priority or 0):
+            task.priority = priority
+        return task
+
+    task = CrawlTask(
+        domain_id=domain_id,
+        priority=priority,
+        run_after=run_after or datetime.utcnow(),
+        max_attempts=current_app.config['CRAWL_MAX_ATTEMPTS']
+    )
+    db.session.add(task)
+    return task
+
+
+def _claimable(now):
+    return or_(
+        and_(CrawlTask.status == 'queued', CrawlTask.run_after <= now),
+        # Running tasks whose worker stopped heartbeating
+        and_(
+            CrawlTask.status == 'running',
+            CrawlTask.locked_until < now,
+            CrawlTask.attempts < CrawlTask.max_attempts
+        )
+    )
+
+
+def claim_task(worker_id):
+    """
+    Claim the next runnable task for a worker.
+
+    On PostgreSQL the candidate row is locked with FOR UPDATE SKIP LOCKED, so
+    concurrent workers never wait on each other. Other databases claim with
+    a conditional UPDATE that only succeeds if the task is still claimable.
+
+    Args:
+        worker_id (str): The claiming worker
+
+    Returns:
+        int: The claimed task's ID, or None if nothing is runnable
+    """
+    now = datetime.utcnow()
+    claim = update(CrawlTask).values(
+        status='running',
+        locked_by=worker_id,
+        locked_until=now + timedelta(seconds=current_app.config['CRAWL_LEASE_SECONDS']),
+        heartbeat_at=now,
+        attempts=CrawlTask.attempts + 1
+    ).execution_options(synchronize_session=False)
+    candidates = select(CrawlTask.id).where(_claimable(now)).order_by(
+        CrawlTask.priority.desc(), CrawlTask.run_after
+    ).limit(1)
+
+    if db.engine.dialect.name == 'postgresql':
+        task_id = db.session.execute(candidates.with_for_update(skip_locked=True)).scalar()
+        if task_id is not None:
+            db.session.execute(claim.where(CrawlTask.id == task_id))
+        db.session.commit()
+        return task_id
+
+    for _ in range(CLAIM_RETRIES):
+        task_id = db.session.execute(candidates).scalar()
+        if task_id is None:
+            db.session.rollback()
+            return None
+
+        claimed = db.session.execute(claim.where(CrawlTask.id == task_id, _claimable(now))).rowcount
+        db.session.commit()
+        if claimed:
+            return task_id
+    return None
+
+
+def heartbeat(task_id, worker_id):
+    """
+    Extend a running task's lease.
+
+    Returns:
+        bool: False if the worker no longer holds the task
+    """
+    now = datetime.utcnow()
+    table = CrawlTask.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.update().where(
+            table.c.id == task_id,
+            table.c.locked_by == worker_id,
+            table.c.status == 'running'
+        ).values(
+            locked_until=now + timedelta(seconds=current_app.config['CRAWL_LEASE_SECONDS']),
+            heartbeat_at=now
+        ))
+    return result.rowcount == 1
+
+
+def _finish(task_id, worker_id, **values):
+    """Update a task this worker holds; returns False if the lease was lost."""
+    table = CrawlTask.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.update().where(
+            table.c.id == task_id,
+            table.c.locked_by == worker_id
+        ).values(**values))
+    if result.rowcount != 1:
+        logger.warning(f"Crawl task {task_id} was taken over before {worker_id} finished it")
+        return False
+    return True
+
+
+def fail_expired_tasks():
+    """
+    Fail running tasks whose lease expired after their last attempt.
+
+    Returns:
+        int: Number of tasks failed
+    """
+    now = datetime.utcnow()
+    table = CrawlTask.__table__
+    with db.engine.begin() as conn:
+        result = conn.execute(table.update().where(
+            table.c.status == 'running',
+            table.c.locked_until < now,
+            table.c.attempts >= table.c.max_attempts
+        ).values(
+            status='failed',
+            last_error='Lease expired',
+            locked_by=None,
+            locked_until=None,
+            finished_at=now
+        ))
+    if result.rowcount:
+        CRAWL_TASKS.labels(status='failed').inc(result.rowcount)
+    return result.rowcount
+
+
+def _keep_alive(app, task_id, worker_id, stop):
+    with app.app_context():
+        while not stop.wait(app.config['CRAWL_HEARTBEAT_SECONDS']):
+            if not heartbeat(task_id, worker_id):
+                logger.warning(f"Lost the lease on crawl task {task_id}")
+                return
+
+
+def run_task(task_id, worker_id):
+    """
+    Crawl a claimed task's domain and record the outcome.
+
+    The lease is kept alive by a heartbeat thread while the crawl runs.
+    Failed attempts are retried with exponential backoff until the task's
+    max_attempts is reached.
+
+    Args:
+        task_id (int): The claimed task
+        worker_id (str): The worker holding the lease
+
+    Returns:
+        str: The task's new status
+    """
+    app = current_app._get_current_object()
+    task = db.session.get(CrawlTask, task_id)
+    if task is None:
+        return None
+    domain_obj = task.domain
+
+    stop = threading.Event()
+    keep_alive = threading.Thread(
+        target=_keep_alive, args=(app, task_id, worker_id, stop), daemon=True
+    )
+    keep_alive.start()
+
+    try:
+        emails = search_domain_emails(domain_obj)
+        refresh_domain_pattern(domain_obj)
+        domain_obj.updated_at = datetime.utcnow()
+        db.session.commit()
+        status = 'done'
+        values = {'results_count': len(emails), 'last_error': None}
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Crawl task {task_id} for domain {domain_obj.domain_name} failed: {str(e)}")
+        task = db.session.get(CrawlTask, task_id)
+        values = {'last_error': str(e)}
+        if task.attempts < task.max_attempts:
+            status = 'queued'
+            backoff = app.config['CRAWL_RETRY_BACKOFF'] * 2 ** (task.attempts - 1)
+            values['run_after'] = datetime.utcnow() + timedelta(seconds=backoff)
+        else:
+            status = 'failed'
+    finally:
+        stop.set()
+        keep_alive.join()
+
+    if status != 'queued':
+        values['finished_at'] = datetime.utcnow()
+    if _finish(task_id, worker_id, status=status, locked_by=None, locked_until=None, **values):
+        CRAWL_TASKS.labels(status=status).inc()
+    return status
+
+
+class CrawlWorker:
+    """Claims and runs crawl tasks until stopped."""
+
+    def __init__(self, app, worker_id=None, stop_event=None):
+        self.app = app
+        self.worker_id = worker_id or worker_name()
+        self.stop_event = stop_event or threading.Event()
+
+    def run(self, once=False, max_tasks=None):
+        """
+        Process tasks until stopped.
+
+        Args:
+            once (bool): Stop when no task is runnable instead of polling
+            max_tasks (int): Stop after this many tasks
+
+        Returns:
+            int: Number of tasks processed
+        """
+        processed = 0
+        last_reap = 0.0
+        with self.app.app_context():
+            poll_interval = self.app.config['CRAWL_POLL_INTERVAL']
+            lease_seconds = self.app.config['CRAWL_LEASE_SECONDS']
+
+            while not self.stop_event.is_set():
+                if time.monotonic() - last_reap > lease_seconds:
+                    fail_expired_tasks()
+                    last_reap = time.monotonic()
+
+                try:
+                    task_id = claim_task(self.worker_id)
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Worker {self.worker_id} could not claim a task: {str(e)}")
+                    task_id = None
+
+                if task_id is None:
+                    if once:
+                        break
+                    self.stop_event.wait(poll_interval)
+                    continue
+
+                run_task(task_id, self.worker_id)
+                db.session.remove()
+                processed += 1
+                if max_tasks and processed >= max_tasks:
+                    break
+        return processed
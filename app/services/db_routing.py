@@ -0,0 +1,85 @@
+import fnmatch
+import logging
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# SQLALCHEMY_BINDS key of the read replica
+REPLICA_BIND = 'replica'
+
+
+def _routed_to_replica():
+    return has_app_context() and g.get('db_use_replica', False)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends the reads of read-only views to the replica.
+
+    A statement goes to the replica only while the current request is
+    routed there (see `init_app`), and only if it is a plain SELECT issued
+    outside a flush. All other statements use the usual binds, so writes
+    stay on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _routed_to_replica() and not self._flushing:
+            is_read = getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+            engine = self._db.engines.get(REPLICA_BIND) if is_read else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _stick_to_primary(session, flush_context):
+    # The replica lacks this request's writes, so read them back from the primary
+    use_primary()
+
+
+def use_primary():
+    """Send the rest of the current request's queries to the primary."""
+    if has_app_context():
+        g.db_use_replica = False
+
+
+def is_read_only_endpoint(endpoint, patterns):
+    """
+    Check an endpoint against READ_REPLICA_ENDPOINTS patterns.
+
+    Args:
+        endpoint (str): e.g. 'dashboard.domains'
+        patterns (iterable): fnmatch patterns, e.g. 'dashboard.*'
+
+    Returns:
+        bool: True if any pattern matches
+    """
+    return bool(endpoint) and any(fnmatch.fnmatchcase(endpoint, pattern) for pattern in patterns)
+
+
+def init_app(app):
+    """
+    Route GET requests to read-only endpoints to the read replica.
+
+    Does nothing unless a `replica` bind is configured.
+
+    Args:
+        app (Flask): The Flask application
+    """
+    if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+    patterns = tuple(app.config['READ_REPLICA_ENDPOINTS'])
+
+    @app.before_request
+    def _route_reads():
+        g.db_use_replica = (
+            request.method in ('GET', 'HEAD') and is_read_only_endpoint(request.endpoint, patterns)
+        )
+        if g.db_use_replica:
+            logger.debug(f"Reading {request.endpoint} from the replica")
+
+    logger.info(f"Read replica routing enabled for {', '.join(patterns)}")
+
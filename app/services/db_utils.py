@@ -0,0 +1,58 @@
+def dialect_insert(dialect_name):
+    """
+    Get the dialect-specific insert() that supports ON CONFLICT clauses.
+
+    Args:
+        dialect_name (str): SQLAlchemy dialect name, e.g. 'postgresql' or 'sqlite'
+
+    Returns:
+        callable: The dialect's insert function, or None if unsupported
+    """
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert
+    return None
+
+
+def epoch_seconds(dialect_name, column):
+    """
+    Express a naive UTC DateTime column as seconds since the Unix epoch.
+
+    Args:
+        dialect_name (str): SQLAlchemy dialect name
+        column: The DateTime column or expression
+
+    Returns:
+        ColumnElement: The expression, or None on databases without support
+    """
+    from sqlalchemy import func
+
+    if dialect_name == 'postgresql':
+        return func.extract('epoch', column)
+    if dialect_name == 'sqlite':
+        # Julian day 2440587.5 is 1970-01-01 00:00 UTC
+        return (func.julianday(column) - 2440587.5) * 86400.0
+    return None
+
+
+def insert_ignore(dialect_name, table):
+    """
+    Build an INSERT that skips rows conflicting with existing ones.
+
+    Falls back to a plain INSERT on databases without ON CONFLICT support.
+
+    Args:
+        dialect_name (str): SQLAlchemy dialect name
+        table: The table or mapped class to insert into
+
+    Returns:
+        Insert: The insert statement
+    """
+    insert = dialect_insert(dialect_name)
+    if insert is None:
+        from sqlalchemy import insert as plain_insert
+        return plain_insert(table)
+    return insert(table).on_conflict_do_nothing()
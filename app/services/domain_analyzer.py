@@ -1,4 +1,3 @@
-import requests
 import whois
 import re
 import logging
@@ -6,6 +5,10 @@ import tldextract
 from bs4 import BeautifulSoup
 import time
 from collections import Counter
+from app.services.canonical_host import forget_canonical_host, get_canonical_host
+from app.services.metrics import DUPLICATE_PAGES, timed, timed_stage
+from app.services.page_fetch import fetch_page
+from app.services.page_fingerprint import PageDeduplicator
 
 class DomainAnalyzer:
     """Service for analyzing domain information and patterns."""
@@ -28,7 +31,8 @@ class DomainAnalyzer:
             dict: Domain information
         """
         try:
-            domain_info = whois.whois(self.domain)
+            with timed('domain_analyzer', 'whois'):
+                domain_info = whois.whois(self.domain)
             
             # Extract relevant information
             info = {
@@ -51,6 +55,7 @@ class DomainAnalyzer:
             self.logger.error(f"Error getting domain info for {self.domain}: {str(e)}")
             return {'domain': self.domain, 'error': str(e)}
     
+    @timed_stage('domain_analyzer', 'detect_email_pattern')
     def detect_email_pattern(self):
         """
         Try to detect the most common email pattern used by the domain.
@@ -64,7 +69,25 @@ class DomainAnalyzer:
         if not emails:
             return None
         
-        # Analyze the patterns
+        pattern, _ = self.pattern_from_emails(emails)
+        if pattern:
+            return pattern
+        
+        # Default to the most common pattern if we couldn't detect
+        return '{first}.{last}@{domain}'
+    
+    def pattern_from_emails(self, emails):
+        """
+        Work out the most common pattern among known email addresses.
+        
+        Args:
+            emails (list): Email addresses at the domain
+            
+        Returns:
+            tuple: (pattern, confidence), where confidence is the share of
+                recognised addresses that use the pattern; (None, 0.0) if no
+                address fits a known pattern
+        """
         patterns = []
         
         for email in emails:
@@ -98,10 +121,23 @@ class DomainAnalyzer:
             pattern_counter = Counter(patterns)
             most_common = pattern_counter.most_common(1)
             if most_common:
-                return most_common[0][0]
+                pattern, count = most_common[0]
+                return pattern, count / len(patterns)
         
-        # Default to the most common pattern if we couldn't detect
-        return '{first}.{last}@{domain}'
+        return None, 0.0
+    
+    def get_base_urls(self):
+        """
+        Get the URLs the domain's pages are served from.
+        
+        Returns:
+            list: The canonical host if one answers, otherwise the HTTPS apex and www
+        """
+        with timed('domain_analyzer', 'canonical_host'):
+            canonical = get_canonical_host(self.domain)
+        if canonical:
+            return [canonical.base_url]
+        return [f'https://{self.domain}', f'https://www.{self.domain}']
     
     def find_emails_on_website(self):
         """
@@ -111,39 +147,48 @@ class DomainAnalyzer:
             list: List of email addresses found
         """
         found_emails = []
+        base_urls = self.get_base_urls()
         urls_to_check = [
-            f'https://{self.domain}',
-            f'https://www.{self.domain}',
-            f'https://{self.domain}/contact',
-            f'https://www.{self.domain}/contact',
-            f'https://{self.domain}/about',
-            f'https://www.{self.domain}/about',
-            f'https://{self.domain}/team',
-            f'https://www.{self.domain}/team'
+            f'{base_url}{path}'
+            for path in ['', '/contact', '/about', '/team']
+            for base_url in base_urls
         ]
+        answered = False
         
         # User agent for requests
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
+        # apex and www usually serve the same pages; parse each document once
+        deduplicator = PageDeduplicator()
+        
         for url in urls_to_check:
             try:
-                response = requests.get(url, headers=headers, timeout=10)
+                with timed('domain_analyzer', 'http_fetch', url=url):
+                    response = fetch_page(url, headers=headers, timeout=10)
                 if response.status_code == 200:
-                    # Look for emails using regex
-                    email_regex = rf'\b[A-Za-z0-9._%+-]+@{re.escape(self.domain)}\b'
-                    found = re.findall(email_regex, response.text)
-                    found_emails.extend(found)
-                    
-                    # Look for emails in mailto links
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    for link in soup.find_all('a', href=True):
-                        href = link['href']
-                        if href.startswith('mailto:'):
-                            email = href[7:]  # Remove 'mailto:'
-                            if email.endswith(f'@{self.domain}'):
-                                found_emails.append(email)
+                    answered = True
+                    with timed('domain_analyzer', 'fingerprint'):
+                        duplicate = deduplicator.check(response.text)
+                    if duplicate:
+                        DUPLICATE_PAGES.labels(component='domain_analyzer', kind=duplicate).inc()
+                    # Near-duplicates can differ in just the address we are looking for
+                    if duplicate != 'exact':
+                        with timed('domain_analyzer', 'html_parse'):
+                            # Look for emails using regex
+                            email_regex = rf'\b[A-Za-z0-9._%+-]+@{re.escape(self.domain)}\b'
+                            found = re.findall(email_regex, response.text)
+                            found_emails.extend(found)
+                            
+                            # Look for emails in mailto links
+                            soup = BeautifulSoup(response.text, 'html.parser')
+                            for link in soup.find_all('a', href=True):
+                                href = link['href']
+                                if href.startswith('mailto:'):
+                                    email = href[7:]  # Remove 'mailto:'
+                                    if email.endswith(f'@{self.domain}'):
+                                        found_emails.append(email)
                 
                 # Be nice to the server
                 time.sleep(1)
@@ -151,6 +196,10 @@ class DomainAnalyzer:
             except Exception as e:
                 self.logger.warning(f"Error scraping {url}: {str(e)}")
         
+        # A single base URL is the canonical host; if it served nothing, probe again next crawl
+        if not answered and len(base_urls) == 1:
+            forget_canonical_host(self.domain)
+        
         # Remove duplicates
         return list(set(found_emails))
     
@@ -176,10 +225,7 @@ class DomainAnalyzer:
                 return company_name
             
             # Try to find it on the website
-            urls_to_check = [
-                f'https://{self.domain}',
-                f'https://www.{self.domain}'
-            ]
+            urls_to_check = self.get_base_urls()
             
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -187,7 +233,7 @@ class DomainAnalyzer:
             
             for url in urls_to_check:
                 try:
-                    response = requests.get(url, headers=headers, timeout=10)
+                    response = fetch_page(url, headers=headers, timeout=10)
                     if response.status_code == 200:
                         soup = BeautifulSoup(response.text, 'html.parser')
                         
@@ -0,0 +1,289 @@
+import logging
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+
+import tldextract
+
+from app.services.serialization import dumps_json
+
+logger = logging.getLogger(__name__)
+
+# Batches queued per process, so workers never wait for the parent to read the file
+BATCHES_PER_PROCESS = 2
+
+CHECKPOINT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hunted (
+    domain TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    emails INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    finished_at REAL NOT NULL
+)
+"""
+
+
+def normalize_domain(value):
+    """
+    Reduce a line of input to its registered domain.
+
+    Returns:
+        str: e.g. 'example.com' for 'https://www.example.com/about', or None
+    """
+    ext = tldextract.extract(value.strip())
+    if not ext.domain or not ext.suffix:
+        return None
+    return f"{ext.domain}.{ext.suffix}".lower()
+
+
+def read_domains(path):
+    """
+    Stream the domains in a file, one per line, without loading it whole.
+
+    Blank lines, '#' comments, invalid entries and repeats are skipped; a
+    CSV line contributes its first column.
+
+    Args:
+        path (str): The file
+
+    Yields:
+        str: Normalized domains
+    """
+    seen = set()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.split(',', 1)[0].strip()
+            if not line or line.startswith('#'):
+                continue
+            domain = normalize_domain(line)
+            if domain is None:
+                logger.debug(f"Skipping invalid domain {line!r}")
+                continue
+            if domain not in seen:
+                seen.add(domain)
+                yield domain
+
+
+class HuntCheckpoint:
+    """
+    Progress of a hunt, kept in a local SQLite file so it can be resumed.
+
+    Only the parent process writes to it, after a batch's results have been
+    written out, so a crash repeats at most the batches in flight.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute(CHECKPOINT_SCHEMA)
+        self.conn.commit()
+
+    def finished(self, retry_failed=False):
+        """
+        Domains that a resumed run should skip.
+
+        Args:
+            retry_failed (bool): Leave failed domains out so they are tried again
+
+        Returns:
+            set: The domains
+        """
+        query = 'SELECT domain FROM hunted'
+        if retry_failed:
+            query += " WHERE status = 'done'"
+        return {domain for domain, in self.conn.execute(query)}
+
+    def record(self, results):
+        """Mark a batch of results as finished."""
+        now = time.time()
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO hunted (domain, status, emails, error, finished_at) VALUES (?, ?, ?, ?, ?)',
+            [
+                (r['domain'], 'failed' if r['error'] else 'done', len(r['emails']), r['error'], now)
+                for r in results
+            ]
+        )
+        self.conn.commit()
+
+    def counts(self):
+        """
+        Returns:
+            dict: Number of domains per status
+        """
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM hunted GROUP BY status'))
+
+    def close(self):
+        self.conn.close()
+
+
+class JsonlSink:
+    """Appends one JSON line per domain to a file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'ab')
+
+    def write(self, results):
+        for result in results:
+            line = dict(result, emails=[email.to_dict() for email in result['emails']])
+            self.file.write(dumps_json(line) + b'\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class DatabaseSink:
+    """Stores found emails on their Domain rows, one transaction per batch."""
+
+    def write(self, results):
+        from app import db
+        from app.models import Domain
+        from app.services.email_store import upsert_emails
+        from app.services.result_cache import invalidate_on_commit
+
+        try:
+            for result in results:
+                if result['error']:
+                    continue
+                domain_obj = Domain.query.filter_by(domain_name=result['domain']).first()
+                if not domain_obj:
+                    domain_obj = Domain(domain_name=result['domain'])
+                    db.session.add(domain_obj)
+                    db.session.flush()
+                upsert_emails(domain_obj.id, result['emails'])
+                domain_obj.updated_at = datetime.utcnow()
+                invalidate_on_commit(domain=result['domain'])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def close(self):
+        pass
+
+
+def _find_emails(domain):
+    from app.services.email_finder import EmailFinder
+
+    return EmailFinder(domain).find_bulk_emails()
+
+
+def _hunt_one(domain):
+    try:
+        return {'domain': domain, 'emails': _find_emails(domain), 'error': None}
+    except Exception as e:
+        logger.warning(f"Hunting {domain} failed: {str(e)}")
+        return {'domain': domain, 'emails': [], 'error': str(e)}
+
+
+def hunt_batch(domains, concurrency):
+    """
+    Crawl a batch of domains in a worker process, `concurrency` at a time.
+
+    The crawler blocks on I/O, so each crawl runs on its own thread.
+
+    Args:
+        domains (list): Normalized domains
+        concurrency (int): Crawls in flight at once within this process
+
+    Returns:
+        list: {'domain', 'emails', 'error'} dictionaries, in input order
+    """
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='hunt') as pool:
+        return list(pool.map(_hunt_one, domains))
+
+
+def _batches(domains, size):
+    batch = []
+    for domain in domains:
+        batch.append(domain)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class HuntProgress:
+    """Running totals of a hunt, for live throughput reports."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.domains = 0
+        self.failed = 0
+        self.emails = 0
+
+    def add(self, results):
+        self.domains += len(results)
+        self.failed += sum(1 for r in results if r['error'])
+        self.emails += sum(len(r['emails']) for r in results)
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self):
+        return self.domains / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.domains} domains ({self.failed} failed), {self.emails} emails, "
+                f"{self.rate:.1f} domains/s, {self.elapsed:.0f}s elapsed")
+
+
+def run_hunt(domains, checkpoint, sink, processes, concurrency, batch_size,
+             report=None, report_interval=10.0):
+    """
+    Hunt emails for a stream of domains across a pool of processes.
+
+    Domains are read lazily and handed out in batches, with at most
+    BATCHES_PER_PROCESS batches queued per process. Each finished batch is
+    written to `sink` and then recorded in `checkpoint`.
+
+    Args:
+        domains (iterable): Normalized domains, already filtered by the checkpoint
+        checkpoint (HuntCheckpoint): Where progress is recorded
+        sink (JsonlSink or DatabaseSink): Where results are written
+        processes (int): Worker processes
+        concurrency (int): Crawls in flight per process
+        batch_size (int): Domains per batch sent to a process
+        report (callable): Called with the HuntProgress every `report_interval` seconds
+        report_interval (float): Seconds between reports
+
+    Returns:
+        HuntProgress: The final totals
+    """
+    progress = HuntProgress()
+    last_report = time.monotonic()
+
+    def collect(futures):
+        nonlocal last_report
+        for future in futures:
+            results = future.result()
+            sink.write(results)
+            checkpoint.record(results)
+            progress.add(results)
+        if report and time.monotonic() - last_report >= report_interval:
+            report(progress)
+            last_report = time.monotonic()
+
+    # Spawned, not forked: children must not share the parent's app context or DB connections
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(max_workers=processes, mp_context=context)
+    pending = set()
+    try:
+        for batch in _batches(domains, batch_size):
+            if len(pending) >= processes * BATCHES_PER_PROCESS:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(pool.submit(hunt_batch, batch, concurrency))
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+    finally:
+        pool.shutdown(wait=not pending, cancel_futures=True)
+    return progress
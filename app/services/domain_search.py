@@ -0,0 +1,117 @@
+from sqlalchemy import func
+
+from app import db
+from app.models import Email
+from app.services.email_finder import EmailFinder
+from app.services.email_patterns import stored_pattern
+from app.services.email_result import is_email_address
+from app.services.email_store import upsert_emails
+from app.services.result_cache import invalidate_on_commit
+from app.services.single_flight import single_flight, domain_key, person_key
+
+
+def search_domain_emails(domain_obj):
+    """
+    Crawl a domain for emails, sharing one crawl between concurrent callers.
+
+    The crawl results are stored and committed by whichever caller runs the
+    crawl; everyone else reads the stored rows. Leases are taken on their own
+    connections, so on SQLite the caller should not have flushed writes
+    pending or the lease waits on their lock.
+
+    Args:
+        domain_obj (Domain): The domain to crawl
+
+    Returns:
+        list: The domain's Email rows
+    """
+    stored = []
+
+    def crawl():
+        found_emails = EmailFinder(domain_obj.domain_name).find_bulk_emails()
+        stored.extend(upsert_emails(domain_obj.id, found_emails))
+        invalidate_on_commit(domain=domain_obj.domain_name)
+        db.session.commit()
+        return len(stored)
+
+    def load():
+        return Email.query.filter_by(domain_id=domain_obj.id).count() or None
+
+    single_flight.do(domain_key(domain_obj.domain_name), crawl, load=load)
+
+    if stored:
+        return stored
+    return Email.query.filter_by(domain_id=domain_obj.id).all()
+
+
+def find_person_email(domain_obj, first_name=None, last_name=None, position=None, pattern=None):
+    """
+    Find and store one person's email, sharing the lookup between concurrent callers.
+
+    See search_domain_emails for the caller's session.
+
+    Args:
+        domain_obj (Domain): The person's company domain
+        first_name (str): First name
+        last_name (str): Last name
+        position (str): Position at the company (optional)
+        pattern (str): Email pattern to use (optional)
+
+    Returns:
+        dict: Dictionary with email information, or None if not found or the
+            finder produced something that is not a valid address
+    """
+    domain = domain_obj.domain_name
+
+    # A pattern refreshed by the recrawl scheduler saves fetching the site again
+    if not pattern:
+        pattern = stored_pattern(domain_obj.id)
+
+    def find():
+        email_finder = EmailFinder(domain)
+        email_data = email_finder.find_email(
+            first_name=first_name,
+            last_name=last_name,
+            position=position,
+            pattern=pattern
+        )
+
+        # Never store or return something that is not an address
+        if email_data and not is_email_address(email_data.email):
+            return None
+
+        # Store the result before the lease is released so other workers can read it
+        if email_data:
+            email_data = email_data.to_dict()
+            email_data['email'] = email_data['email'].lower()
+            upsert_emails(domain_obj.id, [dict(
+                email_data,
+                first_name=first_name,
+                last_name=last_name,
+                position=position
+            )])
+            invalidate_on_commit(domain=domain_obj.domain_name)
+            db.session.commit()
+
+        return email_data
+
+    def load():
+        query = Email.query.filter(Email.domain_id == domain_obj.id)
+        if first_name:
+            query = query.filter(func.lower(Email.first_name) == first_name.strip().lower())
+        if last_name:
+            query = query.filter(func.lower(Email.last_name) == last_name.strip().lower())
+
+        email_obj = query.first()
+        if not email_obj:
+            return None
+        return {
+            'email': email_obj.email_address,
+            'first_name': email_obj.first_name,
+            'last_name': email_obj.last_name,
+            'position': email_obj.position,
+            'confidence': email_obj.confidence_score,
+            'source': 'database'
+        }
+
+    return single_flight.do(person_key(domain, first_name, last_name), find, load=load)
@@ -1,3 +1,4 @@
+import contextvars
 import requests
 import re
 import time
@@ -12,6 +13,10 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from webdriver_manager.chrome import ChromeDriverManager
 from app.services.domain_analyzer import DomainAnalyzer
+from app.services.email_result import EmailResult, is_email_address
+from app.services.metrics import DUPLICATE_PAGES, timed, timed_stage
+from app.services.page_fetch import fetch_page
+from app.services.page_fingerprint import PageDeduplicator, normalize_url
 
 class EmailFinder:
     """Service for finding email addresses associated with a domain."""
@@ -37,7 +42,9 @@ class EmailFinder:
             f'https://{domain}',
             f'https://www.{domain}'
         ]
-        self.visited_urls = set()
+        self.canonical_netloc = None  # set by find_bulk_emails from the canonical host
+        self.visited_urls = set()  # normalized with normalize_url
+        self.page_deduplicator = PageDeduplicator()
         self.domain_analyzer = DomainAnalyzer(domain)
         self.logger = logging.getLogger(__name__)
         
@@ -89,16 +96,27 @@ class EmailFinder:
         headers = {'User-Agent': self.get_random_user_agent()}
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            with timed('email_finder', 'http_fetch', url=url):
+                response = fetch_page(url, headers=headers, timeout=10)
+                if response.status_code >= 400:
+                    raise requests.HTTPError(f"{response.status_code} error for {url}")
             
-            # Extract emails using regex
-            email_regex = rf'\b[A-Za-z0-9._%+-]+@{re.escape(self.domain)}\b'
-            found = re.findall(email_regex, response.text)
-            page_emails.update(found)
+            # apex/www and path variants often serve the same document; parse it once
+            with timed('email_finder', 'fingerprint'):
+                duplicate = self.page_deduplicator.check(response.text)
+            if duplicate:
+                DUPLICATE_PAGES.labels(component='email_finder', kind=duplicate).inc()
+            if duplicate == 'exact':
+                return page_emails
             
-            # Parse HTML for additional emails
-            soup = BeautifulSoup(response.text, 'html.parser')
+            with timed('email_finder', 'html_parse'):
+                # Extract emails using regex
+                email_regex = rf'\b[A-Za-z0-9._%+-]+@{re.escape(self.domain)}\b'
+                found = re.findall(email_regex, response.text)
+                page_emails.update(found)
+                
+                # Parse HTML for additional emails
+                soup = BeautifulSoup(response.text, 'html.parser')
             
             # Look for emails in mailto links
             for link in soup.find_all('a', href=True):
@@ -108,6 +126,11 @@ class EmailFinder:
                     if email.endswith(f'@{self.domain}'):
                         page_emails.add(email)
             
+            # A near-duplicate shares its template, and so its links, with a page
+            # already crawled; only the addresses on it can be new
+            if duplicate == 'near':
+                return page_emails
+            
             # Find contact and about pages
             contact_links = []
             for link in soup.find_all('a', href=True):
@@ -117,9 +140,10 @@ class EmailFinder:
                     'team' in href.lower() or 'contact' in link_text or 
                     'about' in link_text or 'team' in link_text):
                     full_url = urljoin(url, href)
-                    if full_url not in self.visited_urls and self.is_same_domain(full_url):
+                    url_key = normalize_url(full_url)
+                    if url_key not in self.visited_urls and self.is_same_domain(full_url):
                         contact_links.append(full_url)
-                        self.visited_urls.add(full_url)
+                        self.visited_urls.add(url_key)
             
             # Recursively check contact and about pages
             for link in contact_links[:3]:  # Limit to avoid too much scraping
@@ -138,16 +162,23 @@ class EmailFinder:
     def is_same_domain(self, url):
         """Check if a URL belongs to the same domain."""
         parsed = urlparse(url)
-        return parsed.netloc == self.domain or parsed.netloc == f'www.{self.domain}'
+        return parsed.netloc in (self.domain, f'www.{self.domain}', self.canonical_netloc)
     
+    @timed_stage('email_finder', 'find_bulk_emails')
     def find_bulk_emails(self):
         """
         Find all available email addresses for the domain.
         
         Returns:
-            list: List of dictionaries with email information
+            list: EmailResult for each address found
         """
         self.found_emails = set()
+        self.page_deduplicator = PageDeduplicator()
+        
+        # Crawl only the host the site is served from when it is known,
+        # instead of fetching every page on both apex and www
+        self.base_urls = self.domain_analyzer.get_base_urls()
+        self.canonical_netloc = urlparse(self.base_urls[0]).netloc
         
         # Try each base URL
         for url in self.base_urls:
@@ -164,9 +195,12 @@ class EmailFinder:
             for page in common_pages:
                 for base_url in self.base_urls:
                     url = f"{base_url}/{page}"
-                    if url not in self.visited_urls:
-                        self.visited_urls.add(url)
-                        future_to_url[executor.submit(self.find_emails_on_page, url)] = url
+                    url_key = normalize_url(url)
+                    if url_key not in self.visited_urls:
+                        self.visited_urls.add(url_key)
+                        # Run in a copy of the request context so trace spans follow the thread
+                        future = executor.submit(contextvars.copy_context().run, self.find_emails_on_page, url)
+                        future_to_url[future] = url
             
             for future in as_completed(future_to_url):
                 url = future_to_url[future]
@@ -179,6 +213,9 @@ class EmailFinder:
         # Process found emails to extract names and other information
         result = []
         for email in self.found_emails:
+            if not is_email_address(email):
+                self.logger.debug(f"Skipping malformed address {email!r}")
+                continue
             email_info = self.parse_email_info(email)
             result.append(email_info)
         
@@ -192,7 +229,7 @@ class EmailFinder:
             email (str): Email address
             
         Returns:
-            dict: Dictionary with email information
+            EmailResult: The email with any names guessed from it
         """
         try:
             username = email.split('@')[0]
@@ -213,20 +250,18 @@ class EmailFinder:
                     first_name = username[0].upper()
                     last_name = username[1:].capitalize()
             
-            return {
-                'email': email,
-                'first_name': first_name,
-                'last_name': last_name,
-                'confidence': 0.8,  # Found on website, so relatively high confidence
-                'source': 'website'
-            }
+            return EmailResult(
+                email,
+                first_name=first_name,
+                last_name=last_name,
+                confidence=0.8,  # Found on website, so relatively high confidence
+                source='website'
+            )
         except Exception as e:
             self.logger.error(f"Error parsing email info for {email}: {str(e)}")
-            return {
-                'email': email,
-                'confidence': 0.7
-            }
+            return EmailResult(email, confidence=0.7)
     
+    @timed_stage('email_finder', 'find_email')
     def find_email(self, first_name=None, last_name=None, position=None, pattern=None):
         """
         Find a specific email address for a person at the domain.
@@ -238,7 +273,8 @@ class EmailFinder:
             pattern (str): Email pattern to use (optional)
             
         Returns:
-            dict: Dictionary with email information or None if not found
+            EmailResult: The most likely email, or None if no name was given or
+                the pattern does not produce a valid address
         """
         if not first_name and not last_name:
             return None
@@ -268,16 +304,21 @@ class EmailFinder:
             domain=self.domain
         )
         
+        # A pattern without '@{domain}' cannot produce an address
+        if not is_email_address(email):
+            self.logger.warning(f"Pattern {pattern!r} produced no valid address for {self.domain}")
+            return None
+        
         # Verify the email exists (MX check)
         if self.verify_email_exists(email):
-            return {
-                'email': email,
-                'first_name': first_name.capitalize() if first_name else None,
-                'last_name': last_name.capitalize() if last_name else None,
-                'position': position,
-                'confidence': 0.7,  # Generated email with pattern
-                'source': 'pattern'
-            }
+            return EmailResult(
+                email,
+                first_name=first_name.capitalize() if first_name else None,
+                last_name=last_name.capitalize() if last_name else None,
+                position=position,
+                confidence=0.7,  # Generated email with pattern
+                source='pattern'
+            )
         
         # If the first pattern failed, try other common patterns
         for alt_pattern in self.common_patterns:
@@ -292,14 +333,14 @@ class EmailFinder:
             )
             
             if self.verify_email_exists(alt_email):
-                return {
-                    'email': alt_email,
-                    'first_name': first_name.capitalize() if first_name else None,
-                    'last_name': last_name.capitalize() if last_name else None,
-                    'position': position,
-                    'confidence': 0.6,  # Alternative pattern, lower confidence
-                    'source': 'pattern'
-                }
+                return EmailResult(
+                    alt_email,
+                    first_name=first_name.capitalize() if first_name else None,
+                    last_name=last_name.capitalize() if last_name else None,
+                    position=position,
+                    confidence=0.6,  # Alternative pattern, lower confidence
+                    source='pattern'
+                )
         
         # If all patterns failed, try to search on the website
         try:
@@ -320,14 +361,14 @@ class EmailFinder:
             self.logger.error(f"Error in advanced email search: {str(e)}")
         
         # If nothing worked, return the most likely email with low confidence
-        return {
-            'email': email,
-            'first_name': first_name.capitalize() if first_name else None,
-            'last_name': last_name.capitalize() if last_name else None,
-            'position': position,
-            'confidence': 0.3,  # Low confidence since we couldn't verify
-            'source': 'guess'
-        }
+        return EmailResult(
+            email,
+            first_name=first_name.capitalize() if first_name else None,
+            last_name=last_name.capitalize() if last_name else None,
+            position=position,
+            confidence=0.3,  # Low confidence since we couldn't verify
+            source='guess'
+        )
     
     def verify_email_exists(self, email):
         """
@@ -344,7 +385,8 @@ class EmailFinder:
             domain = email.split('@')[1]
             
             # Check if MX records exist for the domain
-            mx_records = dns.resolver.resolve(domain, 'MX')
+            with timed('email_finder', 'dns_mx', domain=domain):
+                mx_records = dns.resolver.resolve(domain, 'MX')
             if mx_records:
                 return True
             
@@ -0,0 +1,52 @@
+from flask import current_app
+
+from app import db
+from app.models import Email, EmailPattern
+from app.services.domain_analyzer import DomainAnalyzer
+
+
+def refresh_domain_pattern(domain_obj):
+    """
+    Recompute a domain's email pattern from its stored addresses.
+
+    No pages are fetched; the pattern is derived from the emails the last
+    crawl stored. The caller commits.
+
+    Args:
+        domain_obj (Domain): The domain
+
+    Returns:
+        EmailPattern: The stored pattern, or None if no address fits one
+    """
+    addresses = [
+        address for address, in db.session.query(Email.email_address).filter(
+            Email.domain_id == domain_obj.id
+        )
+    ]
+    pattern, confidence = DomainAnalyzer(domain_obj.domain_name).pattern_from_emails(addresses)
+    if pattern is None:
+        return None
+
+    record = EmailPattern.query.filter_by(domain_id=domain_obj.id).first()
+    if record is None:
+        record = EmailPattern(domain_id=domain_obj.id)
+        db.session.add(record)
+    record.pattern = pattern
+    record.confidence = confidence
+    return record
+
+
+def stored_pattern(domain_id):
+    """
+    Get a domain's stored email pattern if it is trusted enough to use.
+
+    Args:
+        domain_id (int): The domain's ID
+
+    Returns:
+        str: The pattern, or None if there is none above PATTERN_MIN_CONFIDENCE
+    """
+    record = EmailPattern.query.filter_by(domain_id=domain_id).first()
+    if record is None or (record.confidence or 0.0) < current_app.config['PATTERN_MIN_CONFIDENCE']:
+        return None
+    return record.pattern
@@ -0,0 +1,80 @@
+import sys
+
+FIELDS = ('email', 'first_name', 'last_name', 'position', 'confidence', 'source')
+
+
+def is_email_address(value):
+    """Check that a string has exactly one '@' with a non-empty local part and domain."""
+    if not value or value.count('@') != 1:
+        return False
+    local_part, _, domain = value.partition('@')
+    return bool(local_part) and bool(domain)
+
+
+class EmailResult:
+    """
+    One email found by the email finder, stored compactly.
+
+    Batch jobs hold millions of these, so the record uses slots instead of
+    a per-instance dict, keeps the address as its local part plus a shared
+    interned domain, and interns the source. Code written against the old
+    dictionaries can keep reading fields with `get`; API boundaries call
+    `to_dict`.
+    """
+
+    __slots__ = ('local_part', 'domain', 'first_name', 'last_name', 'position', 'confidence', 'source')
+
+    def __init__(self, email, first_name=None, last_name=None, position=None, confidence=None, source=None):
+        if not is_email_address(email):
+            raise ValueError(f'Not an email address: {email!r}')
+        local_part, _, domain = email.partition('@')
+        self.local_part = local_part
+        self.domain = sys.intern(domain)
+        self.first_name = first_name
+        self.last_name = last_name
+        self.position = position
+        self.confidence = confidence
+        self.source = sys.intern(source) if source else None
+
+    @property
+    def email(self):
+        return f'{self.local_part}@{self.domain}'
+
+    def get(self, field, default=None):
+        """
+        Read a field by its dictionary key, like dict.get.
+
+        Every field is a key of to_dict(), so a field that is None is returned
+        as None; `default` is only used for names that are not fields.
+        """
+        if field not in FIELDS:
+            return default
+        return getattr(self, field)
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: The result in the shape the API has always returned
+        """
+        return {
+            'email': self.email,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'position': self.position,
+            'confidence': self.confidence,
+            'source': self.source
+        }
+
+    def __getstate__(self):
+        # Tuples pickle smaller than a dict of slots, e.g. between hunt processes
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+        self.domain = sys.intern(self.domain)
+        if self.source:
+            self.source = sys.intern(self.source)
+
+    def __repr__(self):
+        return f'EmailResult({self.email!r}, confidence={self.confidence!r}, source={self.source!r})'
@@ -0,0 +1,135 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import case, func
+
+from app import db
+from app.models import Email
+from app.services.db_utils import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+# Addresses per lookup in the fallback merge, kept well under SQLite's bound-parameter limit
+UPSERT_CHUNK_SIZE = 500
+
+
+def _normalize(found_emails, domain_id):
+    """Lower-case addresses and collapse duplicates, keeping the best data."""
+    rows = {}
+    for email_data in found_emails:
+        address = (email_data.get('email') or '').strip().lower()
+        if not address:
+            continue
+
+        row = {
+            'email_address': address,
+            'first_name': email_data.get('first_name'),
+            'last_name': email_data.get('last_name'),
+            'position': email_data.get('position'),
+            'confidence_score': email_data.get('confidence', 0.0) or 0.0,
+            'domain_id': domain_id
+        }
+
+        existing = rows.get(address)
+        if existing is None:
+            rows[address] = row
+            continue
+
+        for field in ('first_name', 'last_name', 'position'):
+            if not existing[field] and row[field]:
+                existing[field] = row[field]
+        existing['confidence_score'] = max(existing['confidence_score'], row['confidence_score'])
+
+    return list(rows.values())
+
+
+def _upsert_statement(insert, now):
+    stmt = insert(Email)
+    excluded = stmt.excluded
+
+    # Existing rows keep their domain and any names we already know
+    return stmt.on_conflict_do_update(
+        index_elements=[Email.email_address],
+        set_={
+            'first_name': func.coalesce(Email.first_name, excluded.first_name),
+            'last_name': func.coalesce(Email.last_name, excluded.last_name),
+            'position': func.coalesce(Email.position, excluded.position),
+            'confidence_score': case(
+                (excluded.confidence_score > Email.confidence_score, excluded.confidence_score),
+                else_=Email.confidence_score
+            ),
+            'updated_at': now
+        }
+    ).returning(Email)
+
+
+def _upsert_rows(insert, rows):
+    now = datetime.utcnow()
+    # One statement with the rows as executemany parameters, so the SQL is
+    # compiled once and cached instead of rebuilt for every batch of values
+    return db.session.scalars(
+        _upsert_statement(insert, now),
+        [dict(row, created_at=now, updated_at=now) for row in rows],
+        execution_options={'populate_existing': True}
+    ).all()
+
+
+def _merge_chunk(rows):
+    """Portable fallback for databases without INSERT ... ON CONFLICT."""
+    addresses = [row['email_address'] for row in rows]
+    existing = {
+        email.email_address: email
+        for email in Email.query.filter(Email.email_address.in_(addresses)).all()
+    }
+
+    stored = []
+    for row in rows:
+        email = existing.get(row['email_address'])
+        if email is None:
+            email = Email(**row)
+            db.session.add(email)
+        else:
+            email.first_name = email.first_name or row['first_name']
+            email.last_name = email.last_name or row['last_name']
+            email.position = email.position or row['position']
+            email.confidence_score = max(email.confidence_score or 0.0, row['confidence_score'])
+        stored.append(email)
+
+    db.session.flush()
+    return stored
+
+
+def upsert_emails(domain_id, found_emails):
+    """
+    Insert or update discovered emails for a domain in bulk.
+
+    Addresses are normalized to lower case. An address that is already stored
+    keeps its owning domain; missing names are filled in and the higher
+    confidence wins. Stored addresses missing from `found_emails` are left
+    alone, so a recrawl never retires addresses that disappeared from a
+    site. The caller owns the transaction and must commit.
+
+    Args:
+        domain_id (int): ID of the domain the emails were found on
+        found_emails (list): EmailResult records from EmailFinder, or dictionaries with the same keys
+
+    Returns:
+        list: The domain's stored Email rows; addresses owned by another
+            domain are updated but left out
+    """
+    rows = _normalize(found_emails, domain_id)
+    if not rows:
+        return []
+
+    insert = dialect_insert(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stored = _upsert_rows(insert, rows)
+    else:
+        stored = []
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stored.extend(_merge_chunk(rows[start:start + UPSERT_CHUNK_SIZE]))
+
+    # Addresses already owned by another domain were updated, not moved here
+    stored = [email for email in stored if email.domain_id == domain_id]
+    logger.debug(f"Upserted {len(stored)} emails for domain {domain_id}")
+    return stored
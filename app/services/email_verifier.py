@@ -5,18 +5,22 @@ import logging
 import time
 from email.utils import parseaddr
 import re
+from app.services.metrics import timed_stage
+from app.services.tracing import span
 
 class EmailVerifier:
     """Service for verifying if an email address exists and is valid."""
     
-    def __init__(self, timeout=10):
+    def __init__(self, timeout=10, smtp_port=25):
         """
         Initialize the EmailVerifier.
         
         Args:
             timeout (int): Timeout in seconds for SMTP connections
+            smtp_port (int): Port the MX servers are contacted on
         """
         self.timeout = timeout
+        self.smtp_port = smtp_port
         self.logger = logging.getLogger(__name__)
     
     def verify_format(self, email):
@@ -53,6 +57,7 @@ class EmailVerifier:
         
         return True
     
+    @timed_stage('email_verifier', 'dns')
     def verify_domain(self, domain):
         """
         Verify that the domain exists and has MX records.
@@ -83,6 +88,7 @@ class EmailVerifier:
             self.logger.error(f"Error verifying domain {domain}: {str(e)}")
             return False, []
     
+    @timed_stage('email_verifier', 'smtp')
     def verify_mailbox(self, email, mx_hosts):
         """
         Verify that the mailbox exists by connecting to the mail server.
@@ -102,19 +108,24 @@ class EmailVerifier:
             try:
                 # Connect to the mail server
                 smtp = smtplib.SMTP(timeout=self.timeout)
-                smtp.connect(mx_host)
+                with span('smtp.connect', host=mx_host):
+                    smtp.connect(mx_host, self.smtp_port)
                 
                 # Say hello to the server
-                smtp.ehlo_or_helo_if_needed()
+                with span('smtp.ehlo', host=mx_host):
+                    smtp.ehlo_or_helo_if_needed()
                 
                 # Start TLS if supported
                 if smtp.has_extn('STARTTLS'):
-                    smtp.starttls()
-                    smtp.ehlo()
+                    with span('smtp.starttls', host=mx_host):
+                        smtp.starttls()
+                        smtp.ehlo()
                 
                 # Send test messages
-                smtp.mail(sender)
-                code, message = smtp.rcpt(email)
+                with span('smtp.mail', host=mx_host):
+                    smtp.mail(sender)
+                with span('smtp.rcpt', host=mx_host):
+                    code, message = smtp.rcpt(email)
                 smtp.quit()
                 
                 # Return code 250 means the mailbox exists
@@ -134,6 +145,7 @@ class EmailVerifier:
         # If we reach here, we couldn't verify the mailbox
         return False
     
+    @timed_stage('email_verifier', 'verify_email')
     def verify_email(self, email):
         """
         Verify an email address by checking format, domain, and mailbox.
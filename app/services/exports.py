@@ -0,0 +1,139 @@
+import csv
+import io
+import zlib
+
+from flask import Response, current_app, request, stream_with_context
+
+from app import db
+from app.models import Domain, Email, UserSavedEmail
+from app.services.serialization import dumps_json
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson'
+}
+
+EXPORT_COLUMNS = [
+    'email', 'first_name', 'last_name', 'position', 'confidence', 'verified', 'domain'
+]
+
+# Rows encoded before a chunk is handed to the WSGI server
+ROWS_PER_CHUNK = 500
+
+
+def _email_columns():
+    return (
+        Email.email_address,
+        Email.first_name,
+        Email.last_name,
+        Email.position,
+        Email.confidence_score,
+        Email.is_verified,
+        Domain.domain_name
+    )
+
+
+def domain_email_rows(domain_id):
+    """
+    Query a domain's emails as plain tuples, fetched in batches from a
+    server-side cursor.
+
+    Args:
+        domain_id (int): The domain's ID
+
+    Returns:
+        Query: Rows in EXPORT_COLUMNS order
+    """
+    return db.session.query(*_email_columns()).outerjoin(
+        Domain, Domain.id == Email.domain_id
+    ).filter(
+        Email.domain_id == domain_id
+    ).order_by(Email.id).yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+
+
+def saved_email_rows(user_id):
+    """
+    Query a user's saved emails as plain tuples, fetched in batches from a
+    server-side cursor.
+
+    Args:
+        user_id (int): The user's ID
+
+    Returns:
+        Query: Rows in EXPORT_COLUMNS order
+    """
+    return db.session.query(*_email_columns()).join(
+        UserSavedEmail, UserSavedEmail.email_id == Email.id
+    ).outerjoin(
+        Domain, Domain.id == Email.domain_id
+    ).filter(
+        UserSavedEmail.user_id == user_id
+    ).order_by(UserSavedEmail.id).yield_per(current_app.config['EXPORT_BATCH_SIZE'])
+
+
+def _encode_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _encode_jsonl(rows):
+    lines = []
+    for row in rows:
+        lines.append(dumps_json(dict(zip(EXPORT_COLUMNS, row))))
+        if len(lines) == ROWS_PER_CHUNK:
+            yield b'\n'.join(lines) + b'\n'
+            lines = []
+
+    if lines:
+        yield b'\n'.join(lines) + b'\n'
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(rows, export_format, filename):
+    """
+    Build a streaming download response for export rows.
+
+    Rows are encoded as they are fetched and gzip-compressed on the fly when
+    the client accepts it.
+
+    Args:
+        rows (iterable): Rows in EXPORT_COLUMNS order
+        export_format (str): 'csv' or 'jsonl'
+        filename (str): Download name without extension
+
+    Returns:
+        Response: The streaming response
+    """
+    chunks = _encode_csv(rows) if export_format == 'csv' else _encode_jsonl(rows)
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}.{export_format}',
+        'Vary': 'Accept-Encoding'
+    }
+
+    if current_app.config['EXPORT_GZIP'] and 'gzip' in request.accept_encodings:
+        chunks = _gzip(chunks)
+        headers['Content-Encoding'] = 'gzip'
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[export_format],
+        headers=headers
+    )
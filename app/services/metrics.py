@@ -0,0 +1,187 @@
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import (
+    REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+
+from app.services.tracing import span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_DURATION = Histogram(
+    'email_hunter_stage_duration_seconds',
+    'Time spent in each stage of the finder, analyzer and verifier services.',
+    ['component', 'stage'],
+    buckets=DEFAULT_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    'email_hunter_stage_errors_total',
+    'Stages that raised an exception.',
+    ['component', 'stage']
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'email_hunter_http_request_duration_seconds',
+    'Time spent handling HTTP requests.',
+    ['endpoint', 'method', 'status'],
+    buckets=DEFAULT_BUCKETS
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    'email_hunter_http_requests_in_flight',
+    'HTTP requests currently being handled.',
+    multiprocess_mode='livesum'
+)
+DB_QUERY_DURATION = Histogram(
+    'email_hunter_db_query_duration_seconds',
+    'Time spent executing SQL statements, per database bind (primary or replica).',
+    ['bind', 'operation'],
+    buckets=DEFAULT_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    'email_hunter_cache_requests_total',
+    'Cache lookups by cache and result (hit or miss).',
+    ['cache', 'result']
+)
+SINGLE_FLIGHT_IN_FLIGHT = Gauge(
+    'email_hunter_single_flight_in_flight',
+    'Crawls and person lookups currently being computed.',
+    multiprocess_mode='livesum'
+)
+BULK_JOBS_IN_FLIGHT = Gauge(
+    'email_hunter_bulk_jobs_in_flight',
+    'Bulk jobs currently running.',
+    multiprocess_mode='livesum'
+)
+DUPLICATE_PAGES = Counter(
+    'email_hunter_duplicate_pages_total',
+    'Downloaded pages that repeat an earlier page in the crawl: exact repeats are skipped, near-duplicates are only searched for emails.',
+    ['component', 'kind']
+)
+FETCH_ABORTS = Counter(
+    'email_hunter_fetch_aborts_total',
+    'Page downloads stopped before the end of the response (non-HTML content type, byte budget, or </body> reached).',
+    ['reason']
+)
+CRAWL_TASKS = Counter(
+    'email_hunter_crawl_tasks_total',
+    'Crawl tasks finished by crawl workers, by outcome (done, queued for retry, failed).',
+    ['status']
+)
+
+
+def render():
+    """
+    Render the metrics in Prometheus text format.
+
+    With PROMETHEUS_MULTIPROC_DIR set, every worker process writes its
+    samples to files in that directory, and the metrics of all workers are
+    aggregated here; otherwise only this process's metrics are rendered.
+
+    Returns:
+        bytes: The exposition
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+@contextmanager
+def timed(component, stage, **attrs):
+    """
+    Record the duration of a stage, and count it as an error if it raises.
+
+    The stage is also recorded as a span when the request is being traced.
+
+    Args:
+        component (str): The service, e.g. 'email_finder'
+        stage (str): The stage, e.g. 'http_fetch'
+        **attrs: Details kept on the trace span, e.g. the URL fetched
+    """
+    start = time.perf_counter()
+    try:
+        with span(f'{component}.{stage}', **attrs):
+            yield
+    except Exception:
+        STAGE_ERRORS.labels(component=component, stage=stage).inc()
+        raise
+    finally:
+        STAGE_DURATION.labels(component=component, stage=stage).observe(time.perf_counter() - start)
+
+
+def timed_stage(component, stage):
+    """Decorator form of `timed`."""
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            with timed(component, stage):
+                return f(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_cache(cache_name, hit):
+    """Count a cache lookup as a hit or a miss."""
+    CACHE_REQUESTS.labels(cache=cache_name, result='hit' if hit else 'miss').inc()
+
+
+def init_app(app, db):
+    """
+    Instrument request handling and SQL execution for an application.
+
+    Args:
+        app (Flask): The Flask application
+        db (SQLAlchemy): The app's database extension
+    """
+    from flask import g, request
+
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    @app.before_request
+    def _start_request_timer():
+        g.metrics_start = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def _finish_request_timer(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        HTTP_REQUESTS_IN_FLIGHT.dec()
+
+        status = g.pop('metrics_status', 500 if exc else 200)
+        HTTP_REQUEST_DURATION.labels(
+            endpoint=request.endpoint or 'unknown',
+            method=request.method,
+            status=status
+        ).observe(time.perf_counter() - start)
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    with app.app_context():
+        engines = {bind_key or 'primary': engine for bind_key, engine in db.engines.items()}
+    for bind, engine in engines.items():
+        _instrument_engine(engine, bind)
+
+
+def _instrument_engine(engine, bind):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+        DB_QUERY_DURATION.labels(bind=bind, operation=operation).observe(time.perf_counter() - starts.pop())
@@ -0,0 +1,154 @@
+import codecs
+import logging
+import re
+import zlib
+from collections import namedtuple
+
+import requests
+from flask import current_app, has_app_context
+
+from app.services.metrics import FETCH_ABORTS
+
+logger = logging.getLogger(__name__)
+
+# A downloaded page; `truncated` is set when the byte budget cut it short
+FetchedPage = namedtuple('FetchedPage', ['url', 'status_code', 'text', 'truncated'])
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Used when there is no app context, e.g. in benchmarks
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024
+DEFAULT_CHUNK_SIZE = 16 * 1024
+
+# Only encodings decoded here are offered to servers
+ACCEPT_ENCODING = 'gzip, deflate'
+
+_BODY_END = b'</body'
+_CHARSET_RE = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+
+
+class UnsupportedContent(requests.RequestException):
+    """Raised when a URL serves something other than HTML."""
+
+
+def _limits():
+    if has_app_context():
+        config = current_app.config
+        return config['FETCH_MAX_BYTES'], config['FETCH_CHUNK_SIZE']
+    return DEFAULT_MAX_BYTES, DEFAULT_CHUNK_SIZE
+
+
+def _charset(content_type):
+    match = _CHARSET_RE.search(content_type)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+def _decompressor(content_encoding):
+    encoding = content_encoding.strip().lower()
+    if encoding in ('', 'identity'):
+        return None
+    if encoding in ('gzip', 'x-gzip', 'deflate'):
+        # 32 + MAX_WBITS detects gzip and zlib headers; raw deflate is retried below
+        return zlib.decompressobj(32 + zlib.MAX_WBITS)
+    raise UnsupportedContent(f"Unsupported Content-Encoding {content_encoding!r}")
+
+
+def _read_body(response, max_bytes, chunk_size):
+    """
+    Read and decompress a streamed body until `</body>` or `max_bytes`.
+
+    Decompression is bounded by the bytes still allowed, so a small
+    compressed body cannot expand past the budget.
+
+    Returns:
+        tuple: (body bytes, reason reading stopped early or None)
+    """
+    decompressor = _decompressor(response.headers.get('Content-Encoding', ''))
+    body = bytearray()
+    raw_read = 0
+    first_chunk = True
+
+    for chunk in response.raw.stream(chunk_size, decode_content=False):
+        raw_read += len(chunk)
+        if decompressor is not None:
+            try:
+                data = decompressor.decompress(chunk, max_bytes - len(body) + 1)
+            except zlib.error:
+                if not first_chunk:
+                    raise
+                # Some servers send raw deflate without the zlib header
+                decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                data = decompressor.decompress(chunk, max_bytes - len(body) + 1)
+        else:
+            data = chunk
+        first_chunk = False
+
+        # Search the new data plus enough of the old to catch a split tag
+        search_from = max(len(body) - len(_BODY_END), 0)
+        body += data
+        end = body[search_from:].lower().find(_BODY_END)
+        if end != -1:
+            return bytes(body[:search_from + end]), 'body_end'
+        if len(body) > max_bytes or raw_read > max_bytes:
+            return bytes(body[:max_bytes]), 'max_bytes'
+
+    if decompressor is not None:
+        body += decompressor.flush()
+    return bytes(body[:max_bytes]), 'max_bytes' if len(body) > max_bytes else None
+
+
+def fetch_page(url, headers=None, timeout=10, max_bytes=None):
+    """
+    Download an HTML page without ever holding more than `max_bytes` of it.
+
+    The body is streamed: non-HTML responses are rejected from their
+    headers before any of it is read, and reading stops at `</body>` or
+    once FETCH_MAX_BYTES have been read or decompressed.
+
+    Args:
+        url (str): The page's URL
+        headers (dict): Request headers
+        timeout (int): Timeout in seconds for connecting and each read
+        max_bytes (int): Byte budget; FETCH_MAX_BYTES if omitted
+
+    Returns:
+        FetchedPage: The page; `text` is empty for error statuses
+
+    Raises:
+        UnsupportedContent: If the response is not HTML
+        requests.RequestException: If the request fails
+    """
+    default_max_bytes, chunk_size = _limits()
+    max_bytes = max_bytes or default_max_bytes
+    headers = dict(headers or {}, **{'Accept-Encoding': ACCEPT_ENCODING})
+
+    with requests.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if response.status_code >= 400:
+            return FetchedPage(response.url, response.status_code, '', False)
+
+        content_type = response.headers.get('Content-Type', '')
+        media_type = content_type.split(';', 1)[0].strip().lower()
+        # A missing Content-Type is let through; plenty of small sites omit it
+        if media_type and media_type not in HTML_CONTENT_TYPES:
+            FETCH_ABORTS.labels(reason='content_type').inc()
+            raise UnsupportedContent(f"Skipping {url}: {media_type} is not HTML")
+
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            logger.debug(f"{url} declares {declared} bytes; reading the first {max_bytes}")
+
+        body, stopped = _read_body(response, max_bytes, chunk_size)
+
+    if stopped:
+        FETCH_ABORTS.labels(reason=stopped).inc()
+    return FetchedPage(
+        url=response.url,
+        status_code=response.status_code,
+        text=body.decode(_charset(content_type), errors='replace'),
+        truncated=stopped == 'max_bytes'
+    )
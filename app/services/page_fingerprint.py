@@ -0,0 +1,124 @@
+import hashlib
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref', 'source'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Pages whose simhashes differ in at most this many of 64 bits are near-duplicates
+SIMHASH_MAX_DISTANCE = 3
+
+# Words per shingle fed into the simhash
+SHINGLE_SIZE = 3
+
+_TAG_RE = re.compile(r'<script\b.*?</script>|<style\b.*?</style>|<[^>]+>', re.S | re.I)
+_WORD_RE = re.compile(r'\w+')
+_MASK = (1 << 64) - 1
+
+
+def normalize_url(url):
+    """
+    Canonical form of a URL for deciding whether it was already fetched.
+
+    Lowercases the scheme and host, drops default ports, fragments, trailing
+    slashes and tracking parameters, and sorts the remaining query. Apex and
+    www hosts are kept apart, since either may be down; identical content on
+    both is caught by the page fingerprint instead.
+
+    Args:
+        url (str): The URL
+
+    Returns:
+        str: The normalized URL
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f'{host}:{parts.port}'
+
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def simhash(text):
+    """
+    64-bit simhash of a page's words, ignoring markup.
+
+    Args:
+        text (str): The page's HTML
+
+    Returns:
+        int: The fingerprint
+    """
+    words = _WORD_RE.findall(_TAG_RE.sub(' ', text).lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [''] * (SHINGLE_SIZE - len(words))
+
+    # hash() is stable within a process, which is all a single crawl needs
+    hashes = {
+        hash(tuple(words[i:i + SHINGLE_SIZE])) & _MASK
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+    # Set each bit that is set in most shingle hashes; counting columns of
+    # the binary strings keeps the per-bit work out of Python loops
+    majority = len(hashes) / 2
+    fingerprint = 0
+    for bit, column in enumerate(zip(*(format(h, '064b') for h in hashes))):
+        if column.count('1') > majority:
+            fingerprint |= 1 << (63 - bit)
+    return fingerprint
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints."""
+    return bin(a ^ b).count('1')
+
+
+class PageDeduplicator:
+    """
+    Remembers the pages seen during one crawl and spots repeats.
+
+    Exact repeats are found with a content hash; near-duplicates (the same
+    page with a different timestamp, session token or nav highlight) with a
+    simhash. Only exact repeats can be skipped outright: a near-duplicate may
+    be a template page that differs in just the email address on it. Safe to
+    share between the crawl's threads.
+    """
+
+    def __init__(self, max_distance=SIMHASH_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._digests = set()
+        self._simhashes = []
+        self._lock = threading.Lock()
+
+    def check(self, text):
+        """
+        Record a downloaded page and report whether it was seen before.
+
+        Args:
+            text (str): The page's HTML
+
+        Returns:
+            str: 'exact' or 'near' for a duplicate, None for a new page
+        """
+        digest = hashlib.blake2b(text.encode('utf-8', 'replace'), digest_size=16).digest()
+        with self._lock:
+            if digest in self._digests:
+                return 'exact'
+            self._digests.add(digest)
+
+        fingerprint = simhash(text)
+        with self._lock:
+            for seen in self._simhashes:
+                if hamming_distance(fingerprint, seen) <= self.max_distance:
+                    return 'near'
+            self._simhashes.append(fingerprint)
+        return None
@@ -0,0 +1,222 @@
+import logging
+import re
+
+from flask import current_app
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import Domain, Email
+
+logger = logging.getLogger(__name__)
+
+# Column weights for ranking: names count most, then the address, then the rest
+WEIGHTS = {'first_name': 5.0, 'last_name': 5.0, 'position': 2.0, 'local_part': 3.0, 'company': 2.0}
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# SQLite: an FTS5 table keyed by emails.id, kept in step by triggers
+SQLITE_LOCAL_PART = "substr({0}.email_address, 1, instr({0}.email_address, '@') - 1)"
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS people_fts USING fts5("
+    "first_name, last_name, position, local_part, company, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS people_fts_insert AFTER INSERT ON emails BEGIN "
+    "INSERT INTO people_fts (rowid, first_name, last_name, position, local_part, company) "
+    f"VALUES (new.id, new.first_name, new.last_name, new.position, {SQLITE_LOCAL_PART.format('new')}, "
+    "(SELECT company_name FROM domains WHERE id = new.domain_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS people_fts_update "
+    "AFTER UPDATE OF first_name, last_name, position, email_address, domain_id ON emails BEGIN "
+    "DELETE FROM people_fts WHERE rowid = old.id; "
+    "INSERT INTO people_fts (rowid, first_name, last_name, position, local_part, company) "
+    f"VALUES (new.id, new.first_name, new.last_name, new.position, {SQLITE_LOCAL_PART.format('new')}, "
+    "(SELECT company_name FROM domains WHERE id = new.domain_id)); END",
+    "CREATE TRIGGER IF NOT EXISTS people_fts_delete AFTER DELETE ON emails BEGIN "
+    "DELETE FROM people_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS people_fts_company AFTER UPDATE OF company_name ON domains BEGIN "
+    "UPDATE people_fts SET company = new.company_name "
+    "WHERE rowid IN (SELECT id FROM emails WHERE domain_id = new.id); END"
+]
+SQLITE_REBUILD = [
+    "DELETE FROM people_fts",
+    "INSERT INTO people_fts (rowid, first_name, last_name, position, local_part, company) "
+    f"SELECT e.id, e.first_name, e.last_name, e.position, {SQLITE_LOCAL_PART.format('e')}, d.company_name "
+    "FROM emails e LEFT JOIN domains d ON d.id = e.domain_id"
+]
+
+# PostgreSQL: trigram GIN indexes on the same expressions the queries use
+POSTGRES_PERSON_DOC = (
+    "lower(coalesce({0}.first_name, '') || ' ' || coalesce({0}.last_name, '') || ' ' || "
+    "coalesce({0}.position, '') || ' ' || split_part({0}.email_address, '@', 1))"
+)
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_emails_people_trgm ON emails "
+    f"USING gin (({POSTGRES_PERSON_DOC.format('emails')}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_domains_company_trgm ON domains "
+    "USING gin ((lower(company_name)) gin_trgm_ops)"
+]
+
+
+# Engines on which the people index has been found
+_indexed_engines = set()
+
+
+def _terms(query):
+    return [term.lower() for term in _TERM_RE.findall(query or '')]
+
+
+def create_people_index(rebuild=False):
+    """
+    Create the index behind people search if it is missing.
+
+    On SQLite this is an FTS5 table with triggers that keep it in step with
+    `emails` and `domains.company_name`; it is filled from the existing emails
+    when it is first created. On PostgreSQL, pg_trgm GIN indexes. Like
+    `db.create_all()`, it leaves existing structures alone.
+
+    Args:
+        rebuild (bool): Repopulate an existing SQLite index from the emails
+            table, e.g. if it was restored out of step with them
+
+    Returns:
+        str: The database dialect the index was created for
+    """
+    dialect = db.engine.dialect.name
+    with db.engine.begin() as conn:
+        if dialect == 'sqlite':
+            # The triggers only see rows written from now on, so a new table is
+            # filled in the same transaction
+            created = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'people_fts'"
+            )).first() is None
+            for statement in SQLITE_DDL + (SQLITE_REBUILD if rebuild or created else []):
+                conn.execute(text(statement))
+        elif dialect == 'postgresql':
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+        else:
+            logger.warning(f"People search has no index for {dialect}; searches will scan the emails table")
+    return dialect
+
+
+def _has_people_index(engine):
+    """Check whether `create_people_index` has run on a database."""
+    if engine in _indexed_engines:
+        return True
+
+    inspector = inspect(engine)
+    if engine.dialect.name == 'sqlite':
+        found = inspector.has_table('people_fts')
+    else:
+        found = 'ix_emails_people_trgm' in {index['name'] for index in inspector.get_indexes('emails')}
+
+    # Only a found index is remembered, so one created later is picked up
+    if found:
+        _indexed_engines.add(engine)
+    return found
+
+
+def _sqlite_matches(terms, limit, offset):
+    # Every term must match, each as a prefix, in any column
+    match = ' '.join(f'"{term}"*' for term in terms)
+    weights = ', '.join(str(weight) for weight in WEIGHTS.values())
+    rows = db.session.execute(text(
+        f"SELECT rowid, bm25(people_fts, {weights}) AS rank FROM people_fts "
+        "WHERE people_fts MATCH :match ORDER BY rank LIMIT :limit OFFSET :offset"
+    ), {'match': match, 'limit': limit, 'offset': offset})
+    # bm25() is lower for better matches; flip it so higher scores rank first
+    return [(email_id, -rank) for email_id, rank in rows]
+
+
+def _postgres_matches(terms, limit, offset):
+    query = ' '.join(terms)
+    person_doc = POSTGRES_PERSON_DOC.format('e')
+    db.session.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+        {'threshold': str(current_app.config['PEOPLE_SEARCH_PG_THRESHOLD'])}
+    )
+    rows = db.session.execute(text(
+        "WITH matches AS ("
+        f" SELECT e.id, word_similarity(:query, {person_doc}) AS score"
+        f" FROM emails e WHERE :query <% {person_doc}"
+        " UNION ALL"
+        " SELECT e.id, word_similarity(:query, lower(d.company_name)) * :company_weight AS score"
+        " FROM domains d JOIN emails e ON e.domain_id = d.id"
+        " WHERE :query <% lower(d.company_name)"
+        ") SELECT id, max(score) AS score FROM matches GROUP BY id"
+        " ORDER BY score DESC, id LIMIT :limit OFFSET :offset"
+    ), {
+        'query': query,
+        'company_weight': WEIGHTS['company'] / WEIGHTS['first_name'],
+        'limit': limit,
+        'offset': offset
+    })
+    return [(email_id, score) for email_id, score in rows]
+
+
+def _scan_matches(terms, limit, offset):
+    # Unindexed fallback for other databases, or before the index is created
+    query = db.session.query(Email.id).outerjoin(Domain, Domain.id == Email.domain_id)
+    for term in terms:
+        pattern = f'%{term}%'
+        query = query.filter(or_(
+            Email.first_name.ilike(pattern),
+            Email.last_name.ilike(pattern),
+            Email.position.ilike(pattern),
+            Email.email_address.ilike(pattern),
+            Domain.company_name.ilike(pattern)
+        ))
+    return [(email_id, None) for email_id, in query.order_by(Email.id).limit(limit).offset(offset)]
+
+
+def search_people(query, page=1, per_page=None):
+    """
+    Find stored people by name, position, email local part or company.
+
+    Results are ranked by relevance and paginated with `page`/`per_page`.
+    Paging stops at PEOPLE_SEARCH_MAX_RESULTS, since deep offsets are slow
+    on any index. Until `create_people_index` has run, matches come from an
+    unranked scan.
+
+    Args:
+        query (str): Free-text query, e.g. 'jane smith acme'
+        page (int): 1-based page number
+        per_page (int): Results per page; PEOPLE_SEARCH_PAGE_SIZE if omitted
+
+    Returns:
+        dict: 'results' as (Email, score) tuples with the domain loaded, and 'has_more'
+    """
+    config = current_app.config
+    per_page = min(per_page or config['PEOPLE_SEARCH_PAGE_SIZE'], config['PEOPLE_SEARCH_MAX_PAGE_SIZE'])
+    offset = (page - 1) * per_page
+    terms = _terms(query)
+    if not terms or offset >= config['PEOPLE_SEARCH_MAX_RESULTS']:
+        return {'results': [], 'has_more': False}
+
+    # One extra row tells whether there is a next page without counting matches
+    limit = min(per_page + 1, config['PEOPLE_SEARCH_MAX_RESULTS'] - offset + 1)
+    engine = db.session.get_bind()
+    dialect = engine.dialect.name
+    indexed = dialect in ('sqlite', 'postgresql') and _has_people_index(engine)
+    if indexed and dialect == 'sqlite':
+        matches = _sqlite_matches(terms, limit, offset)
+    elif indexed:
+        matches = _postgres_matches(terms, limit, offset)
+    else:
+        if dialect in ('sqlite', 'postgresql'):
+            logger.warning("People search index is missing; run 'flask create-people-index'")
+        matches = _scan_matches(terms, limit, offset)
+
+    has_more = len(matches) > per_page and offset + per_page < config['PEOPLE_SEARCH_MAX_RESULTS']
+    matches = matches[:per_page]
+
+    emails = {
+        email.id: email
+        for email in db.session.query(Email).options(joinedload(Email.domain)).filter(
+            Email.id.in_([email_id for email_id, _ in matches])
+        )
+    } if matches else {}
+    return {
+        'results': [(emails[email_id], score) for email_id, score in matches if email_id in emails],
+        'has_more': has_more
+    }
@@ -0,0 +1,46 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Run a function every `interval` seconds on a daemon thread.
+
+    The thread is started on first use rather than at import, so processes
+    that never need it (CLI commands, forked workers before their first
+    request) do not start one.
+    """
+
+    def __init__(self, fn, name, interval):
+        self.fn = fn
+        self.name = name
+        self.interval = interval
+
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the thread unless it is already running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.fn()
+            except Exception as e:
+                logger.error(f"Periodic task {self.name} failed: {str(e)}")
+
+    def stop(self):
+        """Stop the thread after its current run."""
+        self._stop.set()
@@ -0,0 +1,268 @@
+import atexit
+import logging
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from app.services.periodic import PeriodicTask
+
+RateLimitStatus = namedtuple('RateLimitStatus', ['allowed', 'limit', 'remaining', 'reset'])
+
+
+class MemoryCounterStore:
+    """
+    Process-local counter store with per-key expiry.
+
+    Each worker process counts separately, so N processes allow up to N times
+    the limit; use CacheCounterStore with a shared backend for a global limit.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._ops = 0
+
+    def _purge(self, now):
+        expired = [key for key, (_, expires) in self._counters.items() if expires <= now]
+        for key in expired:
+            del self._counters[key]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= time.time():
+                return None
+            return entry[0]
+
+    def add(self, key, value, ttl):
+        """Set the key only if it is not already present."""
+        with self._lock:
+            now = time.time()
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= now:
+                self._counters[key] = (value, now + ttl)
+
+    def incr(self, key, ttl, amount=1):
+        with self._lock:
+            now = time.time()
+            self._ops += 1
+            if self._ops % 1000 == 0:
+                self._purge(now)
+
+            entry = self._counters.get(key)
+            if entry is None or entry[1] <= now:
+                entry = (0, now + ttl)
+            value = entry[0] + amount
+            self._counters[key] = (value, entry[1])
+            return value
+
+    def decr(self, key, amount=1):
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._counters[key] = (entry[0] - amount, entry[1])
+
+
+class CacheCounterStore:
+    """Counter store backed by the app's Flask-Caching backend.
+
+    With a shared backend (redis, memcached) all workers see the same counters.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def add(self, key, value, ttl):
+        self.cache.add(key, value, timeout=ttl)
+
+    def incr(self, key, ttl, amount=1):
+        self.cache.add(key, 0, timeout=ttl)
+        return self.cache.cache.inc(key, amount)
+
+    def decr(self, key, amount=1):
+        self.cache.cache.dec(key, amount)
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter for API requests.
+
+    Counts are kept in a counter store and estimated over a sliding window from
+    the current and previous fixed buckets. Usage is written to the `api_usage`
+    table by a background thread, so the request path never runs aggregate queries.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.store = None
+        self.limit = 0
+        self.window = 86400
+        self.flush_interval = 30
+        self.logger = logging.getLogger(__name__)
+
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flusher = PeriodicTask(self.flush, 'rate-limit-flusher', self.flush_interval)
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the limiter from the application config.
+
+        Args:
+            app (Flask): The Flask application
+        """
+        from app import cache
+
+        self.app = app
+        self.limit = app.config['MAX_REQUESTS_PER_DAY']
+        self.window = app.config.get('RATE_LIMIT_WINDOW', 86400)
+        self.flush_interval = app.config.get('RATE_LIMIT_FLUSH_INTERVAL', 30)
+        self._flusher.interval = self.flush_interval
+
+        if app.config.get('RATE_LIMIT_STORAGE', 'memory') == 'cache':
+            self.store = CacheCounterStore(cache)
+        else:
+            self.store = MemoryCounterStore()
+
+        atexit.register(self.flush)
+
+    def _key(self, user_id, bucket):
+        return f'ratelimit:{user_id}:{bucket}'
+
+    def _bucket_day(self, bucket):
+        return datetime.utcfromtimestamp(bucket * self.window).date()
+
+    def _load_count(self, user_id, bucket):
+        """Seed a bucket from the persisted usage when the store has no entry."""
+        key = self._key(user_id, bucket)
+        count = self.store.get(key)
+        if count is not None:
+            return count
+
+        count = 0
+        if self.window == 86400:
+            # Daily buckets line up with the rows in api_usage
+            from app.models import ApiUsage
+            try:
+                usage = ApiUsage.query.filter_by(
+                    user_id=user_id,
+                    day=self._bucket_day(bucket)
+                ).first()
+                if usage:
+                    count = usage.request_count
+            except Exception as e:
+                self.logger.warning(f"Error loading API usage for user {user_id}: {str(e)}")
+
+        self.store.add(key, count, self.window * 2)
+        return self.store.get(key) or count
+
+    def _estimate(self, user_id, now):
+        bucket = int(now // self.window)
+        elapsed = (now - bucket * self.window) / self.window
+
+        current = self._load_count(user_id, bucket)
+        previous = self._load_count(user_id, bucket - 1)
+
+        return bucket, previous * (1 - elapsed) + current
+
+    def peek(self, user_id):
+        """
+        Return the rate limit status for a user without consuming a request.
+
+        Args:
+            user_id (int): The user's ID
+
+        Returns:
+            RateLimitStatus: Current limit status
+        """
+        now = time.time()
+        bucket, used = self._estimate(user_id, now)
+        remaining = max(0, int(self.limit - used))
+        reset = int((bucket + 1) * self.window)
+        return RateLimitStatus(remaining > 0, self.limit, remaining, reset)
+
+    def hit(self, user_id, cost=1):
+        """
+        Consume requests for a user if the quota allows all of them.
+
+        Args:
+            user_id (int): The user's ID
+            cost (int): Requests to consume, e.g. the rows of a bulk job
+
+        Returns:
+            RateLimitStatus: Limit status after the request
+        """
+        now = time.time()
+        bucket = int(now // self.window)
+        elapsed = (now - bucket * self.window) / self.window
+        reset = int((bucket + 1) * self.window)
+        key = self._key(user_id, bucket)
+
+        self._load_count(user_id, bucket)
+        previous = self._load_count(user_id, bucket - 1)
+
+        # Take the request first and decide from the counter's own result, so
+        # concurrent requests cannot all pass a check made before any counted
+        current = self.store.incr(key, self.window * 2, cost)
+        used = previous * (1 - elapsed) + current
+
+        if used > self.limit:
+            self.store.decr(key, cost)
+            remaining = max(0, int(self.limit - (used - cost)))
+            return RateLimitStatus(False, self.limit, remaining, reset)
+
+        self._record(user_id, self._bucket_day(bucket), cost)
+        self._flusher.start()
+
+        remaining = max(0, int(self.limit - used))
+        return RateLimitStatus(True, self.limit, remaining, reset)
+
+    def _record(self, user_id, day, count=1):
+        with self._pending_lock:
+            key = (user_id, day)
+            self._pending[key] = self._pending.get(key, 0) + count
+
+    def flush(self):
+        """Write pending usage counts to the `api_usage` table."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending or self.app is None:
+            return
+
+        from app import db
+        from app.models import ApiUsage
+
+        with self.app.app_context():
+            try:
+                for (user_id, day), count in pending.items():
+                    updated = ApiUsage.query.filter_by(user_id=user_id, day=day).update(
+                        {ApiUsage.request_count: ApiUsage.request_count + count},
+                        synchronize_session=False
+                    )
+                    if not updated:
+                        db.session.add(ApiUsage(user_id=user_id, day=day, request_count=count))
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.logger.error(f"Error flushing API usage: {str(e)}")
+
+                # Keep the counts for the next flush
+                with self._pending_lock:
+                    for key, count in pending.items():
+                        self._pending[key] = self._pending.get(key, 0) + count
+
+    def stop(self):
+        """Stop the background flusher and write out any pending usage."""
+        self._flusher.stop()
+        self.flush()
+
+
+rate_limiter = RateLimiter()
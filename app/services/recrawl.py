@@ -0,0 +1,148 @@
+import logging
+import math
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import case, func, literal
+
+from app import db
+from app.models import CrawlTask, Domain, Search
+from app.services.crawl_queue import ACTIVE_STATUSES, enqueue_crawl
+from app.services.db_utils import epoch_seconds
+
+logger = logging.getLogger(__name__)
+
+# Most overdue candidates fetched per free slot, re-ranked by popularity in Python
+CANDIDATE_FACTOR = 5
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def target_age(searches, max_age, min_age):
+    """
+    How old a domain's data may get before it is recrawled.
+
+    Popular domains are refreshed more often: the maximum age is divided by
+    one plus the recent search count, but never drops below the minimum.
+
+    Args:
+        searches (int): Recent domain searches
+        max_age (timedelta): Age limit for domains nobody searches
+        min_age (timedelta): Shortest interval between crawls
+
+    Returns:
+        timedelta: The domain's target age
+    """
+    return max(min_age, max_age / (1 + searches))
+
+
+def _popularity_subquery(since):
+    return db.session.query(
+        Search.query.label('domain_name'),
+        func.count(Search.id).label('searches')
+    ).filter(
+        Search.search_type == 'domain',
+        Search.created_at >= since
+    ).group_by(Search.query).subquery()
+
+
+def select_stale_domains(limit, now=None):
+    """
+    Pick the domains that most need a recrawl.
+
+    A domain is due once it is older than its target age (see `target_age`).
+    The database returns the due domains that are furthest past that age,
+    which are then ranked with extra weight for popularity. On databases
+    without date arithmetic support the oldest domains are considered instead.
+
+    Args:
+        limit (int): Maximum number of domains to return
+        now (datetime): Current time, for testing
+
+    Returns:
+        list: (Domain, searches, score) tuples, most overdue first
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    max_age = timedelta(days=config['RECRAWL_MAX_AGE_DAYS'])
+    min_age = timedelta(hours=config['RECRAWL_MIN_AGE_HOURS'])
+    popularity = _popularity_subquery(now - timedelta(days=config['RECRAWL_POPULARITY_DAYS']))
+
+    active = db.session.query(CrawlTask.id).filter(
+        CrawlTask.domain_id == Domain.id,
+        CrawlTask.status.in_(ACTIVE_STATUSES)
+    ).exists()
+    searches = func.coalesce(popularity.c.searches, 0)
+
+    query = db.session.query(Domain, searches).outerjoin(
+        popularity, popularity.c.domain_name == Domain.domain_name
+    ).filter(
+        Domain.updated_at < now - min_age,
+        ~active
+    )
+
+    # Rank by how far past its target age each domain is before limiting, so
+    # a long-neglected domain is never crowded out by popular, fresher ones
+    updated = epoch_seconds(db.session.get_bind().dialect.name, Domain.updated_at)
+    if updated is not None:
+        age = literal((now - _EPOCH).total_seconds()) - updated
+        spread = literal(max_age.total_seconds()) / (literal(1.0) + searches)
+        target = case((spread > min_age.total_seconds(), spread), else_=literal(min_age.total_seconds()))
+        query = query.filter(age >= target).order_by((age / target).desc(), Domain.id)
+    else:
+        query = query.order_by(Domain.updated_at)
+    candidates = query.limit(limit * CANDIDATE_FACTOR).all()
+
+    due = []
+    for domain_obj, count in candidates:
+        age = now - domain_obj.updated_at
+        target = target_age(count, max_age, min_age)
+        if age >= target:
+            score = (age / target) * math.log2(2 + count)
+            due.append((domain_obj, count, score))
+
+    due.sort(key=lambda item: item[2], reverse=True)
+    return due[:limit]
+
+
+def schedule_recrawls(now=None):
+    """
+    Queue recrawls of stale domains within the crawl budget.
+
+    Each run may queue RECRAWL_BUDGET_PER_HOUR scaled to RECRAWL_INTERVAL,
+    less what is still waiting from earlier runs. The queued tasks are
+    spread across the interval so workers see a steady trickle.
+
+    Recrawls add and update emails but never remove any: addresses that
+    have disappeared from a site stay stored (see `upsert_emails`).
+
+    Args:
+        now (datetime): Current time, for testing
+
+    Returns:
+        list: (Domain, searches, score) tuples that were queued
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    interval = config['RECRAWL_INTERVAL']
+    budget = math.ceil(config['RECRAWL_BUDGET_PER_HOUR'] * interval / 3600)
+
+    backlog = db.session.query(func.count(CrawlTask.id)).filter(
+        CrawlTask.status == 'queued',
+        CrawlTask.priority <= config['RECRAWL_PRIORITY']
+    ).scalar()
+    slots = budget - backlog
+    if slots <= 0:
+        logger.info(f"Recrawl backlog of {backlog} tasks fills the budget; nothing scheduled")
+        return []
+
+    selected = select_stale_domains(slots, now=now)
+    step = interval / max(len(selected), 1)
+    for i, (domain_obj, _, _) in enumerate(selected):
+        enqueue_crawl(
+            domain_obj.id,
+            priority=config['RECRAWL_PRIORITY'],
+            run_after=now + timedelta(seconds=i * step)
+        )
+    db.session.commit()
+    return selected
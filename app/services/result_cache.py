@@ -0,0 +1,118 @@
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import cache, db
+from app.services.metrics import record_cache
+
+_PENDING_KEY = 'result_cache_invalidate'
+
+
+def _timeout():
+    return current_app.config.get('RESULT_CACHE_TIMEOUT', 600)
+
+
+def domain_cache_key(domain):
+    return f'result:domain:{domain.strip().lower()}'
+
+
+def verify_cache_key(email):
+    return f'result:verify:{email.strip().lower()}'
+
+
+def get_domain_results(domain):
+    """
+    Get cached search results for a domain.
+
+    Args:
+        domain (str): Domain name
+
+    Returns:
+        dict: {'domain': {...}, 'emails': [...]} or None if not cached
+    """
+    results = cache.get(domain_cache_key(domain))
+    record_cache('domain_results', results is not None)
+    return results
+
+
+def set_domain_results(domain_obj, emails):
+    """
+    Cache a domain and its emails as plain data.
+
+    Empty results are not cached so the next search still crawls.
+
+    Args:
+        domain_obj (Domain): The domain
+        emails (list): The domain's Email rows
+
+    Returns:
+        dict: The cached results
+    """
+    results = {
+        'domain': {
+            'id': domain_obj.id,
+            'domain_name': domain_obj.domain_name,
+            'company_name': domain_obj.company_name
+        },
+        'emails': [
+            {
+                'id': email.id,
+                'email_address': email.email_address,
+                'first_name': email.first_name,
+                'last_name': email.last_name,
+                'position': email.position,
+                'confidence_score': email.confidence_score,
+                'is_verified': email.is_verified
+            } for email in emails
+        ]
+    }
+
+    if emails:
+        cache.set(domain_cache_key(domain_obj.domain_name), results, timeout=_timeout())
+    return results
+
+
+def get_verification(email):
+    """Get a cached verification result, or None if not cached."""
+    is_valid = cache.get(verify_cache_key(email))
+    record_cache('verification', is_valid is not None)
+    return is_valid
+
+
+def set_verification(email, is_valid):
+    """Cache the verification result for an email address."""
+    cache.set(verify_cache_key(email), is_valid, timeout=_timeout())
+
+
+def invalidate_on_commit(domain=None, email=None):
+    """
+    Drop cached results for a domain and/or email once the current
+    transaction commits, so readers never re-cache uncommitted state.
+
+    Args:
+        domain (str): Domain whose email list changed
+        email (str): Email whose verification result changed
+    """
+    pending = db.session.info.setdefault(_PENDING_KEY, set())
+    if domain:
+        pending.add(domain_cache_key(domain))
+    if email:
+        pending.add(verify_cache_key(email))
+
+
+def invalidate_email(email_obj):
+    """Invalidate everything cached about an Email row once the transaction commits."""
+    domain = email_obj.domain.domain_name if email_obj.domain_id else None
+    invalidate_on_commit(domain=domain, email=email_obj.email_address)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    if keys:
+        cache.delete_many(*keys)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
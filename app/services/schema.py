@@ -0,0 +1,54 @@
+import logging
+
+from sqlalchemy import inspect, text
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns():
+    """
+    Add model columns that are missing from existing tables.
+
+    `db.create_all()` creates missing tables but never alters existing ones,
+    so columns added to a model later (e.g. the canonical host columns on
+    `domains`) need an ALTER TABLE on databases created before them. Only
+    nullable columns without server defaults are added; anything else needs
+    a migration. Safe to run repeatedly, and from several processes at once.
+
+    Returns:
+        list: 'table.column' names of the columns added
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+
+    added = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable or column.server_default is not None:
+                logger.warning(f"Column {table.name}.{column.name} is missing and needs a migration")
+                continue
+
+            column_type = column.type.compile(dialect=engine.dialect)
+            statement = (f'ALTER TABLE {preparer.format_table(table)} '
+                         f'ADD COLUMN {preparer.format_column(column)} {column_type}')
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(statement))
+            except Exception:
+                # Another process may have added it first
+                if column.name in {c['name'] for c in inspect(engine).get_columns(table.name)}:
+                    continue
+                raise
+            logger.info(f"Added column {table.name}.{column.name}")
+            added.append(f'{table.name}.{column.name}')
+    return added
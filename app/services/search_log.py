@@ -0,0 +1,106 @@
+import atexit
+import logging
+import threading
+from collections import namedtuple
+from datetime import datetime
+
+from app.services.periodic import PeriodicTask
+
+# A search answered from the result cache, waiting to be written to the history
+PendingSearch = namedtuple('PendingSearch', ['user_id', 'query', 'search_type', 'results_count', 'domain_id', 'created_at'])
+
+
+class SearchLog:
+    """
+    Buffered search history for requests served from the result cache.
+
+    A cache hit should not touch the database, but it still belongs in the
+    user's history and usage counters. Hits are queued in memory and written
+    in one transaction by a background thread, the same way as the rate
+    limiter's usage counts. Searches that reach the database are recorded
+    inline as before.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.flush_interval = 5
+        self.logger = logging.getLogger(__name__)
+
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flusher = PeriodicTask(self.flush, 'search-log-flusher', self.flush_interval)
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Configure the log from the application config.
+
+        Args:
+            app (Flask): The Flask application
+        """
+        self.app = app
+        self.flush_interval = app.config.get('SEARCH_LOG_FLUSH_INTERVAL', 5)
+        self._flusher.interval = self.flush_interval
+        atexit.register(self.flush)
+
+    def record(self, user_id, query, search_type, results_count=0, domain_id=None):
+        """
+        Queue a search for the history.
+
+        Args:
+            user_id (int): The user's ID
+            query (str): What was searched
+            search_type (str): 'domain', 'email', 'verify', ...
+            results_count (int): Results returned
+            domain_id (int): For domain searches, the domain to link to the user
+        """
+        with self._pending_lock:
+            self._pending.append(PendingSearch(
+                user_id, query, search_type, results_count, domain_id, datetime.utcnow()
+            ))
+        self._flusher.start()
+
+    def flush(self):
+        """Write queued searches to the `searches` table."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+
+        if not pending or self.app is None:
+            return
+
+        from app import db
+        from app.models import Search
+        from app.services.user_library import record_domain_search
+
+        with self.app.app_context():
+            try:
+                # ORM inserts, so the user_stats counters still see every search
+                db.session.add_all([
+                    Search(
+                        user_id=search.user_id,
+                        query=search.query,
+                        search_type=search.search_type,
+                        results_count=search.results_count,
+                        created_at=search.created_at
+                    ) for search in pending
+                ])
+                for user_id, domain_id in {(s.user_id, s.domain_id) for s in pending if s.domain_id}:
+                    record_domain_search(user_id, domain_id)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self.logger.error(f"Error flushing search history: {str(e)}")
+
+                # Keep the searches for the next flush
+                with self._pending_lock:
+                    self._pending[:0] = pending
+
+    def stop(self):
+        """Stop the background flusher and write out any queued searches."""
+        self._flusher.stop()
+        self.flush()
+
+
+search_log = SearchLog()
@@ -0,0 +1,125 @@
+import logging
+from datetime import datetime, time, timedelta
+
+from flask import current_app
+from sqlalchemy import and_, func, literal, select
+
+from app import db
+from app.models import Search, SearchArchive, SearchDailyRollup
+from app.services.db_utils import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+
+def _rollup_range(start, end):
+    """Add the searches in [start, end) to the daily rollups for start's day."""
+    searches = Search.__table__
+    rollups = SearchDailyRollup.__table__
+
+    totals = select(
+        searches.c.user_id,
+        literal(start.date(), type_=db.Date),
+        searches.c.search_type,
+        func.count(searches.c.id),
+        func.coalesce(func.sum(searches.c.results_count), 0)
+    ).where(
+        and_(searches.c.created_at >= start, searches.c.created_at < end)
+    ).group_by(searches.c.user_id, searches.c.search_type)
+
+    columns = ['user_id', 'day', 'search_type', 'search_count', 'results_count']
+    insert = dialect_insert(db.session.get_bind().dialect.name)
+
+    if insert is None:
+        db.session.execute(rollups.insert().from_select(columns, totals))
+        return
+
+    stmt = insert(rollups).from_select(columns, totals)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'day', 'search_type'],
+        set_={
+            'search_count': rollups.c.search_count + stmt.excluded.search_count,
+            'results_count': rollups.c.results_count + stmt.excluded.results_count
+        }
+    )
+    db.session.execute(stmt)
+
+
+def _prune_range(start, end, archive):
+    """Roll up, optionally archive, and delete the searches in [start, end)."""
+    searches = Search.__table__
+    in_range = and_(searches.c.created_at >= start, searches.c.created_at < end)
+
+    _rollup_range(start, end)
+
+    if archive:
+        columns = ['id', 'user_id', 'query', 'search_type', 'results_count', 'created_at']
+        db.session.execute(
+            SearchArchive.__table__.insert().from_select(
+                columns,
+                select(*[searches.c[name] for name in columns]).where(in_range)
+            )
+        )
+
+    return db.session.execute(searches.delete().where(in_range)).rowcount
+
+
+def prune_searches(retention_days=None, archive=None):
+    """
+    Roll raw searches older than the retention period into daily per-user
+    aggregates and remove them from the searches table.
+
+    Each day is rolled up and deleted in its own transaction, so a rerun after
+    a failure never counts a search twice.
+
+    Args:
+        retention_days (int): Keep searches newer than this many days
+            (defaults to SEARCH_RETENTION_DAYS)
+        archive (bool): Copy pruned rows to searches_archive before deleting
+            (defaults to SEARCH_ARCHIVE)
+
+    Returns:
+        dict: Number of days processed and searches pruned
+    """
+    if retention_days is None:
+        retention_days = current_app.config['SEARCH_RETENTION_DAYS']
+    if archive is None:
+        archive = current_app.config['SEARCH_ARCHIVE']
+
+    cutoff = datetime.combine((datetime.utcnow() - timedelta(days=retention_days)).date(), time.min)
+    oldest = db.session.execute(select(func.min(Search.__table__.c.created_at))).scalar()
+
+    stats = {'days': 0, 'rows': 0}
+    if oldest is None or oldest >= cutoff:
+        return stats
+
+    day_start = datetime.combine(oldest.date(), time.min)
+    while day_start < cutoff:
+        day_end = min(day_start + timedelta(days=1), cutoff)
+        try:
+            pruned = _prune_range(day_start, day_end, archive)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error pruning searches for {day_start.date()}: {str(e)}")
+            raise
+
+        stats['days'] += 1
+        stats['rows'] += pruned
+        day_start = day_end
+
+    logger.info(f"Pruned {stats['rows']} searches over {stats['days']} days")
+    return stats
+
+
+def create_search_indexes():
+    """
+    Create any missing indexes on the searches table.
+
+    `db.create_all()` does not add indexes to tables that already exist.
+
+    Returns:
+        list: Names of the indexes on the table
+    """
+    for index in Search.__table__.indexes:
+        index.create(bind=db.engine, checkfirst=True)
+    return sorted(index.name for index in Search.__table__.indexes)
@@ -0,0 +1,55 @@
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def _default(value):
+    """Encode values neither backend handles natively (e.g. Decimal)."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def dumps_json(data):
+    """
+    Encode data as compact UTF-8 JSON, using orjson when it is installed.
+
+    Args:
+        data: JSON-compatible data; datetimes are written as ISO 8601
+
+    Returns:
+        bytes: The encoded document
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def dumps_msgpack(data):
+    """
+    Encode data as MessagePack.
+
+    Args:
+        data: JSON-compatible data; datetimes are written as ISO 8601
+
+    Returns:
+        bytes: The encoded document
+
+    Raises:
+        RuntimeError: If msgpack is not installed
+    """
+    if msgpack is None:
+        raise RuntimeError('msgpack is not installed')
+    return msgpack.packb(data, default=_default, use_bin_type=True)
@@ -0,0 +1,240 @@
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.services.metrics import SINGLE_FLIGHT_IN_FLIGHT
+
+
+def domain_key(domain):
+    """Single-flight key for a bulk crawl of a domain."""
+    return f'domain:{domain.strip().lower()}'
+
+
+def person_key(domain, first_name=None, last_name=None):
+    """Single-flight key for finding one person's email at a domain."""
+    first = (first_name or '').strip().lower()
+    last = (last_name or '').strip().lower()
+    return f'person:{domain.strip().lower()}:{first}:{last}'
+
+
+class _Call:
+    """An in-flight computation that other threads can wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations for the same key.
+
+    Within a process, callers that arrive while a computation is running wait
+    for it and share its result. Across workers, a row in `crawl_leases` marks
+    the key as taken and is renewed while the computation runs; the other
+    workers wait for it to be marked completed and then read the stored
+    result instead of computing it again. A lease that is released after a
+    failure, or expires after a crash, is taken over by the next waiter.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.logger = logging.getLogger(__name__)
+
+    def do(self, key, fn, load=None):
+        """
+        Run `fn` once for all concurrent callers of `key`.
+
+        Args:
+            key (str): The key identifying the computation
+            fn (callable): Computes the result
+            load (callable): Reads the result another worker stored; returns
+                None if there is nothing usable yet
+
+        Returns:
+            The result of `fn`, or of `load` when another worker computed it
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            with SINGLE_FLIGHT_IN_FLIGHT.track_inprogress():
+                call.result = self._run_leased(key, fn, load)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def in_flight(self):
+        """Return the number of keys currently being computed in this process."""
+        with self._lock:
+            return len(self._calls)
+
+    def _run_leased(self, key, fn, load):
+        if not current_app.config.get('SINGLE_FLIGHT_USE_LEASE', True):
+            return fn()
+
+        ttl = current_app.config.get('SINGLE_FLIGHT_LEASE_SECONDS', 300)
+        poll_interval = current_app.config.get('SINGLE_FLIGHT_POLL_INTERVAL', 1.0)
+
+        while True:
+            if self._acquire(key, ttl):
+                return self._run_holding(key, fn, ttl)
+
+            # Another worker holds the lease; wait for it to finish or expire
+            completed = self._wait_for_lease(key, poll_interval)
+
+            if load is not None:
+                result = load()
+                # A completed computation may legitimately have stored nothing
+                if result is not None or completed:
+                    return result
+
+    def _run_holding(self, key, fn, ttl):
+        """Run `fn` under the lease, renewing it until `fn` returns."""
+        app = current_app._get_current_object()
+        stop = threading.Event()
+        keep_alive = threading.Thread(
+            target=self._keep_alive, args=(app, key, ttl, stop), daemon=True
+        )
+        keep_alive.start()
+
+        try:
+            result = fn()
+        except Exception:
+            stop.set()
+            self._release(key)
+            raise
+
+        stop.set()
+        self._complete(key)
+        return result
+
+    def _keep_alive(self, app, key, ttl, stop):
+        with app.app_context():
+            while not stop.wait(ttl / 3):
+                try:
+                    if not self._renew(key, ttl):
+                        self.logger.warning(f"Lost the lease on {key}")
+                        return
+                except Exception as e:
+                    self.logger.error(f"Error renewing lease {key}: {str(e)}")
+
+    def _wait_for_lease(self, key, poll_interval):
+        """
+        Wait until no worker holds the lease on `key`.
+
+        Returns:
+            bool: True if the holder completed, False if it failed or expired
+        """
+        from app.models import CrawlLease
+
+        table = CrawlLease.__table__
+        while True:
+            with db.engine.connect() as conn:
+                row = conn.execute(table.select().where(table.c.key == key)).first()
+
+            if row is None:
+                return False
+            if row.completed_at is not None:
+                return True
+            if row.expires_at < datetime.utcnow():
+                return False
+            time.sleep(poll_interval)
+
+    def _acquire(self, key, ttl):
+        from app.models import CrawlLease
+
+        table = CrawlLease.__table__
+        now = datetime.utcnow()
+
+        try:
+            with db.engine.begin() as conn:
+                # Take over leases abandoned by crashed workers or already completed
+                conn.execute(table.delete().where(table.c.key == key, table.c.expires_at < now))
+                # Completed leases are only kept long enough for waiters to see them
+                conn.execute(table.delete().where(table.c.completed_at < now - timedelta(seconds=ttl)))
+
+            with db.engine.begin() as conn:
+                conn.execute(table.insert().values(
+                    key=key,
+                    owner=self.owner,
+                    expires_at=now + timedelta(seconds=ttl),
+                    created_at=now
+                ))
+            return True
+        except IntegrityError:
+            return False
+
+    def _renew(self, key, ttl):
+        """
+        Extend a lease this worker holds.
+
+        Returns:
+            bool: False if the worker no longer holds the lease
+        """
+        from app.models import CrawlLease
+
+        table = CrawlLease.__table__
+        with db.engine.begin() as conn:
+            result = conn.execute(table.update().where(
+                table.c.key == key,
+                table.c.owner == self.owner,
+                table.c.completed_at.is_(None)
+            ).values(expires_at=datetime.utcnow() + timedelta(seconds=ttl)))
+        return result.rowcount == 1
+
+    def _complete(self, key):
+        """Mark the lease completed so waiting workers use the stored result."""
+        from app.models import CrawlLease
+
+        table = CrawlLease.__table__
+        now = datetime.utcnow()
+        try:
+            with db.engine.begin() as conn:
+                # Expired straight away, so the next caller can take the key
+                conn.execute(table.update().where(
+                    table.c.key == key,
+                    table.c.owner == self.owner
+                ).values(completed_at=now, expires_at=now))
+        except Exception as e:
+            self.logger.error(f"Error completing lease {key}: {str(e)}")
+
+    def _release(self, key):
+        from app.models import CrawlLease
+
+        table = CrawlLease.__table__
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(table.delete().where(table.c.key == key, table.c.owner == self.owner))
+        except Exception as e:
+            self.logger.error(f"Error releasing lease {key}: {str(e)}")
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,330 @@
+import contextvars
+import cProfile
+import io
+import itertools
+import json
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# The trace being recorded for the current request, and the innermost open span
+_current_trace = contextvars.ContextVar('current_trace', default=None)
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# tracemalloc is process-wide, so only one request captures memory at a time
+_memory_lock = threading.Lock()
+
+# Longest SQL statement kept on a db.query span
+MAX_STATEMENT_LENGTH = 200
+
+
+class Trace:
+    """Spans and optional profiles recorded for one request."""
+
+    def __init__(self, trigger):
+        self.id = uuid.uuid4().hex
+        self.trigger = trigger
+        self.started_at = datetime.utcnow()
+        self.start = time.perf_counter()
+        self.spans = []
+        self._span_ids = itertools.count(1)
+        self.profile = None
+        self.memory = None
+
+    def new_span_id(self):
+        return next(self._span_ids)
+
+    def add_span(self, span_id, parent_id, name, start, end, attrs, error=None):
+        self.spans.append({
+            'id': span_id,
+            'parent_id': parent_id,
+            'name': name,
+            'start_ms': round((start - self.start) * 1000, 3),
+            'duration_ms': round((end - start) * 1000, 3),
+            'attrs': attrs,
+            'error': error
+        })
+
+
+def current_trace():
+    """Return the trace recorded for the current request, or None."""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Record a nested span on the current trace.
+
+    Does nothing beyond a context variable lookup when the request is not
+    being traced.
+
+    Args:
+        name (str): Span name, e.g. 'email_finder.http_fetch'
+        **attrs: Extra details stored with the span
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    # Reserve the id up front so child spans can point at it
+    span_id = trace.new_span_id()
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        raise
+    finally:
+        end = time.perf_counter()
+        _current_span.reset(token)
+        trace.add_span(span_id, parent, name, start, end, attrs, error)
+
+
+def record_span(name, start, end, **attrs):
+    """Record an already-timed span on the current trace, if there is one."""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    trace.add_span(trace.new_span_id(), _current_span.get(), name, start, end, attrs)
+
+
+class TraceStore:
+    """Keeps finished traces as JSON files so any worker can serve them."""
+
+    def __init__(self, directory, max_stored):
+        self.directory = directory
+        self.max_stored = max_stored
+
+    def _path(self, trace_id):
+        return os.path.join(self.directory, f'{trace_id}.json')
+
+    def save(self, record):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(record['id']), 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        self._prune()
+
+    def _prune(self):
+        files = self._files()
+        for name in files[self.max_stored:]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def _files(self):
+        """Stored trace files, newest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+        return sorted(
+            names,
+            key=lambda name: os.path.getmtime(os.path.join(self.directory, name)),
+            reverse=True
+        )
+
+    def get(self, trace_id):
+        """
+        Load a stored trace.
+
+        Args:
+            trace_id (str): The trace ID from the X-Trace-Id header
+
+        Returns:
+            dict: The trace, or None if it is unknown or has been pruned
+        """
+        if not trace_id.isalnum():
+            return None
+        try:
+            with open(self._path(trace_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def list(self, limit=50):
+        """Summaries of the most recent traces, newest first."""
+        summaries = []
+        for name in self._files()[:limit]:
+            record = self.get(name[:-len('.json')])
+            if record:
+                summaries.append({
+                    key: record.get(key) for key in (
+                        'id', 'method', 'path', 'status', 'trigger', 'started_at', 'duration_ms'
+                    )
+                })
+        return summaries
+
+
+def get_store(app):
+    """Return the trace store configured for an application."""
+    return TraceStore(app.config['TRACE_DIR'], app.config['TRACE_MAX_STORED'])
+
+
+def _format_profile(profiler, limit):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def _memory_top(snapshot, limit):
+    return [
+        {
+            'location': str(stat.traceback),
+            'size_kb': round(stat.size / 1024, 1),
+            'count': stat.count
+        }
+        for stat in snapshot.statistics('lineno')[:limit]
+    ]
+
+
+def init_app(app, db):
+    """
+    Trace requests that carry the admin trace token, plus a random sample.
+
+    Send `X-Trace-Token: <TRACE_ADMIN_TOKEN>` to trace a request, and add
+    `X-Trace-Profile: cpu,memory` to also capture a cProfile and a
+    tracemalloc snapshot. The response carries `X-Trace-Id` for looking the
+    trace up under /admin/traces.
+
+    Args:
+        app (Flask): The Flask application
+        db (SQLAlchemy): The app's database extension
+    """
+    import hmac
+
+    from flask import g, request
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    admin_token = app.config.get('TRACE_ADMIN_TOKEN')
+    sample_rate = app.config.get('TRACE_SAMPLE_RATE', 0.0)
+    if not admin_token and not sample_rate:
+        return
+
+    profile_limit = app.config.get('TRACE_PROFILE_LIMIT', 40)
+
+    @app.before_request
+    def _start_trace():
+        trigger = None
+        supplied = request.headers.get('X-Trace-Token')
+        if supplied and admin_token and hmac.compare_digest(supplied, admin_token):
+            trigger = 'header'
+        elif sample_rate and random.random() < sample_rate:
+            trigger = 'sample'
+        if trigger is None:
+            return
+
+        trace = Trace(trigger)
+        g.trace = trace
+        g.trace_token = _current_trace.set(trace)
+
+        # Profiles are only taken on request, never for sampled traffic
+        options = set()
+        if trigger == 'header':
+            options = {o.strip() for o in request.headers.get('X-Trace-Profile', '').lower().split(',')}
+        if 'cpu' in options:
+            g.trace_profiler = cProfile.Profile()
+            g.trace_profiler.enable()
+        if 'memory' in options and _memory_lock.acquire(blocking=False):
+            g.trace_memory = True
+            tracemalloc.start()
+
+    @app.after_request
+    def _add_trace_header(response):
+        trace = g.get('trace')
+        if trace is not None:
+            response.headers['X-Trace-Id'] = trace.id
+            g.trace_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_trace(exc):
+        trace = g.pop('trace', None)
+        if trace is None:
+            return
+        try:
+            _current_trace.reset(g.pop('trace_token'))
+        except ValueError:
+            # Streamed responses finish in a different context
+            pass
+        duration_ms = round((time.perf_counter() - trace.start) * 1000, 3)
+
+        profiler = g.pop('trace_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            trace.profile = _format_profile(profiler, profile_limit)
+
+        if g.pop('trace_memory', False):
+            try:
+                trace.memory = _memory_top(tracemalloc.take_snapshot(), profile_limit)
+            finally:
+                tracemalloc.stop()
+                _memory_lock.release()
+
+        record = {
+            'id': trace.id,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'endpoint': request.endpoint,
+            'status': g.pop('trace_status', 500 if exc else None),
+            'trigger': trace.trigger,
+            'started_at': trace.started_at.isoformat(),
+            'duration_ms': duration_ms,
+            'error': f'{type(exc).__name__}: {exc}' if exc else None,
+            'spans': sorted(trace.spans, key=lambda s: s['start_ms']),
+            'profile': trace.profile,
+            'memory': trace.memory
+        }
+        try:
+            get_store(app).save(record)
+        except OSError as e:
+            logger.error(f"Error saving trace {trace.id}: {str(e)}")
+
+    with app.app_context():
+        engines = {bind_key or 'primary': engine for bind_key, engine in db.engines.items()}
+    for bind, engine in engines.items():
+        _trace_engine(engine, bind)
+
+    @event.listens_for(Session, 'before_commit')
+    def _trace_commit_start(session):
+        if _current_trace.get() is not None:
+            session.info['trace_commit_start'] = time.perf_counter()
+
+    @event.listens_for(Session, 'after_commit')
+    def _trace_commit_end(session):
+        start = session.info.pop('trace_commit_start', None)
+        if start is not None:
+            record_span('db.commit', start, time.perf_counter())
+
+
+def _trace_engine(engine, bind):
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _trace_query_start(conn, cursor, statement, parameters, context, executemany):
+        if _current_trace.get() is not None:
+            conn.info.setdefault('trace_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _trace_query_end(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('trace_query_start')
+        if _current_trace.get() is None or not starts:
+            return
+        record_span('db.query', starts.pop(), time.perf_counter(),
+                    bind=bind, statement=statement[:MAX_STATEMENT_LENGTH])
@@ -0,0 +1,134 @@
+from datetime import datetime
+
+from sqlalchemy import func, literal, select
+
+from app import db
+from app.models import Domain, Email, Search, UserDomain, UserSavedEmail
+from app.services.db_utils import insert_ignore
+
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def save_domain_emails(user_id, domain_id, saved_at=None):
+    """
+    Save all of a domain's emails for a user in one INSERT ... SELECT.
+
+    Args:
+        user_id (int): The user's ID
+        domain_id (int): The domain's ID
+        saved_at (datetime): Timestamp for the new rows
+    """
+    saved_at = saved_at or datetime.utcnow()
+    domain_emails = select(
+        literal(user_id),
+        Email.id,
+        literal(saved_at)
+    ).where(Email.domain_id == domain_id)
+
+    db.session.execute(
+        insert_ignore(_dialect_name(), UserSavedEmail.__table__).from_select(
+            ['user_id', 'email_id', 'created_at'],
+            domain_emails
+        )
+    )
+
+
+def record_domain_search(user_id, domain_id, refresh=False):
+    """
+    Link a user to a domain they searched and save the domain's emails for them.
+
+    The caller owns the transaction and must commit.
+
+    Args:
+        user_id (int): The user's ID
+        domain_id (int): The domain's ID
+        refresh (bool): Save the domain's emails even if the user already had the
+            domain, e.g. after a crawl found new emails
+
+    Returns:
+        bool: True if the domain was new for the user
+    """
+    now = datetime.utcnow()
+    added = db.session.execute(
+        insert_ignore(_dialect_name(), UserDomain.__table__).values(
+            user_id=user_id,
+            domain_id=domain_id,
+            created_at=now
+        )
+    ).rowcount
+
+    if added or refresh:
+        save_domain_emails(user_id, domain_id, now)
+
+    return bool(added)
+
+
+def record_saved_email(user_id, email_id):
+    """
+    Save a single email for a user. The caller must commit.
+
+    Args:
+        user_id (int): The user's ID
+        email_id (int): The email's ID
+    """
+    db.session.execute(
+        insert_ignore(_dialect_name(), UserSavedEmail.__table__).values(
+            user_id=user_id,
+            email_id=email_id,
+            created_at=datetime.utcnow()
+        )
+    )
+
+
+def backfill_associations():
+    """
+    Populate user_domains and user_saved_emails from existing domain searches.
+
+    Safe to run more than once; existing associations are kept.
+
+    Returns:
+        tuple: (user_domains rows added, user_saved_emails rows added)
+    """
+    searches = Search.__table__
+    domains = Domain.__table__
+    user_domains = UserDomain.__table__
+    emails = Email.__table__
+    dialect_name = _dialect_name()
+
+    searched_domains = select(
+        searches.c.user_id,
+        domains.c.id,
+        func.min(searches.c.created_at)
+    ).select_from(
+        searches.join(domains, domains.c.domain_name == searches.c.query)
+    ).where(
+        searches.c.search_type == 'domain',
+        searches.c.user_id.isnot(None)
+    ).group_by(searches.c.user_id, domains.c.id)
+
+    domains_added = db.session.execute(
+        insert_ignore(dialect_name, user_domains).from_select(
+            ['user_id', 'domain_id', 'created_at'],
+            searched_domains
+        )
+    ).rowcount
+
+    domain_emails = select(
+        user_domains.c.user_id,
+        emails.c.id,
+        user_domains.c.created_at
+    ).select_from(
+        user_domains.join(emails, emails.c.domain_id == user_domains.c.domain_id)
+    ).where(emails.c.id.isnot(None))
+
+    emails_added = db.session.execute(
+        insert_ignore(dialect_name, UserSavedEmail.__table__).from_select(
+            ['user_id', 'email_id', 'created_at'],
+            domain_emails
+        )
+    ).rowcount
+
+    db.session.commit()
+    return domains_added, emails_added
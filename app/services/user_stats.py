@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Search, SearchDailyRollup, UserStats
+from app.services.db_routing import use_primary
+from app.services.db_utils import insert_ignore
+
+
+def _history_totals(connection, user_id):
+    """
+    Aggregate a user's full search history (only used to seed the counters).
+
+    Searches pruned by search_retention survive only in the daily rollups,
+    so those are added to the raw rows.
+    """
+    searches = Search.__table__
+    rollups = SearchDailyRollup.__table__
+    raw = connection.execute(
+        select(
+            func.count(searches.c.id),
+            func.coalesce(func.sum(searches.c.results_count), 0)
+        ).where(searches.c.user_id == user_id)
+    ).one()
+    rolled_up = connection.execute(
+        select(
+            func.coalesce(func.sum(rollups.c.search_count), 0),
+            func.coalesce(func.sum(rollups.c.results_count), 0)
+        ).where(rollups.c.user_id == user_id)
+    ).one()
+    return raw[0] + rolled_up[0], raw[1] + rolled_up[1]
+
+
+def _seed(connection, user_id):
+    """Create the counters row from the user's history; returns False if it already existed."""
+    stats = UserStats.__table__
+    search_count, results_count = _history_totals(connection, user_id)
+    inserted = connection.execute(
+        insert_ignore(connection.dialect.name, stats).values(
+            user_id=user_id,
+            search_count=search_count,
+            results_count=results_count,
+            updated_at=datetime.utcnow()
+        )
+    ).rowcount
+    return bool(inserted)
+
+
+def _apply_delta(connection, user_id, searches=0, results=0):
+    if user_id is None or (not searches and not results):
+        return
+
+    # The counters row was seeded in before_flush, before any of this flush's rows
+    stats = UserStats.__table__
+    connection.execute(update(stats).where(stats.c.user_id == user_id).values(
+        search_count=stats.c.search_count + searches,
+        results_count=stats.c.results_count + results,
+        updated_at=datetime.utcnow()
+    ))
+
+
+@event.listens_for(Session, 'before_flush')
+def _seed_before_flush(session, flush_context, instances):
+    # after_insert runs once every row of a flush is written, so seeding there
+    # would count the whole flush in the seed and then again row by row
+    user_ids = {
+        obj.user_id for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Search) and obj.user_id is not None
+    }
+    if not user_ids:
+        return
+
+    stats = UserStats.__table__
+    connection = session.connection()
+    seeded = set(connection.execute(
+        select(stats.c.user_id).where(stats.c.user_id.in_(user_ids))
+    ).scalars())
+    for user_id in user_ids - seeded:
+        _seed(connection, user_id)
+
+
+@event.listens_for(Search, 'after_insert')
+def _search_inserted(mapper, connection, target):
+    _apply_delta(connection, target.user_id, searches=1, results=target.results_count or 0)
+
+
+@event.listens_for(Search, 'after_update')
+def _search_updated(mapper, connection, target):
+    history = inspect(target).attrs.results_count.history
+    if not history.has_changes():
+        return
+
+    old_count = history.deleted[0] if history.deleted else 0
+    _apply_delta(connection, target.user_id, results=(target.results_count or 0) - (old_count or 0))
+
+
+def get_user_stats(user_id):
+    """
+    Get the usage counters for a user.
+
+    Users whose searches predate the counters are seeded from their history once.
+
+    Args:
+        user_id (int): The user's ID
+
+    Returns:
+        UserStats: The user's counters
+    """
+    stats = db.session.get(UserStats, user_id)
+    if stats:
+        return stats
+
+    # Read the seeded row back from the primary, not a replica that lacks it
+    use_primary()
+    _seed(db.session.connection(), user_id)
+    db.session.commit()
+    return db.session.get(UserStats, user_id)
@@ -0,0 +1,264 @@
+"""
+Load-test the /api/v1 endpoints against an in-process WSGI server.
+
+Seeds users, API keys, domains and emails, routes the crawlers to the local
+network stand-ins from fixtures.py, then drives /domain/search, /email/find
+and /email/verify at the given concurrency. Reports requests/second, latency
+percentiles and SQL queries per request for each endpoint, and saves the
+results as JSON.
+
+Usage:
+    python benchmarks/bench_api_load.py [--requests 500] [--concurrency 16] [--users 20]
+        [--companies 50] [--cold-companies 10] [--no-cache] [--database-url URL]
+        [--output api_load.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+import requests
+from flask import g, has_app_context
+from sqlalchemy import event
+from werkzeug.serving import make_server
+
+from bench_services import percentile
+from fixtures import FixtureSites, StubDNS, generate_companies, offline
+
+from app import create_app, db
+from app.models import Domain, Email, User
+from config import config, TestingConfig
+
+ENDPOINTS = ['domain/search', 'email/find', 'email/verify']
+
+
+def install_query_counter(app):
+    """Count SQL statements per request and return the count in a header."""
+
+    @app.before_request
+    def _reset_query_count():
+        g.bench_queries = 0
+
+    @app.after_request
+    def _add_query_count(response):
+        response.headers['X-Bench-Queries'] = str(g.get('bench_queries', 0))
+        return response
+
+    def _count_query(conn, cursor, statement, parameters, context, executemany):
+        if has_app_context() and 'bench_queries' in g:
+            g.bench_queries += 1
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _count_query)
+
+
+def seed(companies, users, cold_companies):
+    """
+    Create API users, and domains with emails for all but the cold companies.
+
+    Cold domains exist without emails, so their first search crawls the
+    fixture sites.
+
+    Returns:
+        list: API keys
+    """
+    accounts = [User(username=f'load{i}', email=f'load{i}@bench.local') for i in range(users)]
+    db.session.add_all(accounts)
+    db.session.commit()
+
+    domains = sorted(companies)
+    cold = set(domains[len(domains) - cold_companies:]) if cold_companies else set()
+    rows = []
+    for name in domains:
+        domain_obj = Domain(domain_name=name, company_name=name.split('.')[0].title())
+        db.session.add(domain_obj)
+        db.session.flush()
+        if name in cold:
+            continue
+
+        seen = set()
+        for first, last, email in companies[name].people:
+            if email in seen:
+                continue
+            seen.add(email)
+            rows.append({
+                'email_address': email,
+                'first_name': first.title(),
+                'last_name': last.title(),
+                'confidence_score': 0.8,
+                'domain_id': domain_obj.id
+            })
+
+    if rows:
+        db.session.execute(Email.__table__.insert(), rows)
+    db.session.commit()
+    return [account.api_key for account in accounts]
+
+
+def build_requests(endpoint, companies, count, seed_value=11):
+    """Build (path, params) pairs for an endpoint over the seeded companies."""
+    rng = random.Random(seed_value)
+    domains = sorted(companies)
+    built = []
+    for _ in range(count):
+        company = companies[rng.choice(domains)]
+        first, last, email = rng.choice(company.people)
+        if endpoint == 'domain/search':
+            built.append((endpoint, {'domain': company.domain}))
+        elif endpoint == 'email/find':
+            built.append((endpoint, {'domain': company.domain, 'first_name': first, 'last_name': last}))
+        else:
+            built.append((endpoint, {'email': email}))
+    return built
+
+
+def run_endpoint(base_url, api_keys, calls, concurrency):
+    local = threading.local()
+
+    def call(index_and_request):
+        index, (endpoint, params) = index_and_request
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+        headers = {'X-API-Key': api_keys[index % len(api_keys)]}
+
+        start = time.perf_counter()
+        try:
+            response = local.session.get(f'{base_url}/api/v1/{endpoint}', params=params,
+                                         headers=headers, timeout=120)
+            status = response.status_code
+            queries = int(response.headers.get('X-Bench-Queries', 0))
+        except requests.RequestException:
+            status, queries = None, 0
+        return time.perf_counter() - start, status, queries
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(call, enumerate(calls)))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(duration * 1000 for duration, _, _ in outcomes)
+    queries = [count for _, status, count in outcomes if status is not None]
+    statuses = {}
+    for _, status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    return {
+        'requests': len(outcomes),
+        'errors': sum(1 for _, status, _ in outcomes if status is None or status >= 500),
+        'statuses': statuses,
+        'wall_s': round(wall, 3),
+        'requests_per_s': round(len(outcomes) / wall, 2) if wall else None,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(latencies[-1], 2),
+        'queries_per_request': round(sum(queries) / len(queries), 2) if queries else None,
+        'max_queries': max(queries) if queries else None
+    }
+
+
+def print_results(results, baseline=None):
+    print(f'{"endpoint":<16} {"req/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} '
+          f'{"queries":>8} {"max q":>6} {"errors":>7}')
+    for endpoint, stats in results.items():
+        print(f'{endpoint:<16} {stats["requests_per_s"]:>9.2f} {stats["p50_ms"]:>9.2f} '
+              f'{stats["p95_ms"]:>9.2f} {stats["p99_ms"]:>9.2f} '
+              f'{stats["queries_per_request"] or 0:>8.2f} {stats["max_queries"] or 0:>6} {stats["errors"]:>7}')
+
+        previous = (baseline or {}).get(endpoint)
+        if previous:
+            changes = []
+            for key in ('requests_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+                if previous.get(key) and stats.get(key) is not None:
+                    change = (stats[key] - previous[key]) / previous[key] * 100
+                    changes.append(f'{key} {change:+.1f}%')
+            print(f'{"":<16} vs baseline: {", ".join(changes)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--companies', type=int, default=50)
+    parser.add_argument('--employees', type=int, default=25)
+    parser.add_argument('--cold-companies', type=int, default=10,
+                        help='domains seeded without emails, so their first search crawls')
+    parser.add_argument('--http-latency', type=float, default=0.02)
+    parser.add_argument('--dns-latency', type=float, default=0.005)
+    parser.add_argument('--no-cache', action='store_true', help='disable the result and API key caches')
+    parser.add_argument('--database-url', help='database to seed and use (default: a temporary SQLite file)')
+    parser.add_argument('--output', default='api_load_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    database_url = args.database_url or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_api_load.db')}"
+
+    class LoadTestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = database_url
+        MAX_REQUESTS_PER_DAY = 10 ** 9
+        CACHE_TYPE = 'null' if args.no_cache else 'simple'
+        SINGLE_FLIGHT_POLL_INTERVAL = 0.05
+
+    config['load_test'] = LoadTestConfig
+    app = create_app('load_test')
+    install_query_counter(app)
+
+    companies = generate_companies(args.companies, args.employees, tld='com')
+    with app.app_context():
+        api_keys = seed(companies, args.users, args.cold_companies)
+    print(f'Seeded {args.users} users and {args.companies} domains ({database_url})')
+
+    sites = FixtureSites(companies, args.http_latency).start()
+    dns_server = StubDNS(companies, args.dns_latency).start()
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_port}'
+
+    results = {}
+    try:
+        with offline(sites, dns_server):
+            for endpoint in args.endpoints:
+                calls = build_requests(endpoint, companies, args.requests)
+                results[endpoint] = run_endpoint(base_url, api_keys, calls, args.concurrency)
+    finally:
+        server.shutdown()
+        sites.stop()
+        dns_server.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'settings': {key: value for key, value in vars(args).items()
+                     if key not in ('output', 'compare', 'database_url')},
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark storing crawl results: row-by-row inserts versus the bulk upsert.
+
+Usage:
+    python benchmarks/bench_email_upsert.py [--rows 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app import create_app, db
+from app.models import Domain, Email
+from app.services.email_store import upsert_emails
+
+
+def generate_found_emails(domain, rows):
+    """Build EmailFinder-shaped results, including case-only duplicates."""
+    found = []
+    for i in range(rows):
+        found.append({
+            'email': f'first{i}.last{i}@{domain}',
+            'first_name': f'First{i}',
+            'last_name': f'Last{i}',
+            'confidence': 0.8,
+            'source': 'website'
+        })
+    # A handful of duplicates that only differ in case
+    for i in range(0, rows, 100):
+        found.append({'email': f'First{i}.Last{i}@{domain}', 'confidence': 0.7})
+    return found
+
+
+def row_by_row(domain_obj, found_emails):
+    seen = set()
+    for email_data in found_emails:
+        # The old code path aborts on case-only duplicates, so skip them here
+        address = email_data['email'].lower()
+        if address in seen:
+            continue
+        seen.add(address)
+        db.session.add(Email(
+            email_address=address,
+            first_name=email_data.get('first_name'),
+            last_name=email_data.get('last_name'),
+            position=email_data.get('position'),
+            confidence_score=email_data.get('confidence', 0.0),
+            domain_id=domain_obj.id
+        ))
+    db.session.commit()
+    return Email.query.filter_by(domain_id=domain_obj.id).all()
+
+
+def bulk_upsert(domain_obj, found_emails):
+    emails = upsert_emails(domain_obj.id, found_emails)
+    db.session.commit()
+    return emails
+
+
+def run(name, func, domain_name, rows):
+    domain_obj = Domain(domain_name=domain_name)
+    db.session.add(domain_obj)
+    db.session.commit()
+
+    found = generate_found_emails(domain_name, rows)
+    start = time.perf_counter()
+    stored = func(domain_obj, found)
+    elapsed = time.perf_counter() - start
+    print(f'{name:<22} {len(stored):>8} rows  {elapsed * 1000:>10.1f} ms')
+    return domain_obj, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        run('row-by-row insert', row_by_row, 'legacy.example.com', args.rows)
+        domain_obj, found = run('bulk upsert (insert)', bulk_upsert, 'bulk.example.com', args.rows)
+
+        # Re-running the same crawl hits the conflict path for every row
+        start = time.perf_counter()
+        stored = bulk_upsert(domain_obj, found)
+        elapsed = time.perf_counter() - start
+        print(f'{"bulk upsert (update)":<22} {len(stored):>8} rows  {elapsed * 1000:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark the memory held by email finder results: the old per-email
+dictionaries versus EmailResult records.
+
+Usage:
+    python benchmarks/bench_result_memory.py [--results 1000000] [--domains 10000]
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app.services.email_result import EmailResult
+
+
+def crawled_addresses(results, domains):
+    """
+    Addresses as a crawl produces them: every string is a separate object
+    cut out of a page, so equal domains are not shared.
+    """
+    for i in range(results):
+        page = f'<a href="mailto:first{i}.last{i}@company{i % domains}.com">'
+        yield page[16:-2]
+
+
+def as_dict(email):
+    # What EmailFinder.parse_email_info returned before EmailResult
+    username, _, domain = email.partition('@')
+    first, _, last = username.partition('.')
+    return {
+        'email': email,
+        'first_name': first.capitalize(),
+        'last_name': last.capitalize(),
+        'confidence': 0.8,
+        'source': ''.join(['web', 'site'])
+    }
+
+
+def as_record(email):
+    username = email.partition('@')[0]
+    first, _, last = username.partition('.')
+    return EmailResult(
+        email,
+        first_name=first.capitalize(),
+        last_name=last.capitalize(),
+        confidence=0.8,
+        source=''.join(['web', 'site'])
+    )
+
+
+def measure(label, build, args, baseline=None):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = [build(email) for email in crawled_addresses(args.results, args.domains)]
+    elapsed = time.perf_counter() - start
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_result = held / len(results)
+    saved = f'  {(1 - held / baseline) * 100:>5.1f}% less memory' if baseline else ''
+    print(f'{label:<14} {held / 2 ** 20:>9.1f} MB  {per_result:>6.0f} B/result  {elapsed:>6.2f} s to build{saved}')
+    return held, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--results', type=int, default=1000000)
+    parser.add_argument('--domains', type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f'Holding {args.results} results across {args.domains} domains')
+    baseline, dicts = measure('dicts', as_dict, args)
+    del dicts
+    _, records = measure('EmailResult', as_record, args, baseline)
+
+    # Converting at an API boundary, e.g. one domain's results per response
+    page = records[:args.results // args.domains or 1]
+    start = time.perf_counter()
+    for _ in range(100):
+        [record.to_dict() for record in page]
+    per_result = (time.perf_counter() - start) / (100 * len(page))
+    print(f'to_dict        {per_result * 1e9:>9.0f} ns/result')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark the hot searches-table queries with and without the composite
+indexes, then time the rollup/prune of old searches.
+
+Seeds a SQLite file database (10M rows by default; seeding takes a while).
+
+Usage:
+    python benchmarks/bench_search_retention.py [--rows 10000000] [--users 1000] [--days 365]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from sqlalchemy import func, select
+
+from app import create_app, db
+from app.models import Search
+from app.services.search_retention import prune_searches
+from config import config, TestingConfig
+
+SEARCH_TYPES = ['domain', 'email', 'verify']
+SEED_BATCH = 50000
+
+
+def seed(rows, users, days):
+    searches = Search.__table__
+    now = datetime.utcnow()
+    span = days * 86400
+    rng = random.Random(42)
+
+    # Rows are inserted in created_at order, as the application does
+    step = span / rows
+    first = now - timedelta(seconds=span)
+    for start in range(0, rows, SEED_BATCH):
+        batch = [
+            {
+                'user_id': rng.randint(1, users),
+                'query': f'domain{rng.randint(1, 50000)}.com',
+                'search_type': rng.choice(SEARCH_TYPES),
+                'results_count': rng.randint(0, 20),
+                'created_at': first + timedelta(seconds=i * step)
+            }
+            for i in range(start, min(start + SEED_BATCH, rows))
+        ]
+        db.session.execute(searches.insert(), batch)
+        db.session.commit()
+
+
+def time_query(label, statement, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        db.session.execute(statement).all()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f'  {label:<38} {elapsed * 1000:>10.2f} ms')
+
+
+def hot_queries(users):
+    searches = Search.__table__
+    user_id = users // 2
+    since = datetime.utcnow() - timedelta(days=1)
+
+    time_query('recent searches for a user', select(searches).where(
+        searches.c.user_id == user_id
+    ).order_by(searches.c.created_at.desc()).limit(10))
+
+    time_query('history page for a user', select(searches).where(
+        searches.c.user_id == user_id
+    ).order_by(searches.c.created_at.desc(), searches.c.id.desc()).limit(51))
+
+    time_query('user searches of a type today', select(func.count()).select_from(searches).where(
+        searches.c.user_id == user_id,
+        searches.c.search_type == 'domain',
+        searches.c.created_at >= since
+    ))
+
+    time_query('latest search for a query', select(searches).where(
+        searches.c.user_id == user_id,
+        searches.c.search_type == 'domain',
+        searches.c.query == 'domain1.com'
+    ).order_by(searches.c.created_at.desc()).limit(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--retention-days', type=int, default=90)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench_searches.db')
+
+    class BenchmarkConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{db_path}'
+
+    config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+
+    with app.app_context():
+        indexes = list(Search.__table__.indexes)
+        for index in indexes:
+            index.drop(bind=db.engine)
+
+        start = time.perf_counter()
+        seed(args.rows, args.users, args.days)
+        print(f'Seeded {args.rows} searches in {time.perf_counter() - start:.1f} s ({db_path})')
+
+        print('Without composite indexes:')
+        hot_queries(args.users)
+
+        start = time.perf_counter()
+        for index in indexes:
+            index.create(bind=db.engine)
+        print(f'Created indexes in {time.perf_counter() - start:.1f} s')
+
+        print('With composite indexes:')
+        hot_queries(args.users)
+
+        start = time.perf_counter()
+        stats = prune_searches(retention_days=args.retention_days, archive=False)
+        elapsed = time.perf_counter() - start
+        print(f"Rolled up and pruned {stats['rows']} searches over {stats['days']} days "
+              f'in {elapsed:.1f} s')
+
+        print('After pruning:')
+        hot_queries(args.users)
+
+
+if __name__ == '__main__':
+    main()
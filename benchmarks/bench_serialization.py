@@ -0,0 +1,76 @@
+"""
+Benchmark encoding a large domain search response: Flask-RESTful's default
+stdlib JSON encoding versus the API's response encoders.
+
+Usage:
+    python benchmarks/bench_serialization.py [--emails 10000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from app.services import serialization
+from app.services.serialization import dumps_json, dumps_msgpack
+
+
+def build_response(emails):
+    """A DomainSearch response body with the given number of emails."""
+    return {
+        'domain': 'example.com',
+        'emails': [
+            {
+                'email': f'first{i}.last{i}@example.com',
+                'first_name': f'First{i}',
+                'last_name': f'Last{i}',
+                'position': 'Engineer' if i % 3 else None,
+                'confidence': 0.8,
+                'verified': bool(i % 2)
+            } for i in range(emails)
+        ],
+        'count': emails
+    }
+
+
+def restful_default(data):
+    # What flask_restful.representations.json.output_json does outside debug mode
+    return (json.dumps(data) + '\n').encode('utf-8')
+
+
+def measure(label, encode, data, repeat, baseline=None):
+    encode(data)  # warm up
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(repeat):
+        body = encode(data)
+    cpu = (time.process_time() - cpu_start) / repeat
+    wall = (time.perf_counter() - wall_start) / repeat
+
+    saved = f'  {(1 - cpu / baseline) * 100:>5.1f}% less CPU' if baseline else ''
+    print(f'{label:<26} {wall * 1000:>9.2f} ms  {cpu * 1000:>9.2f} ms CPU  {len(body) / 1024:>8.1f} KB{saved}')
+    return cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--emails', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    data = build_response(args.emails)
+    print(f'Encoding a response with {args.emails} emails, {args.repeat} times each')
+
+    baseline = measure('flask-restful default', restful_default, data, args.repeat)
+    measure(f'api json ({serialization.JSON_BACKEND})', dumps_json, data, args.repeat, baseline)
+    if serialization.msgpack is not None:
+        measure('api msgpack', dumps_msgpack, data, args.repeat, baseline)
+    else:
+        print('api msgpack                (msgpack not installed)')
+
+
+if __name__ == '__main__':
+    main()
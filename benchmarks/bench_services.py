@@ -0,0 +1,173 @@
+"""
+Benchmark the crawl and verification services offline, against local
+fixture websites, a stub DNS server and a stub SMTP server.
+
+Reports throughput and p50/p95/p99 latency per operation and saves the
+results as JSON. Pass --compare with an earlier results file to see the
+change.
+
+Usage:
+    python benchmarks/bench_services.py [--companies 20] [--iterations 50] [--concurrency 4]
+        [--http-latency 0.02] [--http-failure-rate 0.0] [--dns-latency 0.005]
+        [--smtp-latency 0.01] [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
+
+from fixtures import FixtureSites, StubDNS, StubSMTP, generate_companies, offline
+
+from app.services.domain_analyzer import DomainAnalyzer
+from app.services.email_finder import EmailFinder
+from app.services.email_verifier import EmailVerifier
+
+OPERATIONS = ['find_bulk_emails', 'find_email', 'detect_email_pattern', 'verify_email', 'verify_mailbox']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def build_cases(operation, companies, iterations, smtp_port, seed=7):
+    """Build the calls to time for an operation, cycling through the companies."""
+    rng = random.Random(seed)
+    domains = sorted(companies)
+    cases = []
+    for i in range(iterations):
+        company = companies[domains[i % len(domains)]]
+        first, last, email = rng.choice(company.people)
+
+        if operation == 'find_bulk_emails':
+            cases.append(lambda d=company.domain: EmailFinder(d).find_bulk_emails())
+        elif operation == 'find_email':
+            cases.append(lambda d=company.domain, f=first, l=last: EmailFinder(d).find_email(f, l))
+        elif operation == 'detect_email_pattern':
+            cases.append(lambda d=company.domain: DomainAnalyzer(d).detect_email_pattern())
+        elif operation == 'verify_email':
+            cases.append(lambda e=email: EmailVerifier(timeout=5).verify_email(e))
+        elif operation == 'verify_mailbox':
+            def verify_mailbox(e=email):
+                verifier = EmailVerifier(timeout=5, smtp_port=smtp_port)
+                valid, mx_hosts = verifier.verify_domain(e.split('@')[1])
+                return valid and verifier.verify_mailbox(e, mx_hosts)
+            cases.append(verify_mailbox)
+    return cases
+
+
+def time_case(case):
+    start = time.perf_counter()
+    try:
+        case()
+        error = False
+    except Exception:
+        error = True
+    return time.perf_counter() - start, error
+
+
+def run_operation(operation, cases, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(time_case, cases))
+    wall = time.perf_counter() - start
+
+    latencies = sorted(duration * 1000 for duration, _ in timings)
+    return {
+        'count': len(timings),
+        'errors': sum(1 for _, error in timings if error),
+        'wall_s': round(wall, 3),
+        'throughput_per_s': round(len(timings) / wall, 2) if wall else None,
+        'mean_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'max_ms': round(latencies[-1], 2) if latencies else None
+    }
+
+
+def print_results(results, baseline=None):
+    print(f'{"operation":<22} {"ops/s":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"errors":>7}')
+    for operation, stats in results.items():
+        print(f'{operation:<22} {stats["throughput_per_s"]:>9.2f} {stats["p50_ms"]:>9.2f} '
+              f'{stats["p95_ms"]:>9.2f} {stats["p99_ms"]:>9.2f} {stats["errors"]:>7}')
+
+        previous = (baseline or {}).get(operation)
+        if previous:
+            changes = []
+            for key in ('throughput_per_s', 'p50_ms', 'p95_ms', 'p99_ms'):
+                if previous.get(key):
+                    change = (stats[key] - previous[key]) / previous[key] * 100
+                    changes.append(f'{key} {change:+.1f}%')
+            print(f'{"":<22} vs baseline: {", ".join(changes)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument('--companies', type=int, default=20)
+    parser.add_argument('--employees', type=int, default=25)
+    parser.add_argument('--iterations', type=int, default=50, help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--page-kb', type=int, default=20, help='filler added to each page')
+    parser.add_argument('--http-latency', type=float, default=0.02)
+    parser.add_argument('--http-failure-rate', type=float, default=0.0)
+    parser.add_argument('--dns-latency', type=float, default=0.005)
+    parser.add_argument('--dns-failure-rate', type=float, default=0.0)
+    parser.add_argument('--smtp-latency', type=float, default=0.01)
+    parser.add_argument('--smtp-failure-rate', type=float, default=0.0)
+    parser.add_argument('--keep-delays', action='store_true',
+                        help="keep the crawlers' one-second politeness sleeps")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    companies = generate_companies(args.companies, args.employees)
+    sites = FixtureSites(companies, args.http_latency, args.http_failure_rate, args.page_kb).start()
+    dns_server = StubDNS(companies, args.dns_latency, args.dns_failure_rate).start()
+    smtp_server = StubSMTP(companies, args.smtp_latency, args.smtp_failure_rate).start()
+
+    results = {}
+    try:
+        with offline(sites, dns_server, keep_delays=args.keep_delays):
+            for operation in args.operations:
+                cases = build_cases(operation, companies, args.iterations, smtp_server.port)
+                results[operation] = run_operation(operation, cases, args.concurrency)
+    finally:
+        sites.stop()
+        dns_server.stop()
+        smtp_server.stop()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    report = {
+        'created_at': datetime.utcnow().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform()
+        },
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Saved results to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+"""
+Local stand-ins for the outside world, used by the offline benchmarks.
+
+- FixtureSites: an HTTP server with generated company websites
+- StubDNS: a UDP DNS server answering MX and A queries for those companies
+- StubSMTP: an SMTP server that accepts RCPT for the companies' employees
+
+Each takes a latency (seconds added per response) and a failure rate
+(fraction of responses that fail), so slow or flaky upstreams can be
+reproduced.
+
+`offline(sites, dns_server)` routes the services' HTTP and DNS traffic to
+the stand-ins while it is active.
+"""
+import random
+import socket
+import socketserver
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import urlsplit
+
+import dns.message
+import dns.rcode
+import dns.rdatatype
+import dns.resolver
+import dns.rrset
+import requests
+
+PATTERNS = [
+    '{first}.{last}',
+    '{first_initial}{last}',
+    '{first}_{last}',
+    '{first}-{last}'
+]
+
+FIRST_NAMES = ['anna', 'ben', 'carla', 'dev', 'emma', 'felix', 'grace', 'hugo',
+               'iris', 'jonas', 'kira', 'liam', 'maya', 'noah', 'olga', 'pavel']
+LAST_NAMES = ['adams', 'baker', 'clark', 'diaz', 'evans', 'fischer', 'garcia', 'hall',
+              'ito', 'jones', 'khan', 'lopez', 'moore', 'nolan', 'ortiz', 'price']
+
+# Pages each generated site serves; anything else is a 404
+SITE_PAGES = ['', 'contact', 'about', 'team', 'leadership', 'staff']
+
+
+class Company:
+    """A generated company: its domain, email pattern and employees."""
+
+    def __init__(self, index, employees, rng, tld='test'):
+        self.domain = f'company{index}.{tld}'
+        self.pattern = PATTERNS[index % len(PATTERNS)]
+        self.people = []
+        for _ in range(employees):
+            first = rng.choice(FIRST_NAMES)
+            last = rng.choice(LAST_NAMES)
+            self.people.append((first, last, self.email_for(first, last)))
+
+    def email_for(self, first, last):
+        local = self.pattern.format(first=first, last=last, first_initial=first[0])
+        return f'{local}@{self.domain}'
+
+    @property
+    def mailboxes(self):
+        return {email for _, _, email in self.people}
+
+
+def generate_companies(count, employees, seed=42, tld='test'):
+    """
+    Build the companies served by the stand-ins.
+
+    Args:
+        count (int): Number of companies
+        employees (int): Employees per company
+        seed (int): Random seed, so runs are comparable
+        tld (str): Top-level domain; use a public suffix such as 'com' when
+            the domains go through tldextract (traffic stays local either way)
+
+    Returns:
+        dict: Company by domain
+    """
+    rng = random.Random(seed)
+    companies = [Company(i, employees, rng, tld) for i in range(count)]
+    return {company.domain: company for company in companies}
+
+
+class _Flaky:
+    """Shared latency and failure injection."""
+
+    def __init__(self, latency, failure_rate, seed):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def should_fail(self):
+        if not self.failure_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.failure_rate
+
+
+def _render_page(company, page, filler_kb):
+    nav = ''.join(f'<a href="/{name}">{name.title()}</a> ' for name in ('contact', 'about', 'team'))
+    body = [f'<html><head><title>{company.domain.split(".")[0].title()} Inc</title></head><body>',
+            f'<nav>{nav}</nav>']
+
+    if page in ('contact', ''):
+        body.append(f'<p>Write to <a href="mailto:info@{company.domain}">info@{company.domain}</a></p>')
+    if page in ('team', 'leadership', 'staff', 'about'):
+        body.append('<ul>')
+        for first, last, email in company.people:
+            body.append(f'<li>{first.title()} {last.title()} '
+                        f'<a href="mailto:{email}">{email}</a></li>')
+        body.append('</ul>')
+
+    # Pad pages to a realistic size
+    paragraph = '<p>' + 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 16 + '</p>'
+    body.extend([paragraph] * max(filler_kb * 1024 // len(paragraph), 0))
+    body.append('</body></html>')
+    return '\n'.join(body).encode('utf-8')
+
+
+class FixtureSites:
+    """
+    HTTP server for the generated company websites.
+
+    Requests arrive as /<host>/<path>; see `offline` for how the services'
+    URLs are rewritten.
+    """
+
+    def __init__(self, companies, latency=0.0, failure_rate=0.0, filler_kb=20, seed=1):
+        self.companies = companies
+        self.filler_kb = filler_kb
+        self.flaky = _Flaky(latency, failure_rate, seed)
+        self._pages = {}
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def page(self, host, path):
+        company = self.companies.get(host[4:] if host.startswith('www.') else host)
+        page = path.strip('/')
+        if company is None or page not in SITE_PAGES:
+            return None
+        key = (company.domain, page)
+        if key not in self._pages:
+            self._pages[key] = _render_page(company, page, self.filler_kb)
+        return self._pages[key]
+
+    def _handler(self):
+        sites = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                sites.flaky.delay()
+                if sites.flaky.should_fail():
+                    self.send_error(503)
+                    return
+
+                host, _, path = self.path.lstrip('/').partition('/')
+                body = sites.page(host, path)
+                if body is None:
+                    self.send_error(404)
+                    return
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def url_for(self, url):
+        """Map a real site URL to its location on this server."""
+        parts = urlsplit(url)
+        return f'http://127.0.0.1:{self.port}/{parts.hostname}{parts.path or "/"}'
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubDNS:
+    """UDP DNS server: MX and A records for known companies, NXDOMAIN otherwise."""
+
+    def __init__(self, companies, latency=0.0, failure_rate=0.0, seed=2):
+        self.companies = companies
+        self.flaky = _Flaky(latency, failure_rate, seed)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(('127.0.0.1', 0))
+        self.port = self.sock.getsockname()[1]
+        self._running = False
+
+    def answer(self, wire):
+        query = dns.message.from_wire(wire)
+        response = dns.message.make_response(query)
+        question = query.question[0]
+        name = question.name.to_text().rstrip('.').lower()
+
+        if self.flaky.should_fail():
+            response.set_rcode(dns.rcode.SERVFAIL)
+        elif name not in self.companies and name != 'localhost':
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        elif question.rdtype == dns.rdatatype.MX:
+            # Every company's mail goes to the local SMTP stand-in
+            response.answer.append(dns.rrset.from_text(question.name, 300, 'IN', 'MX', '10 localhost.'))
+        elif question.rdtype == dns.rdatatype.A:
+            response.answer.append(dns.rrset.from_text(question.name, 300, 'IN', 'A', '127.0.0.1'))
+        return response.to_wire()
+
+    def _reply(self, wire, addr):
+        self.flaky.delay()
+        try:
+            self.sock.sendto(self.answer(wire), addr)
+        except Exception:
+            pass
+
+    def _serve(self):
+        while self._running:
+            try:
+                wire, addr = self.sock.recvfrom(4096)
+            except OSError:
+                break
+            threading.Thread(target=self._reply, args=(wire, addr), daemon=True).start()
+
+    def resolver(self, lifetime=5.0):
+        """A resolver that only asks this server."""
+        resolver = dns.resolver.Resolver(configure=False)
+        resolver.nameservers = ['127.0.0.1']
+        resolver.port = self.port
+        resolver.lifetime = lifetime
+        return resolver
+
+    def start(self):
+        self._running = True
+        threading.Thread(target=self._serve, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.sock.close()
+
+
+class StubSMTP:
+    """SMTP server that accepts RCPT only for known mailboxes."""
+
+    def __init__(self, companies, latency=0.0, failure_rate=0.0, seed=3):
+        self.mailboxes = set()
+        for company in companies.values():
+            self.mailboxes |= company.mailboxes
+        self.flaky = _Flaky(latency, failure_rate, seed)
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+
+    def _handler(self):
+        smtp = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                smtp.flaky.delay()
+                self.wfile.write(f'{line}\r\n'.encode('ascii'))
+
+            def handle(self):
+                if smtp.flaky.should_fail():
+                    self.reply('421 Service not available')
+                    return
+                self.reply('220 localhost ESMTP stand-in')
+
+                for raw in self.rfile:
+                    command = raw.decode('ascii', 'replace').strip()
+                    verb = command[:4].upper()
+                    if verb in ('EHLO', 'HELO'):
+                        self.reply('250 localhost')
+                    elif verb == 'MAIL':
+                        self.reply('250 OK')
+                    elif verb == 'RCPT':
+                        address = command.partition(':')[2].strip().strip('<>').lower()
+                        if address in smtp.mailboxes:
+                            self.reply('250 OK')
+                        else:
+                            self.reply('550 No such user')
+                    elif verb in ('RSET', 'NOOP'):
+                        self.reply('250 OK')
+                    elif verb == 'QUIT':
+                        self.reply('221 Bye')
+                        return
+                    else:
+                        self.reply('502 Command not implemented')
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def offline(sites, dns_server, keep_delays=False):
+    """
+    Route the services' HTTP requests to `sites` and DNS lookups to
+    `dns_server`.
+
+    Args:
+        sites (FixtureSites): The running fixture web server
+        dns_server (StubDNS): The running stub DNS server
+        keep_delays (bool): Keep the crawlers' one-second politeness sleeps;
+            they are skipped by default so the benchmark measures the work
+    """
+    from app.services import domain_analyzer, email_finder
+
+    real_get = requests.get
+
+    def routed_get(url, *args, **kwargs):
+        # Loopback traffic (e.g. a load client calling the app) passes through
+        if urlsplit(url).hostname not in ('127.0.0.1', 'localhost'):
+            url = sites.url_for(url)
+        return real_get(url, *args, **kwargs)
+
+    patches = [
+        mock.patch('requests.get', routed_get),
+        mock.patch.object(dns.resolver, 'default_resolver', dns_server.resolver())
+    ]
+    if not keep_delays:
+        no_sleep = SimpleNamespace(sleep=lambda seconds: None)
+        patches.append(mock.patch.object(email_finder, 'time', no_sleep))
+        patches.append(mock.patch.object(domain_analyzer, 'time', no_sleep))
+
+    for patch in patches:
+        patch.start()
+    try:
+        yield
+    finally:
+        for patch in reversed(patches):
+            patch.stop()
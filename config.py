@@ -3,6 +3,40 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def engine_options(uri):
+    """
+    SQLAlchemy engine and pool options for a database URL.
+
+    Pool sizes only apply to server databases; SQLite uses SQLAlchemy's
+    default pools, which do not take them.
+
+    Args:
+        uri (str): The database URL
+
+    Returns:
+        dict: Options for SQLALCHEMY_ENGINE_OPTIONS or a SQLALCHEMY_BINDS entry
+    """
+    options = {
+        'pool_pre_ping': True,  # test connections before use, so restarts and idle timeouts are survived
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800))  # seconds before a connection is replaced
+    }
+    if uri and not uri.startswith('sqlite'):
+        options.update(
+            pool_size=int(os.environ.get('DB_POOL_SIZE', 10)),  # connections kept open per process
+            max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 20)),  # extra connections allowed under load
+            pool_timeout=int(os.environ.get('DB_POOL_TIMEOUT', 30))  # seconds to wait for a free connection
+        )
+    return options
+
+
+def replica_binds(uri):
+    """SQLALCHEMY_BINDS with a `replica` bind for `uri`, or none if it is unset."""
+    if not uri:
+        return {}
+    return {'replica': dict(engine_options(uri), url=uri)}
+
+
 class Config:
     """Base configuration."""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-please-change-in-production')
@@ -12,16 +46,112 @@ class Config:
     # Database
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///email_hunter.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    
+    # Read replica; GET requests to these endpoints read from it, everything else uses the primary.
+    # Only list read-only views: a view that reads and then writes (e.g. search.domain_results,
+    # which crawls unknown domains) would decide what to write from lagging data.
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get('DATABASE_REPLICA_URL'))
+    READ_REPLICA_ENDPOINTS = (
+        'dashboard.*',
+        'search.domain_export',
+        'api.domainexportapi',
+        'api.savedemailsexportapi'
+    )
     
     # Email verification config
     SMTP_TIMEOUT = 10  # seconds
     
     # Rate limiting
     MAX_REQUESTS_PER_DAY = 50
+    RATE_LIMIT_WINDOW = 86400  # seconds, sliding window for MAX_REQUESTS_PER_DAY
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')  # 'memory' or 'cache'
+    RATE_LIMIT_FLUSH_INTERVAL = 30  # seconds between usage flushes to the database
+    
+    # API result paging
+    API_PAGE_SIZE = 100  # default page size when only after_id is given
+    API_MAX_PAGE_SIZE = 1000
+    API_STREAM_BATCH_SIZE = 500  # rows fetched per round trip when streaming NDJSON
+    
+    # Search log retention
+    SEARCH_RETENTION_DAYS = int(os.environ.get('SEARCH_RETENTION_DAYS', 90))
+    SEARCH_ARCHIVE = os.environ.get('SEARCH_ARCHIVE', 'false').lower() == 'true'  # copy pruned rows to searches_archive
+    
+    # Exports
+    EXPORT_BATCH_SIZE = 1000  # rows fetched per round trip from the server-side cursor
+    EXPORT_GZIP = True  # compress exports when the client sends Accept-Encoding: gzip
+    
+    # Bulk CSV jobs
+    BULK_UPLOAD_DIR = os.environ.get('BULK_UPLOAD_DIR', os.path.join(APP_DIR, 'instance', 'bulk'))
+    BULK_WORKERS = 2  # jobs processed at the same time per process
+    BULK_BATCH_SIZE = 100  # rows read, processed and written per batch
+    BULK_BATCH_CONCURRENCY = 8  # lookups run in parallel within a batch
+    BULK_PATTERN_CACHE_SIZE = 1024  # domains whose detected email pattern is kept during a job
+    BULK_HEARTBEAT_SECONDS = 30  # how often a running job records that its process is alive
+    BULK_STALE_SECONDS = 120  # a running job without a heartbeat, or a queued job not started, for this long was left behind
+    BULK_SWEEP_SECONDS = 60  # how often each serving process looks for abandoned jobs
+    BULK_RESUME_ON_STARTUP = True  # run that sweep in serving processes, from their first request on
+    
+    # Batch domain hunts (flask hunt-domains)
+    HUNT_PROCESSES = os.cpu_count() or 1
+    HUNT_CONCURRENCY = 8  # domains crawled at once per process
+    HUNT_BATCH_SIZE = 20  # domains sent to a process at a time
+    HUNT_REPORT_INTERVAL = 10.0  # seconds between throughput reports
+    
+    # People search (/api/v1/people/search)
+    PEOPLE_SEARCH_PAGE_SIZE = 20
+    PEOPLE_SEARCH_MAX_PAGE_SIZE = 100
+    PEOPLE_SEARCH_MAX_RESULTS = 1000  # ranked results reachable by paging
+    PEOPLE_SEARCH_PG_THRESHOLD = 0.5  # pg_trgm word similarity a PostgreSQL match needs
+    
+    # Dashboard
+    HISTORY_PAGE_SIZE = 50
+    DASHBOARD_PAGE_SIZE = 50  # rows per page on the domains and saved emails views
+    
+    # Single-flight coalescing of concurrent crawls
+    SINGLE_FLIGHT_USE_LEASE = True  # coordinate across workers through crawl_leases
+    SINGLE_FLIGHT_LEASE_SECONDS = 300  # renewed every third of this while the crawl runs
+    SINGLE_FLIGHT_POLL_INTERVAL = 1.0  # seconds between checks on another worker's lease
+    
+    # Crawl workers (flask crawl-worker)
+    CRAWL_LEASE_SECONDS = 300  # a task is reclaimed if its worker stops heartbeating for this long
+    CRAWL_HEARTBEAT_SECONDS = 30
+    CRAWL_MAX_ATTEMPTS = 3
+    CRAWL_RETRY_BACKOFF = 60  # seconds before the first retry; doubles with each attempt
+    CRAWL_POLL_INTERVAL = 2.0  # seconds an idle worker waits before looking for tasks again
+    
+    # Background recrawls (flask schedule-recrawls)
+    RECRAWL_MAX_AGE_DAYS = 30  # oldest data allowed for domains nobody searches
+    RECRAWL_MIN_AGE_HOURS = 24  # never recrawl a domain more often than this
+    RECRAWL_POPULARITY_DAYS = 30  # window of domain searches that counts towards popularity
+    RECRAWL_BUDGET_PER_HOUR = 60  # recrawls queued per hour across all workers
+    RECRAWL_INTERVAL = 300  # seconds between scheduler runs
+    RECRAWL_PRIORITY = -10  # below on-demand crawls, so customers go first
+    PATTERN_MIN_CONFIDENCE = 0.5  # stored patterns below this are ignored by the email finder
+    CANONICAL_HOST_TTL_HOURS = 24 * 7  # how long a domain's resolved scheme/host/redirects are reused
+    CANONICAL_HOST_CACHE_SIZE = 10000  # domains whose canonical host is kept in memory per process
+    FETCH_MAX_BYTES = int(os.environ.get('FETCH_MAX_BYTES', 2 * 1024 * 1024))  # most of a page read (after decompression) when crawling
+    FETCH_CHUNK_SIZE = 16 * 1024  # bytes read from the socket at a time
+    
+    # Metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # if set, /metrics requires "Authorization: Bearer <token>"
+    
+    # Request tracing (off unless a token or sample rate is set)
+    TRACE_ADMIN_TOKEN = os.environ.get('TRACE_ADMIN_TOKEN')  # sent as X-Trace-Token to trace a request, and as a bearer token for /admin/traces
+    TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.0))  # fraction of requests traced without the header
+    TRACE_DIR = os.environ.get('TRACE_DIR', os.path.join(APP_DIR, 'instance', 'traces'))
+    TRACE_MAX_STORED = 200  # newest traces kept on disk
+    TRACE_PROFILE_LIMIT = 40  # functions and allocation sites kept per profile
     
     # Cache settings
-    CACHE_TYPE = 'simple'
+    # Set CACHE_TYPE to 'redis' with CACHE_REDIS_URL to share the cache between workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'simple')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
+    RESULT_CACHE_TIMEOUT = 600  # seconds domain and verification results stay cached
+    SEARCH_LOG_FLUSH_INTERVAL = 5  # seconds between history writes for searches served from the cache
+    API_KEY_CACHE_TIMEOUT = 60  # seconds an authenticated API key stays cached
 
 class DevelopmentConfig(Config):
     """Development configuration."""
@@ -33,7 +163,10 @@ class TestingConfig(Config):
     DEBUG = False
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = {}
     WTF_CSRF_ENABLED = False
+    BULK_RESUME_ON_STARTUP = False
 
 class ProductionConfig(Config):
     """Production configuration."""
@@ -45,6 +178,7 @@ class ProductionConfig(Config):
     
     # Ensure PostgreSQL is used in production
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
     
     # Stricter security settings
     SESSION_COOKIE_SECURE = True
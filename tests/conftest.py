@@ -0,0 +1,105 @@
+import itertools
+
+import pytest
+
+
+class FakeFinder:
+    """Stands in for EmailFinder so tests never crawl; counts its crawls."""
+
+    calls = 0
+
+    def __init__(self, domain):
+        self.domain = domain
+
+    def find_bulk_emails(self):
+        from app.services.email_result import EmailResult
+
+        FakeFinder.calls += 1
+        return [EmailResult(f'jane.doe@{self.domain}', first_name='Jane', last_name='Doe',
+                            confidence=0.9, source='website')]
+
+
+_config_ids = itertools.count()
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """
+    Build apps on file-backed SQLite databases under tmp_path.
+
+    Unlike the in-memory TestingConfig database, every connection sees the
+    same file, so tests see the same locking as a real deployment.
+    Keyword arguments override config values.
+    """
+    from app import create_app, db
+    from config import TestingConfig, config, engine_options
+
+    apps = []
+
+    def make(**overrides):
+        uri = f"sqlite:///{tmp_path / 'primary.db'}"
+        settings = dict(
+            SQLALCHEMY_DATABASE_URI=uri,
+            SQLALCHEMY_ENGINE_OPTIONS=engine_options(uri),
+            CACHE_TYPE='SimpleCache',
+            MAX_REQUESTS_PER_DAY=1000
+        )
+        settings.update(overrides)
+        name = f'test-{next(_config_ids)}'
+        config[name] = type('TestConfig', (TestingConfig,), settings)
+        app = create_app(name)
+        apps.append((name, app))
+        return app
+
+    yield make
+
+    for name, app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        config.pop(name, None)
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def api_user(app):
+    """A user whose api_key authenticates API requests."""
+    from app import db
+    from app.models import User
+
+    with app.app_context():
+        user = User(username='tester', email='tester@example.com', password='secret')
+        db.session.add(user)
+        db.session.commit()
+        return {'id': user.id, 'api_key': user.api_key}
+
+
+@pytest.fixture
+def domain_id(app):
+    from app import db
+    from app.models import Domain
+
+    with app.app_context():
+        domain = Domain(domain_name='example.com', company_name='Example')
+        db.session.add(domain)
+        db.session.commit()
+        return domain.id
+
+
+@pytest.fixture
+def fake_finder(monkeypatch):
+    from app.services import domain_search
+
+    FakeFinder.calls = 0
+    monkeypatch.setattr(domain_search, 'EmailFinder', FakeFinder)
+    return FakeFinder
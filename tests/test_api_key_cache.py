@@ -0,0 +1,31 @@
+from app import db
+from app.models import User
+from app.services.api_key_cache import get_api_user
+
+
+def test_rotated_key_is_invalidated_only_after_commit(app, api_user):
+    old_key = api_user['api_key']
+
+    with app.app_context():
+        assert get_api_user(old_key).id == api_user['id']
+
+        user = db.session.get(User, api_user['id'])
+        user.generate_new_api_key()
+
+        # Still cached until the new key is committed
+        assert get_api_user(old_key) is not None
+
+        db.session.commit()
+        assert get_api_user(old_key) is None
+
+
+def test_rolled_back_rotation_keeps_the_old_key(app, api_user):
+    old_key = api_user['api_key']
+
+    with app.app_context():
+        get_api_user(old_key)
+        user = db.session.get(User, api_user['id'])
+        user.generate_new_api_key()
+        db.session.rollback()
+
+        assert get_api_user(old_key).id == api_user['id']
@@ -0,0 +1,119 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app import db
+from app.models import BulkJob
+from app.services import bulk_jobs
+
+
+def add_job(user_id, status, age, tmp_path):
+    updated = datetime.utcnow() - age
+    job = BulkJob(
+        user_id=user_id,
+        job_type='verify',
+        status=status,
+        filename='upload.csv',
+        input_path=str(tmp_path / f'{status}-{age.seconds}.csv'),
+        output_path=str(tmp_path / f'{status}-{age.seconds}.result.csv'),
+        created_at=updated,
+        updated_at=updated
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_resume_requeues_only_abandoned_jobs(app, api_user, tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(bulk_jobs, 'run_job', lambda app, job_id: started.append(job_id))
+
+    with app.app_context():
+        old = timedelta(hours=1)
+        stale_running = add_job(api_user['id'], 'running', old, tmp_path)
+        stale_queued = add_job(api_user['id'], 'queued', old, tmp_path)
+        add_job(api_user['id'], 'running', timedelta(seconds=10), tmp_path)
+        add_job(api_user['id'], 'completed', old, tmp_path)
+
+    resumed = bulk_jobs.resume_stale_jobs(app, stale_after=600, wait=True)
+
+    assert resumed == [stale_running, stale_queued]
+    assert sorted(started) == resumed
+    with app.app_context():
+        assert db.session.get(BulkJob, stale_running).status == 'queued'
+
+
+def test_run_job_skips_a_job_another_process_claimed(app, api_user, tmp_path):
+    with app.app_context():
+        job_id = add_job(api_user['id'], 'running', timedelta(0), tmp_path)
+
+    # The input file does not exist, so running the job would mark it failed
+    bulk_jobs.run_job(app, job_id)
+
+    with app.app_context():
+        assert db.session.get(BulkJob, job_id).status == 'running'
+
+
+class FakeVerifier:
+    def __init__(self, timeout=None):
+        pass
+
+    def verify_email(self, email):
+        return email.endswith('@example.com')
+
+
+def test_run_job_processes_a_queued_job(app, api_user, tmp_path, monkeypatch):
+    monkeypatch.setattr(bulk_jobs, 'EmailVerifier', FakeVerifier)
+    with app.app_context():
+        job_id = add_job(api_user['id'], 'queued', timedelta(0), tmp_path)
+        job = db.session.get(BulkJob, job_id)
+        with open(job.input_path, 'w') as f:
+            f.write('email\njane@example.com\njohn@other.com\n')
+
+    bulk_jobs.run_job(app, job_id)
+
+    with app.app_context():
+        job = db.session.get(BulkJob, job_id)
+        assert (job.status, job.processed_rows) == ('completed', 2)
+        with open(job.output_path) as f:
+            assert f.read().splitlines() == ['email,is_valid', 'jane@example.com,True', 'john@other.com,False']
+
+
+def test_run_job_stops_when_another_run_takes_the_job_over(app, api_user, tmp_path, monkeypatch):
+    class ResumedElsewhere(FakeVerifier):
+        def verify_email(self, email):
+            # A sweep in another process declares the job abandoned mid-batch
+            with app.app_context():
+                db.session.query(BulkJob).update({BulkJob.owner: 'other-run'})
+                db.session.commit()
+            return True
+
+    monkeypatch.setattr(bulk_jobs, 'EmailVerifier', ResumedElsewhere)
+    with app.app_context():
+        job_id = add_job(api_user['id'], 'queued', timedelta(0), tmp_path)
+        job = db.session.get(BulkJob, job_id)
+        output_path = job.output_path
+        with open(job.input_path, 'w') as f:
+            f.write('email\njane@example.com\n')
+
+    bulk_jobs.run_job(app, job_id)
+
+    with app.app_context():
+        job = db.session.get(BulkJob, job_id)
+        assert (job.status, job.owner, job.processed_rows) == ('running', 'other-run', 0)
+    assert not os.path.exists(output_path)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
+
+
+def test_create_job_rejects_more_rows_than_the_daily_allowance(make_app, api_user, tmp_path):
+    app = make_app(MAX_REQUESTS_PER_DAY=2, BULK_UPLOAD_DIR=str(tmp_path / 'bulk'))
+    upload = FileStorage(io.BytesIO(b'email\na@example.com\nb@example.com\nc@example.com\n'), filename='list.csv')
+
+    with app.test_request_context():
+        with pytest.raises(bulk_jobs.BulkJobError, match='3 rows but only 2 requests'):
+            bulk_jobs.create_job(api_user['id'], upload)
+        assert db.session.query(BulkJob).count() == 0
+    assert os.listdir(tmp_path / 'bulk') == []
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+from sqlalchemy import create_engine, text
+
+from app import db
+from app.models import Domain
+from app.services import canonical_host
+from app.services.canonical_host import CanonicalHost, forget_canonical_host, get_canonical_host
+from app.services.schema import add_missing_columns
+
+
+def probe_returning(base_url, calls):
+    def resolve(domain, timeout=10):
+        calls.append(domain)
+        return CanonicalHost(base_url, [], base_url.startswith('https'), datetime.utcnow())
+    return resolve
+
+
+def test_upgrade_adds_canonical_columns_to_an_old_domains_table(tmp_path, make_app):
+    engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            'CREATE TABLE domains (id INTEGER PRIMARY KEY, domain_name VARCHAR(255) UNIQUE, '
+            'company_name VARCHAR(255), created_at DATETIME, updated_at DATETIME)'
+        ))
+        conn.execute(text("INSERT INTO domains (domain_name) VALUES ('example.com')"))
+    engine.dispose()
+
+    # create_app leaves existing tables alone; the upgrade adds the columns once
+    app = make_app()
+    with app.app_context():
+        assert sorted(add_missing_columns()) == [
+            'domains.canonical_checked_at', 'domains.canonical_url', 'domains.redirect_chain', 'domains.tls_ok'
+        ]
+        assert add_missing_columns() == []
+        domain = Domain.query.filter_by(domain_name='example.com').one()
+        assert domain.canonical_url is None
+
+
+def test_record_is_stored_without_touching_updated_at(app, domain_id, monkeypatch):
+    calls = []
+    monkeypatch.setattr(canonical_host, 'resolve_canonical_host', probe_returning('https://www.example.com', calls))
+    canonical_host._cache.clear()
+
+    with app.app_context():
+        updated_at = db.session.get(Domain, domain_id).updated_at
+        # A pending write in the session must not block storing the record
+        db.session.add(Domain(domain_name='pending.com'))
+        db.session.flush()
+
+        assert get_canonical_host('example.com').base_url == 'https://www.example.com'
+        canonical_host._cache.clear()
+        assert get_canonical_host('example.com').base_url == 'https://www.example.com'
+
+        domain = db.session.get(Domain, domain_id)
+        assert domain.canonical_url == 'https://www.example.com'
+        assert domain.updated_at == updated_at
+
+        # Storing the record left the caller's transaction to the caller
+        db.session.rollback()
+        assert Domain.query.filter_by(domain_name='pending.com').count() == 0
+    assert calls == ['example.com']
+
+
+def test_forgotten_host_is_probed_again(app, domain_id, monkeypatch):
+    calls = []
+    monkeypatch.setattr(canonical_host, 'resolve_canonical_host', probe_returning('https://example.com', calls))
+    canonical_host._cache.clear()
+
+    with app.app_context():
+        get_canonical_host('example.com')
+        forget_canonical_host('example.com')
+        get_canonical_host('example.com')
+
+    assert calls == ['example.com', 'example.com']
+
+
+def test_memory_cache_drops_least_recently_used(make_app, monkeypatch):
+    app = make_app(CANONICAL_HOST_CACHE_SIZE=2)
+    monkeypatch.setattr(canonical_host, 'resolve_canonical_host', probe_returning('https://example.com', []))
+    canonical_host._cache.clear()
+
+    with app.app_context():
+        for domain in ['a.com', 'b.com', 'a.com', 'c.com']:
+            get_canonical_host(domain)
+
+    assert list(canonical_host._cache) == ['a.com', 'c.com']
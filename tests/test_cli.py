@@ -0,0 +1,17 @@
+from app import db
+from app.models import Search, UserDomain
+
+
+def test_upgrade_schema_backfills_associations(app, api_user, domain_id):
+    with app.app_context():
+        db.session.add(Search(user_id=api_user['id'], query='example.com', search_type='domain'))
+        db.session.commit()
+        db.session.query(UserDomain).delete()
+        db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=['upgrade-schema'])
+
+    assert result.exit_code == 0, result.output
+    assert 'Added 1 user domains' in result.output
+    with app.app_context():
+        assert [(row.user_id, row.domain_id) for row in db.session.query(UserDomain)] == [(api_user['id'], domain_id)]
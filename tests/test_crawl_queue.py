@@ -0,0 +1,166 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import CrawlTask, Domain
+from app.services import crawl_queue
+from app.services.crawl_queue import claim_task, enqueue_crawl, fail_expired_tasks, heartbeat, run_task
+
+
+def add_domains(count):
+    domains = [Domain(domain_name=f'company{i}.com') for i in range(count)]
+    db.session.add_all(domains)
+    db.session.commit()
+    return [domain.id for domain in domains]
+
+
+def test_enqueue_keeps_one_active_task_per_domain(app):
+    with app.app_context():
+        domain_id, = add_domains(1)
+        first = enqueue_crawl(domain_id, priority=0)
+        db.session.commit()
+        second = enqueue_crawl(domain_id, priority=5)
+        db.session.commit()
+
+        assert second.id == first.id
+        assert second.priority == 5
+        assert db.session.query(CrawlTask).count() == 1
+
+
+def test_claims_by_priority_then_age(app):
+    with app.app_context():
+        low, high, later = add_domains(3)
+        now = datetime.utcnow()
+        enqueue_crawl(low, priority=0, run_after=now - timedelta(minutes=2))
+        enqueue_crawl(high, priority=10, run_after=now - timedelta(minutes=1))
+        enqueue_crawl(later, priority=10, run_after=now + timedelta(hours=1))
+        db.session.commit()
+
+        claimed = [claim_task('worker'), claim_task('worker'), claim_task('worker')]
+        domains = [db.session.get(CrawlTask, task_id).domain_id for task_id in claimed[:2]]
+
+        assert domains == [high, low]
+        assert claimed[2] is None
+        task = db.session.get(CrawlTask, claimed[0])
+        assert (task.status, task.locked_by, task.attempts) == ('running', 'worker', 1)
+
+
+def test_concurrent_workers_never_claim_the_same_task(app):
+    with app.app_context():
+        for domain_id in add_domains(20):
+            enqueue_crawl(domain_id)
+        db.session.commit()
+
+    claims = []
+    barrier = threading.Barrier(4)
+
+    def worker(name):
+        with app.app_context():
+            barrier.wait()
+            while True:
+                task_id = claim_task(name)
+                if task_id is None:
+                    break
+                claims.append(task_id)
+
+    threads = [threading.Thread(target=worker, args=(f'worker-{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claims) == sorted(set(claims))
+    assert len(claims) == 20
+
+
+def test_heartbeat_only_extends_the_holders_lease(make_app):
+    app = make_app(CRAWL_LEASE_SECONDS=60)
+    with app.app_context():
+        domain_id, = add_domains(1)
+        enqueue_crawl(domain_id)
+        db.session.commit()
+        task_id = claim_task('worker')
+
+        assert heartbeat(task_id, 'worker')
+        assert not heartbeat(task_id, 'someone-else')
+        db.session.expire_all()
+        assert db.session.get(CrawlTask, task_id).locked_until > datetime.utcnow() + timedelta(seconds=50)
+
+
+def test_expired_lease_is_taken_over(make_app):
+    app = make_app(CRAWL_LEASE_SECONDS=60)
+    with app.app_context():
+        domain_id, = add_domains(1)
+        enqueue_crawl(domain_id)
+        db.session.commit()
+        task_id = claim_task('crashed')
+        db.session.query(CrawlTask).filter_by(id=task_id).update(
+            {CrawlTask.locked_until: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.session.commit()
+
+        assert claim_task('rescuer') == task_id
+        # The first worker's late result must not overwrite the new holder's
+        assert not crawl_queue._finish(task_id, 'crashed', status='done')
+        assert not heartbeat(task_id, 'crashed')
+        db.session.expire_all()
+        assert db.session.get(CrawlTask, task_id).attempts == 2
+
+
+def test_expired_last_attempt_fails(make_app):
+    app = make_app(CRAWL_MAX_ATTEMPTS=1)
+    with app.app_context():
+        domain_id, = add_domains(1)
+        enqueue_crawl(domain_id)
+        db.session.commit()
+        task_id = claim_task('crashed')
+        db.session.query(CrawlTask).filter_by(id=task_id).update(
+            {CrawlTask.locked_until: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.session.commit()
+
+        assert claim_task('rescuer') is None
+        assert fail_expired_tasks() == 1
+        db.session.expire_all()
+        assert db.session.get(CrawlTask, task_id).status == 'failed'
+
+
+@pytest.fixture
+def no_pattern_refresh(monkeypatch):
+    monkeypatch.setattr(crawl_queue, 'refresh_domain_pattern', lambda domain_obj: None)
+
+
+def test_run_task_records_the_crawl(app, fake_finder, no_pattern_refresh):
+    with app.app_context():
+        domain_id, = add_domains(1)
+        enqueue_crawl(domain_id)
+        db.session.commit()
+        task_id = claim_task('worker')
+
+        assert run_task(task_id, 'worker') == 'done'
+        db.session.expire_all()
+        task = db.session.get(CrawlTask, task_id)
+        assert (task.results_count, task.locked_by) == (1, None)
+        assert task.finished_at is not None
+
+
+def test_failed_run_is_retried_with_backoff(make_app, monkeypatch, no_pattern_refresh):
+    app = make_app(CRAWL_RETRY_BACKOFF=60)
+
+    def fail(domain_obj):
+        raise RuntimeError('crawl failed')
+
+    monkeypatch.setattr(crawl_queue, 'search_domain_emails', fail)
+    with app.app_context():
+        domain_id, = add_domains(1)
+        enqueue_crawl(domain_id)
+        db.session.commit()
+        task_id = claim_task('worker')
+
+        assert run_task(task_id, 'worker') == 'queued'
+        db.session.expire_all()
+        task = db.session.get(CrawlTask, task_id)
+        assert task.last_error == 'crawl failed'
+        assert task.run_after > datetime.utcnow() + timedelta(seconds=50)
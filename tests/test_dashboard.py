@@ -0,0 +1,33 @@
+import html
+import re
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import Search
+
+
+def test_search_history_pages_cover_late_written_searches(make_app, api_user):
+    app = make_app(HISTORY_PAGE_SIZE=2)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(api_user['id'])
+
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        for n in (1, 3, 4):
+            db.session.add(Search(user_id=api_user['id'], query=f'q{n}', search_type='domain',
+                                  created_at=start + timedelta(minutes=n)))
+        db.session.commit()
+        # A buffered cache hit: written last, so it has the highest ID, but searched earlier
+        db.session.add(Search(user_id=api_user['id'], query='q2', search_type='domain',
+                              created_at=start + timedelta(minutes=2)))
+        db.session.commit()
+
+    seen, url = [], '/search-history'
+    while url:
+        page = client.get(url).get_data(as_text=True)
+        seen += re.findall(r'<td>(q\d)</td>', page)
+        link = re.search(r'href="([^"]*before=[^"]*)"', page)
+        url = html.unescape(link.group(1)) if link else None
+
+    assert seen == ['q4', 'q3', 'q2', 'q1']
@@ -0,0 +1,131 @@
+import shutil
+from types import SimpleNamespace
+
+import pytest
+from flask import g
+
+from app import db
+from app.models import Domain, Email, User
+from app.services.db_routing import is_read_only_endpoint, use_primary
+from config import engine_options
+
+
+@pytest.fixture
+def replica(make_app, tmp_path):
+    """
+    An app whose replica is a copy of the primary taken after one email was
+    stored; a second email exists on the primary only.
+    """
+    replica_uri = f"sqlite:///{tmp_path / 'replica.db'}"
+    app = make_app(SQLALCHEMY_BINDS={'replica': dict(engine_options(replica_uri), url=replica_uri)})
+
+    with app.app_context():
+        user = User(username='tester', email='tester@example.com', password='secret')
+        domain = Domain(domain_name='example.com')
+        db.session.add_all([user, domain])
+        db.session.flush()
+        db.session.add(Email(email_address='replicated@example.com', domain_id=domain.id))
+        db.session.commit()
+        setup = SimpleNamespace(app=app, api_key=user.api_key, domain_id=domain.id)
+        for engine in db.engines.values():
+            engine.dispose()
+
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica.db')
+
+    with app.app_context():
+        db.session.add(Email(email_address='primary-only@example.com', domain_id=setup.domain_id))
+        db.session.commit()
+    return setup
+
+
+def stored_addresses():
+    return {address for address, in db.session.query(Email.email_address)}
+
+
+def test_allow_listed_get_reads_the_replica(replica):
+    response = replica.app.test_client().get(
+        '/api/v1/domain/export?domain=example.com&format=csv',
+        headers={'X-API-Key': replica.api_key}
+    )
+    body = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'replicated@example.com' in body
+    assert 'primary-only@example.com' not in body
+
+
+def test_other_endpoints_read_the_primary(replica):
+    response = replica.app.test_client().get(
+        '/api/v1/domain/search?domain=example.com&limit=10',
+        headers={'X-API-Key': replica.api_key}
+    )
+
+    assert response.status_code == 200
+    assert {email['email'] for email in response.get_json()['emails']} == {
+        'replicated@example.com', 'primary-only@example.com'
+    }
+
+
+def test_export_of_a_domain_missing_from_the_replica_reads_the_primary(replica):
+    with replica.app.app_context():
+        domain = Domain(domain_name='new.com')
+        db.session.add(domain)
+        db.session.flush()
+        db.session.add(Email(email_address='jane@new.com', domain_id=domain.id))
+        db.session.commit()
+
+    response = replica.app.test_client().get(
+        '/api/v1/domain/export?domain=new.com&format=csv',
+        headers={'X-API-Key': replica.api_key}
+    )
+
+    assert response.status_code == 200
+    assert 'jane@new.com' in response.get_data(as_text=True)
+
+
+def test_views_that_write_are_not_routed_to_the_replica(replica):
+    patterns = replica.app.config['READ_REPLICA_ENDPOINTS']
+
+    assert not is_read_only_endpoint('search.domain_results', patterns)
+    assert is_read_only_endpoint('search.domain_export', patterns)
+
+
+def test_a_flush_pins_the_rest_of_the_request_to_the_primary(replica):
+    with replica.app.test_request_context('/dashboard/domains'):
+        g.db_use_replica = True
+        assert stored_addresses() == {'replicated@example.com'}
+
+        db.session.add(Email(email_address='flushed@example.com', domain_id=replica.domain_id))
+        db.session.flush()
+
+        assert g.db_use_replica is False
+        assert 'flushed@example.com' in stored_addresses()
+        db.session.rollback()
+
+
+def test_use_primary_stops_replica_reads(replica):
+    with replica.app.test_request_context('/dashboard/domains'):
+        g.db_use_replica = True
+        use_primary()
+
+        assert stored_addresses() == {'replicated@example.com', 'primary-only@example.com'}
+
+
+def test_locking_reads_stay_on_the_primary(replica):
+    with replica.app.test_request_context('/dashboard/domains'):
+        g.db_use_replica = True
+        # SQLite ignores FOR UPDATE, but the statement still must not go to the replica
+        rows = db.session.query(Email.email_address).with_for_update().all()
+
+        assert {address for address, in rows} == {'replicated@example.com', 'primary-only@example.com'}
+
+
+@pytest.mark.parametrize('endpoint, expected', [
+    ('dashboard.domains', True),
+    ('api.domainexportapi', True),
+    ('api.domainsearch', False),
+    (None, False)
+])
+def test_is_read_only_endpoint(endpoint, expected):
+    patterns = ('dashboard.*', 'api.domainexportapi')
+    assert is_read_only_endpoint(endpoint, patterns) is expected
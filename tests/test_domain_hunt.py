@@ -0,0 +1,39 @@
+from app.services import domain_hunt
+from app.services.domain_hunt import HuntCheckpoint, hunt_batch, read_domains
+
+
+def test_read_domains_normalizes_and_skips_repeats(tmp_path):
+    path = tmp_path / 'domains.txt'
+    path.write_text('# targets\nhttps://www.Example.com/about\nexample.com\n\nnot a domain\nother.org,Other Inc\n')
+
+    assert list(read_domains(path)) == ['example.com', 'other.org']
+
+
+def test_hunt_batch_keeps_order_and_reports_failures(monkeypatch):
+    def find(domain):
+        if domain == 'broken.com':
+            raise RuntimeError('timed out')
+        return [domain]
+
+    monkeypatch.setattr(domain_hunt, '_find_emails', find)
+
+    results = hunt_batch(['a.com', 'broken.com', 'b.com'], concurrency=2)
+
+    assert [r['domain'] for r in results] == ['a.com', 'broken.com', 'b.com']
+    assert [r['error'] for r in results] == [None, 'timed out', None]
+    assert results[2]['emails'] == ['b.com']
+
+
+def test_checkpoint_skips_finished_domains_on_resume(tmp_path):
+    checkpoint = HuntCheckpoint(str(tmp_path / 'hunt.sqlite'))
+    checkpoint.record([
+        {'domain': 'a.com', 'emails': [], 'error': None},
+        {'domain': 'b.com', 'emails': [], 'error': 'timed out'}
+    ])
+    checkpoint.close()
+
+    resumed = HuntCheckpoint(str(tmp_path / 'hunt.sqlite'))
+    assert resumed.finished() == {'a.com', 'b.com'}
+    assert resumed.finished(retry_failed=True) == {'a.com'}
+    assert resumed.counts() == {'done': 1, 'failed': 1}
+    resumed.close()
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+from app.services import email_finder
+from app.services.email_finder import EmailFinder
+from app.services.page_fingerprint import PageDeduplicator
+
+TEMPLATE = ('<html><body><nav><a href="/">Home</a> <a href="/about">About us</a></nav>'
+            '<p>{text}</p><p>Write to <a href="mailto:{email}">{email}</a></p></body></html>')
+TEXT = ' '.join(f'We help company number {n} find the right people to talk to.' for n in range(60))
+
+
+def test_near_duplicate_template_pages_are_still_searched_for_emails(monkeypatch):
+    pages = {
+        'https://example.com': TEMPLATE.format(text=TEXT, email='jane@example.com'),
+        'https://example.com/about': TEMPLATE.format(text=TEXT, email='john@example.com')
+    }
+    fetched = []
+
+    def fake_fetch(url, headers=None, timeout=None):
+        fetched.append(url)
+        return SimpleNamespace(status_code=200, text=pages[url])
+
+    monkeypatch.setattr(email_finder, 'fetch_page', fake_fetch)
+    monkeypatch.setattr(email_finder.time, 'sleep', lambda seconds: None)
+
+    finder = EmailFinder('example.com')
+    # Simhash distances between the two pages vary with the hash seed; a wide
+    # threshold makes them near-duplicates on every run
+    finder.page_deduplicator = PageDeduplicator(max_distance=16)
+
+    assert finder.find_emails_on_page('https://example.com') == {'jane@example.com', 'john@example.com'}
+    assert fetched == ['https://example.com', 'https://example.com/about']
+
+
+def test_exact_duplicate_pages_are_skipped(monkeypatch):
+    page = TEMPLATE.format(text=TEXT, email='jane@example.com')
+    monkeypatch.setattr(email_finder, 'fetch_page',
+                        lambda url, headers=None, timeout=None: SimpleNamespace(status_code=200, text=page))
+    monkeypatch.setattr(email_finder.time, 'sleep', lambda seconds: None)
+
+    finder = EmailFinder('example.com')
+    finder.page_deduplicator.check(page)
+
+    assert finder.find_emails_on_page('https://example.com') == set()
@@ -0,0 +1,50 @@
+import pickle
+
+import pytest
+
+from app.services.email_result import EmailResult, is_email_address
+
+
+@pytest.mark.parametrize('value, valid', [
+    ('jane@example.com', True),
+    ('jane', False),
+    ('', False),
+    (None, False),
+    ('@example.com', False),
+    ('jane@', False),
+    ('jane@team@example.com', False)
+])
+def test_is_email_address(value, valid):
+    assert is_email_address(value) is valid
+
+
+def test_rejects_values_without_a_single_at():
+    with pytest.raises(ValueError):
+        EmailResult('jane.example.com')
+    with pytest.raises(ValueError):
+        EmailResult('jane@team@example.com')
+
+
+def test_round_trips_through_dict_and_pickle():
+    result = EmailResult('jane.doe@example.com', first_name='Jane', confidence=0.8, source='website')
+
+    assert result.to_dict() == {
+        'email': 'jane.doe@example.com', 'first_name': 'Jane', 'last_name': None,
+        'position': None, 'confidence': 0.8, 'source': 'website'
+    }
+    assert result.get('last_name', 'unknown') is None
+    assert result.get('phone', 'unknown') == 'unknown'
+    assert pickle.loads(pickle.dumps(result)).to_dict() == result.to_dict()
+
+
+def test_find_person_email_skips_patterns_without_a_domain(app, domain_id, monkeypatch):
+    from app import db
+    from app.models import Domain, Email
+    from app.services import email_finder
+    from app.services.domain_search import find_person_email
+
+    monkeypatch.setattr(email_finder.EmailFinder, 'verify_email_exists', lambda self, email: True)
+    with app.app_context():
+        domain = db.session.get(Domain, domain_id)
+        assert find_person_email(domain, first_name='Jane', last_name='Doe', pattern='{first}.{last}') is None
+        assert Email.query.count() == 0
@@ -0,0 +1,64 @@
+from app import db
+from app.models import Domain, Email
+from app.services.email_store import upsert_emails
+
+
+def test_upsert_inserts_and_collapses_duplicates(app, domain_id):
+    with app.app_context():
+        stored = upsert_emails(domain_id, [
+            {'email': 'Jane.Doe@example.com', 'confidence': 0.5},
+            {'email': 'jane.doe@example.com', 'first_name': 'Jane', 'confidence': 0.7},
+            {'email': 'info@example.com', 'confidence': 0.3}
+        ])
+        db.session.commit()
+
+        assert sorted(email.email_address for email in stored) == ['info@example.com', 'jane.doe@example.com']
+        jane = Email.query.filter_by(email_address='jane.doe@example.com').one()
+        assert jane.first_name == 'Jane'
+        assert jane.confidence_score == 0.7
+
+
+def test_upsert_conflict_keeps_names_and_best_confidence(app, domain_id):
+    with app.app_context():
+        upsert_emails(domain_id, [{'email': 'jane@example.com', 'first_name': 'Jane', 'confidence': 0.9}])
+        db.session.commit()
+
+        stored = upsert_emails(domain_id, [
+            {'email': 'jane@example.com', 'first_name': 'J', 'last_name': 'Doe', 'confidence': 0.4}
+        ])
+        db.session.commit()
+
+        assert len(stored) == 1
+        jane = Email.query.filter_by(email_address='jane@example.com').one()
+        assert (jane.first_name, jane.last_name, jane.confidence_score) == ('Jane', 'Doe', 0.9)
+        assert Email.query.count() == 1
+
+
+def test_upsert_leaves_out_addresses_owned_by_another_domain(app, domain_id):
+    with app.app_context():
+        other = Domain(domain_name='other.com')
+        db.session.add(other)
+        db.session.flush()
+        upsert_emails(other.id, [{'email': 'shared@other.com', 'confidence': 0.2}])
+        db.session.commit()
+
+        stored = upsert_emails(domain_id, [
+            {'email': 'shared@other.com', 'confidence': 0.6},
+            {'email': 'own@example.com', 'confidence': 0.6}
+        ])
+        db.session.commit()
+
+        assert [email.email_address for email in stored] == ['own@example.com']
+        shared = Email.query.filter_by(email_address='shared@other.com').one()
+        assert shared.domain_id == other.id
+        assert shared.confidence_score == 0.6
+
+
+def test_upsert_many_rows_in_one_call(app, domain_id):
+    with app.app_context():
+        found = [{'email': f'person{i}@example.com', 'confidence': 0.5} for i in range(2500)]
+        stored = upsert_emails(domain_id, found)
+        db.session.commit()
+
+        assert len(stored) == 2500
+        assert Email.query.filter_by(domain_id=domain_id).count() == 2500
@@ -0,0 +1,65 @@
+from app import db
+from app.models import Domain, Email
+from app.services import people_search
+from app.services.people_search import create_people_index, search_people
+
+
+def add_people(domain_id):
+    db.session.add(Domain(domain_name='acme.com', company_name='Acme'))
+    db.session.flush()
+    acme = Domain.query.filter_by(domain_name='acme.com').one()
+    db.session.add_all([
+        Email(email_address='jane.smith@example.com', first_name='Jane', last_name='Smith', domain_id=domain_id),
+        Email(email_address='john.smith@example.com', first_name='John', last_name='Smith', domain_id=domain_id),
+        Email(email_address='jsmith@acme.com', position='Smith relations', domain_id=acme.id)
+    ])
+    db.session.commit()
+
+
+def addresses(page):
+    return [email.email_address for email, _ in page['results']]
+
+
+def test_falls_back_to_a_scan_without_the_index(app, domain_id):
+    people_search._indexed_engines.clear()
+    with app.app_context():
+        add_people(domain_id)
+
+        page = search_people('jane smith')
+
+        assert addresses(page) == ['jane.smith@example.com']
+        assert page['results'][0][1] is None
+
+
+def test_index_ranks_names_above_other_columns(app, domain_id):
+    people_search._indexed_engines.clear()
+    with app.app_context():
+        add_people(domain_id)
+        # First creation on a database that already has emails fills the index
+        create_people_index()
+
+        page = search_people('smith')
+
+        assert set(addresses(page)[:2]) == {'jane.smith@example.com', 'john.smith@example.com'}
+        assert addresses(page)[2] == 'jsmith@acme.com'
+        assert addresses(search_people('acme')) == ['jsmith@acme.com']
+
+
+def test_index_follows_new_emails(app, domain_id):
+    people_search._indexed_engines.clear()
+    with app.app_context():
+        create_people_index()
+        add_people(domain_id)
+
+        assert addresses(search_people('joh')) == ['john.smith@example.com']
+
+
+def test_pages_report_whether_more_follow(app, domain_id):
+    with app.app_context():
+        add_people(domain_id)
+
+        first = search_people('smith', page=1, per_page=2)
+        second = search_people('smith', page=2, per_page=2)
+
+        assert (len(first['results']), first['has_more']) == (2, True)
+        assert (len(second['results']), second['has_more']) == (1, False)
@@ -0,0 +1,62 @@
+import threading
+
+from app.services.rate_limiter import MemoryCounterStore, RateLimiter
+
+
+def make_limiter(limit):
+    limiter = RateLimiter()
+    limiter.store = MemoryCounterStore()
+    limiter.limit = limit
+    # Hourly buckets are not seeded from api_usage, so no database is needed
+    limiter.window = 3600
+    limiter._flusher.start = lambda: None
+    return limiter
+
+
+def test_concurrent_hits_never_exceed_limit():
+    limiter = make_limiter(50)
+    threads, hits = 20, 10
+    barrier = threading.Barrier(threads)
+    allowed = []
+
+    def worker():
+        barrier.wait()
+        for _ in range(hits):
+            if limiter.hit(1).allowed:
+                allowed.append(1)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+
+    assert len(allowed) == 50
+    assert limiter.peek(1).remaining == 0
+
+
+def test_denied_hits_are_not_counted():
+    limiter = make_limiter(3)
+    statuses = [limiter.hit(1) for _ in range(5)]
+
+    assert [status.allowed for status in statuses] == [True, True, True, False, False]
+    assert [status.remaining for status in statuses[:3]] == [2, 1, 0]
+    key = limiter._key(1, int(statuses[0].reset // limiter.window) - 1)
+    assert limiter.store.get(key) == 3
+
+
+def test_users_are_limited_separately():
+    limiter = make_limiter(1)
+
+    assert limiter.hit(1).allowed
+    assert not limiter.hit(1).allowed
+    assert limiter.hit(2).allowed
+
+
+def test_cost_is_taken_whole_or_not_at_all():
+    limiter = make_limiter(10)
+
+    assert limiter.hit(1, cost=6).remaining == 4
+    refused = limiter.hit(1, cost=5)
+    assert (refused.allowed, refused.remaining) == (False, 4)
+    assert limiter.hit(1, cost=4).allowed
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+from app import db
+from app.models import CrawlTask, Domain, Search
+from app.services import recrawl
+from app.services.recrawl import select_stale_domains
+
+
+def add_domain(name, age, now, searches=0, user_id=None):
+    domain = Domain(domain_name=name, updated_at=now - age)
+    db.session.add(domain)
+    db.session.add_all([
+        Search(user_id=user_id, query=name, search_type='domain', created_at=now - timedelta(hours=1))
+        for _ in range(searches)
+    ])
+    db.session.flush()
+    return domain.id
+
+
+def make_recrawl_app(make_app):
+    return make_app(RECRAWL_MAX_AGE_DAYS=30, RECRAWL_MIN_AGE_HOURS=24, RECRAWL_POPULARITY_DAYS=30)
+
+
+def test_overdue_domain_is_not_crowded_out_by_popular_ones(make_app, monkeypatch):
+    app = make_recrawl_app(make_app)
+    monkeypatch.setattr(recrawl, 'CANDIDATE_FACTOR', 2)
+    now = datetime.utcnow()
+    with app.app_context():
+        # Popular domains just past their ~2.7 day target age
+        for i in range(5):
+            add_domain(f'popular{i}.com', timedelta(days=3), now, searches=10)
+        neglected = add_domain('neglected.com', timedelta(days=300), now)
+        db.session.commit()
+
+        selected = select_stale_domains(1, now=now)
+
+        assert [domain.id for domain, _, _ in selected] == [neglected]
+
+
+def test_only_due_domains_without_active_tasks_are_selected(make_app):
+    app = make_recrawl_app(make_app)
+    now = datetime.utcnow()
+    with app.app_context():
+        due = add_domain('due.com', timedelta(days=31), now)
+        add_domain('fresh.com', timedelta(days=10), now)
+        add_domain('too-recent.com', timedelta(hours=12), now, searches=50)
+        queued = add_domain('queued.com', timedelta(days=60), now)
+        db.session.add(CrawlTask(domain_id=queued, status='queued'))
+        popular = add_domain('popular.com', timedelta(days=2), now, searches=29)
+        db.session.commit()
+
+        selected = {domain.id: searches for domain, searches, _ in select_stale_domains(10, now=now)}
+
+        assert selected == {due: 0, popular: 29}
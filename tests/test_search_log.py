@@ -0,0 +1,67 @@
+from sqlalchemy import event
+
+from app import db
+from app.models import Search, UserDomain
+from app.services.result_cache import set_verification
+from app.services.search_log import search_log
+
+
+def count_queries(app):
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_cached_domain_search_is_served_without_queries(app, client, api_user, fake_finder):
+    headers = {'X-API-Key': api_user['api_key']}
+    assert client.get('/api/v1/domain/search?domain=example.com', headers=headers).status_code == 200
+
+    statements = count_queries(app)
+    response = client.get('/api/v1/domain/search?domain=example.com', headers=headers)
+
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 1
+    assert statements == []
+    assert fake_finder.calls == 1
+
+    search_log.flush()
+    with app.app_context():
+        searches = db.session.query(Search).filter_by(user_id=api_user['id'], search_type='domain').all()
+        assert [search.query for search in searches] == ['example.com', 'example.com']
+        assert UserDomain.query.filter_by(user_id=api_user['id']).count() == 1
+
+
+def test_cached_verification_is_logged_in_batches(app, client, api_user):
+    with app.app_context():
+        set_verification('jane@example.com', True)
+    headers = {'X-API-Key': api_user['api_key']}
+
+    for _ in range(3):
+        response = client.get('/api/v1/email/verify?email=jane@example.com', headers=headers)
+        assert response.get_json() == {'email': 'jane@example.com', 'is_valid': True}
+
+    with app.app_context():
+        assert db.session.query(Search).count() == 0
+    search_log.flush()
+    with app.app_context():
+        assert db.session.query(Search).filter_by(search_type='verify').count() == 3
+
+
+def test_failed_flush_keeps_searches(app, api_user, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('database down')
+
+    monkeypatch.setattr('app.services.user_library.record_domain_search', fail)
+    search_log.record(api_user['id'], 'example.com', 'domain', domain_id=1)
+    search_log.flush()
+
+    assert len(search_log._pending) == 1
+    with app.app_context():
+        assert db.session.query(Search).count() == 0
+
+    monkeypatch.undo()
+    search_log.flush()
+    with app.app_context():
+        assert db.session.query(Search).count() == 1
@@ -0,0 +1,153 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import CrawlLease, Email, Search
+from app.services.single_flight import SingleFlight
+
+
+def test_domain_search_records_the_search_with_the_crawl(app, client, api_user, fake_finder):
+    response = client.get('/api/v1/domain/search?domain=example.com',
+                          headers={'X-API-Key': api_user['api_key']})
+
+    assert response.status_code == 200
+    assert [email['email'] for email in response.get_json()['emails']] == ['jane.doe@example.com']
+    assert fake_finder.calls == 1
+    with app.app_context():
+        search = db.session.query(Search).one()
+        assert (search.query, search.results_count) == ('example.com', 1)
+        assert db.session.query(CrawlLease).filter(CrawlLease.completed_at.is_(None)).count() == 0
+
+
+def test_concurrent_callers_share_one_computation(make_app):
+    app = make_app(SINGLE_FLIGHT_USE_LEASE=False)
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    def caller():
+        with app.app_context():
+            results.append(flight.do('key', compute))
+
+    threads = [threading.Thread(target=caller) for _ in range(5)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Give the followers time to find the call in flight
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['result'] * 5
+    assert flight.in_flight() == 0
+
+
+def test_waits_for_another_workers_lease_then_loads(make_app):
+    app = make_app(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    flight = SingleFlight()
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add(CrawlLease(key='key', owner='other', expires_at=now + timedelta(minutes=5), created_at=now))
+        db.session.commit()
+
+        def finish_other_worker():
+            with app.app_context():
+                lease = db.session.get(CrawlLease, 'key')
+                lease.completed_at = lease.expires_at = datetime.utcnow()
+                db.session.commit()
+
+        timer = threading.Timer(0.1, finish_other_worker)
+        timer.start()
+        result = flight.do('key', lambda: pytest.fail('computed despite the lease'), load=lambda: 'stored')
+        timer.join()
+
+        assert result == 'stored'
+
+
+def test_takes_over_an_expired_lease(make_app):
+    app = make_app()
+    flight = SingleFlight()
+    with app.app_context():
+        past = datetime.utcnow() - timedelta(hours=1)
+        db.session.add(CrawlLease(key='key', owner='crashed', expires_at=past, created_at=past))
+        db.session.commit()
+
+        assert flight.do('key', lambda: 'computed') == 'computed'
+        lease = db.session.query(CrawlLease).one()
+        assert lease.owner == flight.owner
+        assert lease.completed_at is not None
+
+
+def test_lease_is_released_when_the_computation_fails(app):
+    flight = SingleFlight()
+    with app.app_context():
+        def fail():
+            raise RuntimeError('crawl failed')
+
+        with pytest.raises(RuntimeError):
+            flight.do('key', fail)
+        assert db.session.query(CrawlLease).count() == 0
+        assert Email.query.count() == 0
+
+
+def test_waiter_accepts_an_empty_result_from_a_completed_lease(make_app):
+    app = make_app(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    flight = SingleFlight()
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add(CrawlLease(key='key', owner='other', expires_at=now + timedelta(minutes=5),
+                                  created_at=now, completed_at=now))
+        db.session.commit()
+
+        # The other worker found nothing; that is still its answer
+        result = flight.do('key', lambda: pytest.fail('computed again after an empty crawl'), load=lambda: None)
+
+        assert result is None
+
+
+def test_waiter_takes_over_a_released_lease(make_app):
+    app = make_app(SINGLE_FLIGHT_POLL_INTERVAL=0.01)
+    flight = SingleFlight()
+    with app.app_context():
+        now = datetime.utcnow()
+        db.session.add(CrawlLease(key='key', owner='other', expires_at=now + timedelta(minutes=5), created_at=now))
+        db.session.commit()
+
+        def fail_other_worker():
+            with app.app_context():
+                db.session.query(CrawlLease).filter_by(key='key').delete()
+                db.session.commit()
+
+        timer = threading.Timer(0.1, fail_other_worker)
+        timer.start()
+        result = flight.do('key', lambda: 'computed', load=lambda: None)
+        timer.join()
+
+        assert result == 'computed'
+
+
+def test_lease_is_renewed_during_a_long_computation(make_app):
+    app = make_app(SINGLE_FLIGHT_LEASE_SECONDS=0.3)
+    flight = SingleFlight()
+    with app.app_context():
+        def compute():
+            first = db.session.get(CrawlLease, 'key').expires_at
+            db.session.rollback()
+            time.sleep(0.5)
+            renewed = db.session.get(CrawlLease, 'key').expires_at
+            db.session.rollback()
+            return renewed > first
+
+        assert flight.do('key', compute) is True
@@ -0,0 +1,45 @@
+from datetime import date
+
+from app import db
+from app.models import Search, SearchDailyRollup, UserStats
+from app.services.user_stats import get_user_stats
+
+
+def test_several_searches_in_one_flush_are_counted_once(app, api_user):
+    with app.app_context():
+        db.session.add_all([
+            Search(user_id=api_user['id'], query=f'q{n}', search_type='domain', results_count=2)
+            for n in range(3)
+        ])
+        db.session.commit()
+
+        stats = db.session.get(UserStats, api_user['id'])
+        assert (stats.search_count, stats.results_count) == (3, 6)
+
+
+def test_seed_includes_rolled_up_searches(app, api_user):
+    with app.app_context():
+        db.session.add(SearchDailyRollup(user_id=api_user['id'], day=date(2020, 1, 1),
+                                         search_type='domain', search_count=5, results_count=7))
+        db.session.commit()
+
+        db.session.add(Search(user_id=api_user['id'], query='q', search_type='domain', results_count=1))
+        db.session.commit()
+
+        stats = get_user_stats(api_user['id'])
+        assert (stats.search_count, stats.results_count) == (6, 8)
+
+
+def test_update_of_a_search_that_predates_the_counters(app, api_user):
+    with app.app_context():
+        db.session.add(Search(user_id=api_user['id'], query='q', search_type='domain', results_count=1))
+        db.session.commit()
+        db.session.query(UserStats).delete()
+        db.session.commit()
+
+        search = db.session.query(Search).one()
+        search.results_count = 4
+        db.session.commit()
+
+        stats = db.session.get(UserStats, api_user['id'])
+        assert (stats.search_count, stats.results_count) == (1, 4)